@@ -0,0 +1,75 @@
+"""
+Compare the ``keys`` and ``hash`` Valkey layouts of the guild settings cache.
+
+Usage::
+
+    uv run python scripts/benchmarks/cache_layout.py [--uri valkey://localhost:6379/15] [--guilds 1000]
+
+Runs against a scratch database (flushed before and after each layout), so
+never point it at a production Valkey.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from valkey.asyncio import Valkey
+
+from pibot.cogs.admin.config import AdminConfig
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.cogs.translations.config import TranslationsConfig
+from pibot.config import SETTINGS_CACHE_LAYOUT
+from pibot.guild_settings.cache import ValkeySettingsCache
+
+MODELS = [AdminConfig, GeneralConfig, SummarizeConfig, TranslationsConfig]
+
+
+async def timeGuilds(guildIds: range, operation: Callable[[int], Awaitable[object]]) -> float:
+    """Return mean microseconds per guild for ``operation``."""
+    start = time.perf_counter()
+    for guildId in guildIds:
+        await operation(guildId)
+    return (time.perf_counter() - start) / len(guildIds) * 1_000_000
+
+
+async def benchmarkLayout(client: Valkey, layout: SETTINGS_CACHE_LAYOUT, guilds: int) -> dict[str, float]:
+    """Time bulk writes, single reads, bulk reads, and guild invalidation for one layout."""
+    await client.flushdb()
+    cache = ValkeySettingsCache(client, layout=layout)
+    guildIds = range(1, guilds + 1)
+    configs = [model() for model in MODELS]
+
+    results = {
+        "setMany": await timeGuilds(guildIds, lambda guildId: cache.setMany(guildId, configs)),
+        "get": await timeGuilds(guildIds, lambda guildId: cache.get(guildId, GeneralConfig)),
+        "getMany": await timeGuilds(guildIds, lambda guildId: cache.getMany(guildId, MODELS)),
+        "keys": float(await client.dbsize()),
+        "invalidate": await timeGuilds(guildIds, lambda guildId: cache.invalidate(guildId)),
+    }
+    await client.flushdb()
+    return results
+
+
+async def main() -> None:
+    """Run the benchmark for both layouts and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", default="valkey://localhost:6379/15")
+    parser.add_argument("--guilds", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = Valkey.from_url(args.uri)
+    try:
+        results = {layout: await benchmarkLayout(client, layout, args.guilds) for layout in SETTINGS_CACHE_LAYOUT}
+    finally:
+        await client.aclose()
+
+    print(f"{args.guilds} guilds x {len(MODELS)} groups (µs per guild; keys = total Valkey keys)")
+    print(f"{'operation':<12}" + "".join(f"{layout.value:>12}" for layout in results))
+    for operation in next(iter(results.values())):
+        print(f"{operation:<12}" + "".join(f"{values[operation]:>12.1f}" for values in results.values()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
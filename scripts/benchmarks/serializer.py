@@ -0,0 +1,64 @@
+"""
+Measure ``fromStored`` throughput with and without the compiled settings codec.
+
+Usage::
+
+    uv run python scripts/benchmarks/serializer.py [--iterations 20000]
+
+"Uncompiled" rebuilds a ``TypeAdapter`` per field on every call, as the
+serializer did before codecs were memoized in the registry.
+"""
+
+import argparse
+import timeit
+from collections.abc import Mapping
+from functools import partial
+from typing import Annotated, Any, cast
+
+from pydantic import TypeAdapter
+
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.serializer import fieldDefault, fromStored
+from pibot.guild_settings.ui.editors import partitionFieldMetadata
+
+CASES: list[tuple[type[SettingsGroup], dict[str, object]]] = [
+    (GeneralConfig, {}),
+    (GeneralConfig, {"prefix": "!", "commandChannelId": 123456789}),
+    (SummarizeConfig, {"cooldownSeconds": 120, "maxMessages": 500}),
+]
+
+
+def uncompiledFromStored(model: type[SettingsGroup], data: Mapping[str, object]) -> SettingsGroup:
+    """Decode without a cached codec: one fresh ``TypeAdapter`` per stored field."""
+    values: dict[str, object] = {}
+    for name, fieldInfo in model.model_fields.items():
+        if name in data:
+            _uiTypes, validation = partitionFieldMetadata(fieldInfo)
+            annotation: Any = (
+                cast(Any, Annotated)[fieldInfo.annotation, *validation] if validation else fieldInfo.annotation
+            )
+            values[name] = TypeAdapter(annotation).validate_python(data[name])
+        elif not fieldInfo.is_required():
+            values[name] = fieldDefault(fieldInfo)
+    return model.model_validate(values)
+
+
+def main() -> None:
+    """Print calls per second for each decode path and case."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'case':<40}{'uncompiled/s':>15}{'compiled/s':>15}{'speedup':>10}")
+    for model, data in CASES:
+        assert uncompiledFromStored(model, data) == fromStored(model, data)
+        before = timeit.timeit(partial(uncompiledFromStored, model, data), number=args.iterations)
+        after = timeit.timeit(partial(fromStored, model, data), number=args.iterations)
+        label = f"{model.name} {sorted(data)}"
+        print(f"{label:<40}{args.iterations / before:>15,.0f}{args.iterations / after:>15,.0f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure settings panel build time with and without cached render plans.
+
+Usage::
+
+    uv run python scripts/benchmarks/settings_panel.py [--builds 2000]
+
+Registers synthetic settings groups so the feature picker has ``groups``
+options, then builds ``SettingsPanelView`` for a page of ``fields`` integer
+settings. "Cold" drops the cached plans before every build, which repeats the
+editor resolution and group sort the panel did before plans were cached.
+"""
+
+import argparse
+import timeit
+
+from pydantic import Field
+
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import registerSettingsGroup
+from pibot.guild_settings.settings_ui import SettingsPanelView
+from pibot.guild_settings.ui.plan import clearPanelPlans
+
+FIELD_COUNTS = [1, 4, 8]
+GROUP_COUNTS = [4, 32, 128]
+
+
+def makeGroup(name: str, fields: int) -> type[SettingsGroup]:
+    """Build and register a settings group with ``fields`` integer settings."""
+    namespace: dict[str, object] = {
+        "name": name,
+        "description": f"Synthetic benchmark group {name}",
+        "__annotations__": {f"setting{index}": int for index in range(fields)},
+        **{f"setting{index}": Field(default=index, description=f"Setting {index}") for index in range(fields)},
+    }
+    return registerSettingsGroup(type(f"Benchmark{name.title()}Config", (SettingsGroup,), namespace))
+
+
+def main() -> None:
+    """Print microseconds per panel build for each field and group count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--builds", type=int, default=2000)
+    args = parser.parse_args()
+
+    registered = 0
+    print(f"{'groups':>8}{'fields':>8}{'cold µs':>12}{'cached µs':>12}{'speedup':>10}")
+    for groups in GROUP_COUNTS:
+        while registered < groups:
+            makeGroup(f"filler{registered}", 1)
+            registered += 1
+        for fields in FIELD_COUNTS:
+            model = makeGroup(f"page{groups}x{fields}", fields)
+            config = model()
+
+            def cold(model: type[SettingsGroup] = model, config: SettingsGroup = config) -> None:
+                clearPanelPlans()
+                SettingsPanelView(1, model, config)
+
+            def cached(model: type[SettingsGroup] = model, config: SettingsGroup = config) -> None:
+                SettingsPanelView(1, model, config)
+
+            before = timeit.timeit(cold, number=args.builds) / args.builds * 1_000_000
+            after = timeit.timeit(cached, number=args.builds) / args.builds * 1_000_000
+            print(f"{groups:>8}{fields:>8}{before:>12.1f}{after:>12.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure ``SettingsService`` load and update latency on the embedded backends.
+
+Usage::
+
+    uv run python scripts/benchmarks/settings_service.py [--guilds 1000] [--path :memory:]
+
+Runs on the SQLite store and the in-process memory cache, so the numbers show
+the service, codec and store logic without network round trips. Cold loads
+miss the cache and read SQLite; warm loads are cache hits; updates write
+through to SQLite.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.cache import MemorySettingsCache
+from pibot.guild_settings.service import SettingsService
+from pibot.guild_settings.store import SqliteSettingsStore
+
+
+async def timeEach(guilds: int, operation: Callable[[int], Awaitable[object]]) -> float:
+    """Return mean microseconds per call of ``operation`` over every guild ID."""
+    start = time.perf_counter()
+    for guildId in range(1, guilds + 1):
+        await operation(guildId)
+    return (time.perf_counter() - start) / guilds * 1_000_000
+
+
+async def main() -> None:
+    """Seed one settings group per guild, then time cold loads, warm loads and updates."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--path", default=":memory:", help="SQLite database file (default: in memory).")
+    args = parser.parse_args()
+
+    store = SqliteSettingsStore(args.path)
+    service = SettingsService(store, MemorySettingsCache(maxSize=args.guilds * 2))
+    try:
+        for guildId in range(1, args.guilds + 1):
+            await store.setField(guildId, SummarizeConfig.name, "maxMessages", 500)
+        results = {
+            "cold load": await timeEach(args.guilds, lambda guildId: service.load(guildId, SummarizeConfig)),
+            "warm load": await timeEach(args.guilds, lambda guildId: service.load(guildId, SummarizeConfig)),
+            "loadMany": await timeEach(
+                args.guilds, lambda guildId: service.loadMany(guildId, [GeneralConfig, SummarizeConfig])
+            ),
+            "update": await timeEach(
+                args.guilds, lambda guildId: service.update(guildId, SummarizeConfig, "maxMessages", 250)
+            ),
+        }
+    finally:
+        await store.close()
+    print(f"{args.guilds} guilds on SQLite ({args.path}) + memory cache (µs per call)")
+    for name, micros in results.items():
+        print(f"{name:>14}{micros:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Compare whole-document and projected settings reads as guild documents grow.
+
+Usage::
+
+    uv run python scripts/benchmarks/store_projection.py [--uri mongodb://localhost:27017] [--reads 2000]
+
+Seeds ``pibot_benchmark.settings`` with one guild document per feature count
+(each extra feature a realistic group of ten fields) and reads one group back
+with and without ``groupProjection``. The scratch database is dropped
+afterwards, so never point it at a database you care about.
+"""
+
+import argparse
+import asyncio
+import time
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+
+from pibot.guild_settings.store import groupProjection
+
+FEATURE_COUNTS = [4, 16, 64, 256]
+DATABASE = "pibot_benchmark"
+
+
+def featureDocument(features: int) -> dict[str, dict[str, object]]:
+    """Return a ``features`` subdocument with ``features`` groups of ten fields each."""
+    return {
+        f"feature{index}": {f"field{field}": f"value-{index}-{field}" * 2 for field in range(10)}
+        for index in range(features)
+    }
+
+
+async def timeReads(
+    collection: AsyncCollection[RawBSONDocument],
+    guildId: int,
+    projection: dict[str, int] | None,
+    reads: int,
+) -> tuple[float, int]:
+    """Return mean microseconds per read and bytes per returned document."""
+    size = 0
+    start = time.perf_counter()
+    for _ in range(reads):
+        document = await collection.find_one({"_id": guildId}, projection)
+        assert document is not None
+        size = len(document.raw)
+    return (time.perf_counter() - start) / reads * 1_000_000, size
+
+
+async def main() -> None:
+    """Run the benchmark for each feature count and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    client: AsyncMongoClient = AsyncMongoClient(args.uri)
+    collection = client[DATABASE].get_collection(
+        "settings",
+        codec_options=CodecOptions(document_class=RawBSONDocument),
+    )
+    print(f"{args.reads} reads of one group (µs per read; bytes per returned document)")
+    print(f"{'features':>10}{'full µs':>12}{'proj µs':>12}{'full B':>12}{'proj B':>12}")
+    try:
+        for guildId, features in enumerate(FEATURE_COUNTS, start=1):
+            await client[DATABASE]["settings"].insert_one({"_id": guildId, "features": featureDocument(features)})
+            fullMicros, fullBytes = await timeReads(collection, guildId, None, args.reads)
+            projectedMicros, projectedBytes = await timeReads(
+                collection, guildId, groupProjection(["feature0"]), args.reads
+            )
+            print(f"{features:>10}{fullMicros:>12.1f}{projectedMicros:>12.1f}{fullBytes:>12}{projectedBytes:>12}")
+    finally:
+        await client.drop_database(DATABASE)
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,22 @@
 """Discord Bot."""
 
+import argparse
 import asyncio
+import os
+import sys
+from collections.abc import Generator, Sequence
+from contextlib import contextmanager
+from typing import Literal, TextIO
 
 import discord
 from dotenv import load_dotenv
 
 from pibot.bot import Bot
-from pibot.config import BotConfig
+from pibot.clients import createMongoClient, createValkeyClient, createValkeyPubSubClient
+from pibot.config import ENV_PREFIX, BotConfig, MongoClientConfig, SettingsCacheConfig, ValkeyClientConfig
+from pibot.guild_settings.cache import ValkeySettingsCache
+from pibot.guild_settings.store import MongoSettingsStore
+from pibot.guild_settings.transfer import exportSettings, importSettings
 
 
 async def main(config: BotConfig) -> None:
@@ -15,9 +25,77 @@ async def main(config: BotConfig) -> None:
     await bot.start(config.discordToken)
 
 
+def parseArgs(argv: Sequence[str]) -> argparse.Namespace:
+    """Parse ``pibot`` command-line arguments (no subcommand runs the bot)."""
+    parser = argparse.ArgumentParser(prog="pibot", description="Run PiBot or manage its data.")
+    commands = parser.add_subparsers(dest="command")
+    settings = commands.add_parser("settings", help="Bulk export or import guild settings as NDJSON.")
+    actions = settings.add_subparsers(dest="action", required=True)
+    for name, stream, description in (
+        ("export", "output", "Write every guild settings document as one JSON line."),
+        ("import", "input", "Upsert guild settings from JSON lines and evict affected cache entries."),
+    ):
+        action = actions.add_parser(name, help=description)
+        action.add_argument(f"--{stream}", default="-", help="File path, or - for stdio.")
+        action.add_argument("--batch-size", type=int, default=500, help="Documents per cursor batch or bulk write.")
+        action.add_argument("--mongodb-uri", default=os.environ.get(f"{ENV_PREFIX}MONGODB_URI"))
+        if name == "import":
+            action.add_argument("--valkey-uri", default=os.environ.get(f"{ENV_PREFIX}VALKEY_URI"))
+    return parser.parse_args(argv)
+
+
+@contextmanager
+def openStream(path: str, mode: Literal["r", "w"]) -> Generator[TextIO]:
+    """Open ``path`` as text, or use stdin or stdout (left open) for ``-``."""
+    if path == "-":
+        yield sys.stdout if mode == "w" else sys.stdin
+        return
+    with open(path, mode, encoding="utf-8") as stream:
+        yield stream
+
+
+async def settingsCommand(args: argparse.Namespace) -> None:
+    """Run ``pibot settings export`` or ``pibot settings import``."""
+    if not args.mongodb_uri:
+        sys.exit(f"Set {ENV_PREFIX}MONGODB_URI or pass --mongodb-uri.")
+    mongoClient = createMongoClient(args.mongodb_uri, MongoClientConfig())
+    collection = MongoSettingsStore(mongoClient).collection
+    try:
+        if args.action == "export":
+            with openStream(args.output, "w") as output:
+                stats = await exportSettings(collection, output, batchSize=args.batch_size)
+        else:
+            cache = None
+            if args.valkey_uri:
+                layout = SettingsCacheConfig().layout
+                cache = ValkeySettingsCache(
+                    createValkeyClient(args.valkey_uri, ValkeyClientConfig()),
+                    # Bulk invalidations are broadcast through one node; a cluster client cannot publish.
+                    pubSubClient=createValkeyPubSubClient(args.valkey_uri, ValkeyClientConfig()),
+                    layout=layout,
+                )
+            try:
+                with openStream(args.input, "r") as lines:
+                    stats = await importSettings(collection, lines, cache=cache, batchSize=args.batch_size)
+            finally:
+                if cache is not None:
+                    await cache.close()
+    finally:
+        await mongoClient.close()
+    print(
+        f"{args.action}: {stats.guilds} guilds, {stats.groups} groups, "
+        f"{stats.skippedGroups} skipped groups, {stats.skippedLines} skipped lines",
+        file=sys.stderr,
+    )
+
+
 def run() -> None:
     """Entry point for the CLI."""
     load_dotenv()
+    # Only subcommands parse arguments; the bot ignores whatever else it is started with.
+    if sys.argv[1:2] == ["settings"]:
+        asyncio.run(settingsCommand(parseArgs(sys.argv[1:])))
+        return
     config = BotConfig()
     asyncio.run(main(config))
 
@@ -4,16 +4,28 @@ import asyncio
 import logging
 import pathlib
 from importlib.metadata import PackageNotFoundError, version
+from typing import cast
 
 import discord
 import discord.ext.commands
 from pymongo import AsyncMongoClient
-from valkey.asyncio import Valkey
 
-from pibot.config import COMMAND_SYNC_BEHAVIOR, BotConfig
-from pibot.guild_settings.cache import ValkeySettingsCache
+from pibot.clients import ValkeyClient, createMongoClient, createValkeyClient, createValkeyPubSubClient
+from pibot.config import COMMAND_SYNC_BEHAVIOR, SETTINGS_CACHE_BACKEND, SETTINGS_STORE, BotConfig
+from pibot.guild_settings.breaker import createBreaker
+from pibot.guild_settings.cache import (
+    CACHE_CODECS,
+    LocalSettingsCache,
+    MemorySettingsCache,
+    SettingsCache,
+    ValkeySettingsCache,
+)
+from pibot.guild_settings.migration import SettingsMigrator
+from pibot.guild_settings.registry import getSettingsGroups
 from pibot.guild_settings.service import SettingsService
-from pibot.guild_settings.store import SettingsStore
+from pibot.guild_settings.store import MongoSettingsStore, SettingsStore, SqliteSettingsStore
+from pibot.guild_settings.watcher import SettingsChangeWatcher
+from pibot.metrics import REGISTRY, MetricsServer
 
 logger = logging.getLogger("pibot")
 
@@ -37,17 +49,84 @@ class Bot(discord.ext.commands.Bot):
     def __init__(self, config: BotConfig, *args, **kwargs) -> None:
         """Initialize the bot."""
         self.config = config
-        self._mongoClient = AsyncMongoClient(config.mongodbUri)
-        self._settingsCache = ValkeySettingsCache(Valkey.from_url(config.valkeyUri))
-        self.guildSettings = SettingsService(SettingsStore(self._mongoClient), self._settingsCache)
+        self._mongoClient: AsyncMongoClient | None = None
+        store: SettingsStore
+        if config.settingsStore is SETTINGS_STORE.SQLITE:
+            store = SqliteSettingsStore(config.settingsSqlitePath)
+        else:
+            self._mongoClient = createMongoClient(config.mongodbUri, config.mongodb)
+            store = MongoSettingsStore(self._mongoClient)
+        self._sharedSettingsCache: ValkeySettingsCache | None = None
+        self._localSettingsCache: LocalSettingsCache | None = None
+        self._valkeyClient: ValkeyClient | None = None
+        valkeyClient: ValkeyClient | None = None
+        settingsCache: SettingsCache
+        if config.settingsCache.backend is SETTINGS_CACHE_BACKEND.MEMORY:
+            settingsCache = MemorySettingsCache(
+                maxSize=config.settingsCache.localMaxSize,
+                softTtlSeconds=config.settingsCache.softTtlSeconds,
+                hardTtlSeconds=config.settingsCache.hardTtlSeconds,
+            )
+        else:
+            valkeyClient = self._valkeyClient = createValkeyClient(config.valkeyUri, config.valkey)
+            pubSubClient = createValkeyPubSubClient(config.valkeyUri, config.valkey)
+            self._sharedSettingsCache = ValkeySettingsCache(
+                valkeyClient,
+                pubSubClient=pubSubClient,
+                layout=config.settingsCache.layout,
+                softTtlSeconds=config.settingsCache.softTtlSeconds,
+                hardTtlSeconds=config.settingsCache.hardTtlSeconds,
+                codec=CACHE_CODECS[config.settingsCache.codec](),
+                tracking=config.settingsCache.tracking,
+                trackingMaxSize=config.settingsCache.trackingMaxSize,
+            )
+            # The breaker sits below the in-process layer so its hits survive a Valkey outage.
+            settingsCache = self._localSettingsCache = LocalSettingsCache(
+                self._sharedSettingsCache,
+                pubSubClient,
+                maxSize=config.settingsCache.localMaxSize,
+                ttlSeconds=config.settingsCache.localTtlSeconds,
+                breaker=createBreaker(config.settingsCache.backend.value, config.settingsBreaker),
+            )
+        self.guildSettings = SettingsService(
+            store,
+            settingsCache,
+            writeDelaySeconds=config.settingsCache.writeDelaySeconds,
+            storeBreaker=createBreaker(config.settingsStore.value, config.settingsBreaker),
+            fallbackMaxSize=config.settingsBreaker.fallbackMaxSize,
+        )
+        self._settingsWatcher: SettingsChangeWatcher | None = None
+        if config.settingsCache.watchChanges:
+            if isinstance(store, MongoSettingsStore) and self._localSettingsCache is not None and valkeyClient:
+                self._settingsWatcher = SettingsChangeWatcher(store.collection, self._localSettingsCache, valkeyClient)
+            else:
+                logger.warning("Settings change watching needs the mongodb store and valkey cache; it stays off.")
+        self._settingsWarmup: asyncio.Task[None] | None = None
+        self._settingsMigration: asyncio.Task[None] | None = None
+        self._cacheLayoutMigration: asyncio.Task[None] | None = None
+        self._metricsServer: MetricsServer | None = None
+        if config.metricsPort:
+            self._metricsServer = MetricsServer(REGISTRY, config.metricsHost, config.metricsPort)
         self.commandSyncBehavior = config.commandSyncBehavior
         self.isDevTools = config.enableDevTools
         super().__init__(*args, **kwargs)
 
     async def close(self) -> None:
         """Close Discord, Valkey, and MongoDB connections."""
-        await self._settingsCache.close()
-        await self._mongoClient.close()
+        tasks = [task for task in (self._settingsWarmup, self._settingsMigration, self._cacheLayoutMigration) if task]
+        for task in tasks:
+            task.cancel()
+        # Let them unwind (and release their leases) before the clients they use are closed.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._settingsWatcher is not None:
+            await self._settingsWatcher.stop()
+        await self.guildSettings.flush()
+        await self.guildSettings.cache.close()
+        await self.guildSettings.store.close()
+        if self._mongoClient is not None:
+            await self._mongoClient.close()
+        if self._metricsServer is not None:
+            await self._metricsServer.stop()
         await super().close()
 
     async def setup_hook(self) -> None:
@@ -55,13 +134,67 @@ class Bot(discord.ext.commands.Bot):
         discord.utils.setup_logging(level=self.config.logLevelValue)
         logger.info("Starting PiBot version %s", self.version)
         logger.info("Logged in as %s", self.user)
+        if self._sharedSettingsCache is not None:
+            self._cacheLayoutMigration = asyncio.create_task(self.migrateCacheLayout())
+            self._sharedSettingsCache.start()
+        if self._localSettingsCache is not None:
+            self._localSettingsCache.start()
+        if self._settingsWatcher is not None:
+            self._settingsWatcher.start()
+        if self._metricsServer is not None:
+            await self._metricsServer.start()
         await self.load_cogs()
 
     async def on_ready(self) -> None:
         """When the bot is ready."""
         logger.info("Ready as %s", self.user)
+        if self.config.settingsCache.warmOnStartup and self._settingsWarmup is None:
+            self._settingsWarmup = asyncio.create_task(self.warmSettings([guild.id for guild in self.guilds]))
+        if (
+            self.config.settingsMigrationBatchSize
+            and isinstance(self.guildSettings.store, MongoSettingsStore)
+            and self._settingsMigration is None
+        ):
+            self._settingsMigration = asyncio.create_task(self.migrateSettings())
         await self.sync_commands()
 
+    async def warmSettings(self, guildIds: list[int]) -> None:
+        """Preload every registered settings group of ``guildIds`` into the settings cache."""
+        try:
+            await self.guildSettings.warm(
+                guildIds,
+                list(getSettingsGroups().values()),
+                batchSize=self.config.settingsCache.warmBatchSize,
+                concurrency=self.config.settingsCache.warmConcurrency,
+            )
+        except Exception:
+            logger.exception("Warming the settings cache failed.")
+
+    async def migrateCacheLayout(self) -> None:
+        """Move cached settings written in another Valkey layout into the configured one."""
+        try:
+            await cast(ValkeySettingsCache, self._sharedSettingsCache).migrateLayout()
+        except Exception:
+            logger.exception("Migrating the settings cache layout failed; entries in the old layout are ignored.")
+
+    async def migrateSettings(self) -> None:
+        """Upgrade outdated stored settings in rate-limited background batches (MongoDB only, one replica at a time)."""
+        store = cast(MongoSettingsStore, self.guildSettings.store)
+        migrator = SettingsMigrator(
+            store.collection,
+            list(getSettingsGroups().values()),
+            batchSize=self.config.settingsMigrationBatchSize,
+            delaySeconds=self.config.settingsMigrationDelaySeconds,
+            leaseClient=self._valkeyClient,
+        )
+        try:
+            migrated = await migrator.run()
+        except Exception:
+            logger.exception("Migrating stored settings failed.")
+            return
+        if migrated:
+            logger.info("Migrated %s stored settings groups to their current schema.", migrated)
+
     async def load_cogs(self) -> None:
         """Load all cogs (flat modules and feature packages)."""
         cogs_dir = pathlib.Path(__file__).parent / "cogs"
@@ -88,6 +221,9 @@ class Bot(discord.ext.commands.Bot):
     async def on_guild_available(self, guild: discord.Guild) -> None:
         """When a guild becomes available."""
         logger.debug("Guild %s is available", guild.name)
+        # Guilds that come back after an outage missed the startup warm-up.
+        if self._settingsWarmup is not None and self._settingsWarmup.done():
+            await self.warmSettings([guild.id])
 
     async def on_message(self, message: discord.Message, /) -> None:
         """When a message is sent."""
@@ -0,0 +1,251 @@
+"""MongoDB and Valkey client construction with pool settings and pool metrics."""
+
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+from pymongo import AsyncMongoClient
+from pymongo.monitoring import (
+    ConnectionCheckedInEvent,
+    ConnectionCheckedOutEvent,
+    ConnectionCheckOutFailedEvent,
+    ConnectionCheckOutStartedEvent,
+    ConnectionClosedEvent,
+    ConnectionCreatedEvent,
+    ConnectionPoolListener,
+    ConnectionReadyEvent,
+    PoolClearedEvent,
+    PoolClosedEvent,
+    PoolCreatedEvent,
+)
+from valkey.asyncio import BlockingConnectionPool, Sentinel, Valkey, ValkeyCluster
+from valkey.asyncio.cluster import ClusterNode
+from valkey.asyncio.connection import AbstractConnection
+
+from pibot.config import MongoClientConfig, ValkeyClientConfig
+from pibot.metrics import REGISTRY, Counter, Gauge
+
+MONGODB = "mongodb"
+VALKEY = "valkey"
+
+# ``PIBOT_VALKEY_URI`` schemes that select Valkey Cluster or Sentinel instead of a single node.
+VALKEY_CLUSTER_SCHEMES = ("valkey+cluster", "valkeys+cluster")
+VALKEY_SENTINEL_SCHEMES = ("valkey+sentinel", "valkeys+sentinel")
+DEFAULT_VALKEY_PORT = 6379
+DEFAULT_SENTINEL_PORT = 26379
+
+type ValkeyClient = Valkey | ValkeyCluster
+
+POOL_IN_USE = REGISTRY.register(
+    Gauge("pibot_pool_connections_in_use", "Connections checked out of the client pool.", ("client",))
+)
+POOL_WAITING = REGISTRY.register(
+    Gauge("pibot_pool_checkouts_waiting", "Checkouts waiting for a pooled connection.", ("client",))
+)
+POOL_CREATED = REGISTRY.register(
+    Counter("pibot_pool_connections_created_total", "Connections opened by the client pool.", ("client",))
+)
+
+
+class MongoPoolMetrics(ConnectionPoolListener):
+    """Record MongoDB connection pool usage in the pool metrics."""
+
+    def connection_check_out_started(self, event: ConnectionCheckOutStartedEvent) -> None:
+        """Count a waiting checkout."""
+        POOL_WAITING.inc(client=MONGODB)
+
+    def connection_check_out_failed(self, event: ConnectionCheckOutFailedEvent) -> None:
+        """Stop counting a checkout that timed out or failed."""
+        POOL_WAITING.dec(client=MONGODB)
+
+    def connection_checked_out(self, event: ConnectionCheckedOutEvent) -> None:
+        """Move a checkout from waiting to in use."""
+        POOL_WAITING.dec(client=MONGODB)
+        POOL_IN_USE.inc(client=MONGODB)
+
+    def connection_checked_in(self, event: ConnectionCheckedInEvent) -> None:
+        """Return a connection to the pool."""
+        POOL_IN_USE.dec(client=MONGODB)
+
+    def connection_created(self, event: ConnectionCreatedEvent) -> None:
+        """Count a newly opened connection."""
+        POOL_CREATED.inc(client=MONGODB)
+
+    def connection_ready(self, event: ConnectionReadyEvent) -> None:
+        """Ignore handshake completion."""
+
+    def connection_closed(self, event: ConnectionClosedEvent) -> None:
+        """Ignore closed connections."""
+
+    def pool_created(self, event: PoolCreatedEvent) -> None:
+        """Ignore pool creation."""
+
+    def pool_cleared(self, event: PoolClearedEvent) -> None:
+        """Ignore pool resets."""
+
+    def pool_closed(self, event: PoolClosedEvent) -> None:
+        """Ignore pool shutdown."""
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Blocking Valkey pool that records usage in the pool metrics."""
+
+    async def get_connection(self, command_name: Any, *keys: Any, **options: Any) -> AbstractConnection:
+        """Check out a connection, counting the checkout as waiting until it returns."""
+        POOL_WAITING.inc(client=VALKEY)
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        finally:
+            POOL_WAITING.dec(client=VALKEY)
+        POOL_IN_USE.inc(client=VALKEY)
+        return connection
+
+    async def release(self, connection: AbstractConnection) -> None:
+        """Return a connection to the pool."""
+        await super().release(connection)
+        POOL_IN_USE.dec(client=VALKEY)
+
+    def make_connection(self) -> AbstractConnection:
+        """Open a new connection."""
+        POOL_CREATED.inc(client=VALKEY)
+        return super().make_connection()
+
+
+def createMongoClient(uri: str, config: MongoClientConfig) -> AsyncMongoClient:
+    """Return a MongoDB client with the configured pool, timeouts, compression and read preference."""
+    return AsyncMongoClient(
+        uri,
+        maxPoolSize=config.maxPoolSize,
+        minPoolSize=config.minPoolSize,
+        maxIdleTimeMS=int(config.maxIdleTimeSeconds * 1000),
+        waitQueueTimeoutMS=int(config.waitQueueTimeoutSeconds * 1000),
+        connectTimeoutMS=int(config.connectTimeoutSeconds * 1000),
+        socketTimeoutMS=int(config.socketTimeoutSeconds * 1000),
+        serverSelectionTimeoutMS=int(config.serverSelectionTimeoutSeconds * 1000),
+        compressors=list(config.compressors),
+        zlibCompressionLevel=config.zlibCompressionLevel,
+        readPreference=config.readPreference.value,
+        appname=config.appName,
+        event_listeners=[MongoPoolMetrics()],
+    )
+
+
+def createValkeyClient(uri: str, config: ValkeyClientConfig) -> ValkeyClient:
+    """
+    Return a Valkey client for ``uri`` with the configured limits and timeouts.
+
+    ``valkey://`` and ``valkeys://`` (and the ``redis`` and ``unix`` schemes)
+    connect to one node through a blocking, instrumented pool.
+    ``valkey+cluster://[user:password@]host:port[,host:port...]`` returns a
+    cluster client that discovers the other nodes from these startup nodes.
+    ``valkey+sentinel://[user:password@]host:port[,host:port...]/service[/db]``
+    asks the sentinels for the current primary of ``service`` and follows
+    failovers. The ``valkeys+`` variants use TLS. The credentials apply to the
+    data nodes, not the sentinels.
+    """
+    scheme = urlsplit(uri).scheme
+    if scheme in VALKEY_CLUSTER_SCHEMES:
+        return _createClusterClient(uri, config)
+    if scheme in VALKEY_SENTINEL_SCHEMES:
+        return _createSentinelClient(uri, config, socketTimeoutSeconds=config.socketTimeoutSeconds)
+    pool = InstrumentedConnectionPool.from_url(
+        uri,
+        max_connections=config.maxConnections,
+        timeout=config.poolTimeoutSeconds,
+        socket_timeout=config.socketTimeoutSeconds,
+        socket_connect_timeout=config.connectTimeoutSeconds,
+        health_check_interval=config.healthCheckIntervalSeconds,
+        socket_keepalive=config.socketKeepalive,
+    )
+    return Valkey.from_pool(pool)
+
+
+def createValkeyPubSubClient(uri: str, config: ValkeyClientConfig) -> Valkey:
+    """
+    Return a single-node client for pub/sub and client tracking on ``uri``.
+
+    Subscriptions block until a message arrives, so this client has no read
+    timeout and relies on TCP keepalive instead. For a cluster it connects to
+    the first startup node; cluster ``PUBLISH`` reaches subscribers on every node.
+    """
+    parts = urlsplit(uri)
+    if parts.scheme in VALKEY_SENTINEL_SCHEMES:
+        return _createSentinelClient(uri, config, socketTimeoutSeconds=None)
+    if parts.scheme in VALKEY_CLUSTER_SCHEMES:
+        username, password, nodes = _parseNodes(parts.netloc, DEFAULT_VALKEY_PORT)
+        host, port = nodes[0]
+        return Valkey(
+            host=host,
+            port=port,
+            username=username,
+            password=password,
+            ssl=parts.scheme.startswith("valkeys"),
+            socket_timeout=None,
+            socket_connect_timeout=config.connectTimeoutSeconds,
+            socket_keepalive=config.socketKeepalive,
+        )
+    return Valkey.from_url(
+        uri,
+        socket_timeout=None,
+        socket_connect_timeout=config.connectTimeoutSeconds,
+        socket_keepalive=config.socketKeepalive,
+    )
+
+
+def _parseNodes(netloc: str, defaultPort: int) -> tuple[str | None, str | None, list[tuple[str, int]]]:
+    """Split ``[user:password@]host[:port][,host[:port]...]`` into credentials and ``(host, port)`` pairs."""
+    userinfo, _, hosts = netloc.rpartition("@")
+    username, _, password = userinfo.partition(":")
+    nodes: list[tuple[str, int]] = []
+    for node in hosts.split(","):
+        host, _, port = node.partition(":")
+        if not host:
+            msg = f"Invalid Valkey node {node!r} in {hosts!r}."
+            raise ValueError(msg)
+        nodes.append((host, int(port) if port else defaultPort))
+    return unquote(username) or None, unquote(password) or None, nodes
+
+
+def _createClusterClient(uri: str, config: ValkeyClientConfig) -> ValkeyCluster:
+    """Return a cluster client seeded with the startup nodes of a ``valkey+cluster://`` URI."""
+    parts = urlsplit(uri)
+    username, password, nodes = _parseNodes(parts.netloc, DEFAULT_VALKEY_PORT)
+    return ValkeyCluster(
+        startup_nodes=[ClusterNode(host, port) for host, port in nodes],
+        username=username,
+        password=password,
+        ssl=parts.scheme.startswith("valkeys"),
+        max_connections=config.maxConnections,
+        socket_timeout=config.socketTimeoutSeconds,
+        socket_connect_timeout=config.connectTimeoutSeconds,
+        health_check_interval=config.healthCheckIntervalSeconds,
+        socket_keepalive=config.socketKeepalive,
+    )
+
+
+def _createSentinelClient(uri: str, config: ValkeyClientConfig, *, socketTimeoutSeconds: float | None) -> Valkey:
+    """Return a client for the primary named in a ``valkey+sentinel://`` URI."""
+    parts = urlsplit(uri)
+    username, password, nodes = _parseNodes(parts.netloc, DEFAULT_SENTINEL_PORT)
+    service, _, db = parts.path.strip("/").partition("/")
+    if not service:
+        msg = "Valkey Sentinel URIs need a service name: valkey+sentinel://host:port/service."
+        raise ValueError(msg)
+    sentinel = Sentinel(
+        nodes,
+        sentinel_kwargs={
+            "socket_timeout": config.socketTimeoutSeconds,
+            "socket_connect_timeout": config.connectTimeoutSeconds,
+        },
+    )
+    return sentinel.master_for(
+        service,
+        username=username,
+        password=password,
+        db=int(db or 0),
+        ssl=parts.scheme.startswith("valkeys"),
+        max_connections=config.maxConnections,
+        socket_timeout=socketTimeoutSeconds,
+        socket_connect_timeout=config.connectTimeoutSeconds,
+        health_check_interval=config.healthCheckIntervalSeconds,
+        socket_keepalive=config.socketKeepalive,
+    )
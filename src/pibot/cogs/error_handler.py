@@ -8,6 +8,7 @@ from discord.ext import commands
 
 from pibot.bot import Bot
 from pibot.errors import FeatureDisabled
+from pibot.guild_settings.errors import SettingsUnavailable
 
 LOGGER: logging.Logger = logging.getLogger("errors")
 
@@ -122,6 +123,10 @@ class ExceptionHandler(commands.Cog):
             )
             await send_app_command_error_message(interaction, str(error), error)
 
+        elif isinstance(error, app_commands.CommandInvokeError) and isinstance(error.original, SettingsUnavailable):
+            LOGGER.warning("User %s used %s while guild settings were unavailable.", interaction.user, commandName)
+            await send_app_command_error_message(interaction, str(error.original), error)
+
         elif isinstance(error, app_commands.CommandInvokeError) and isinstance(error.original, commands.BadArgument):
             LOGGER.info(
                 "User %s used %s with invalid arguments. [%s]",
@@ -9,7 +9,7 @@ from discord.ext import commands
 from pibot.bot import Bot
 from pibot.cogs.error_handler import handleInteractionError
 from pibot.guild_settings.errors import GuildSettingsError
-from pibot.guild_settings.settings_ui import sendSettingsPanel
+from pibot.guild_settings.settings_ui import SettingsComponent, sendSettingsPanel
 
 logger = logging.getLogger("cog.settings")
 
@@ -21,6 +21,14 @@ class Settings(commands.Cog):
         """Initialize the cog."""
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        """Route persistent settings panel clicks, including panels sent before a restart."""
+        self.bot.add_dynamic_items(SettingsComponent)
+
+    async def cog_unload(self) -> None:
+        """Stop routing settings panel clicks."""
+        self.bot.remove_dynamic_items(SettingsComponent)
+
     @app_commands.default_permissions(administrator=True)
     @app_commands.command(name="settings", description="Configure bot features for this server.")
     async def settings(self, interaction: discord.Interaction) -> None:
@@ -16,9 +16,10 @@ Guild settings are never read from the environment (MongoDB only). Per-guild
 
 import logging
 from enum import StrEnum
+from typing import Annotated, Self
 
-from pydantic import Field, SecretStr
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field, SecretStr, field_validator, model_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 ENV_PREFIX = "PIBOT_"
 SUMMARIZE_FEATURE = "SUMMARIZE"
@@ -32,6 +33,54 @@ class COMMAND_SYNC_BEHAVIOR(StrEnum):
     LOCAL = "local"
 
 
+class SETTINGS_CACHE_LAYOUT(StrEnum):
+    """Env ``PIBOT_SETTINGS_CACHE_LAYOUT``."""
+
+    KEYS = "keys"
+    HASH = "hash"
+
+
+class SETTINGS_CACHE_CODEC(StrEnum):
+    """Env ``PIBOT_SETTINGS_CACHE_CODEC``."""
+
+    JSON = "json"
+    BINARY = "binary"
+
+
+class SETTINGS_STORE(StrEnum):
+    """Env ``PIBOT_SETTINGS_STORE``."""
+
+    MONGODB = "mongodb"
+    SQLITE = "sqlite"
+
+
+class SETTINGS_CACHE_BACKEND(StrEnum):
+    """Env ``PIBOT_SETTINGS_CACHE_BACKEND``."""
+
+    VALKEY = "valkey"
+    MEMORY = "memory"
+
+
+class MONGODB_READ_PREFERENCE(StrEnum):
+    """Env ``PIBOT_MONGODB_READ_PREFERENCE``."""
+
+    PRIMARY = "primary"
+    PRIMARY_PREFERRED = "primaryPreferred"
+    SECONDARY = "secondary"
+    SECONDARY_PREFERRED = "secondaryPreferred"
+    NEAREST = "nearest"
+
+
+class MONGODB_COMPRESSOR(StrEnum):
+    """
+    Env ``PIBOT_MONGODB_COMPRESSORS`` (comma-separated, most preferred first).
+
+    Only compressors the bundled driver supports without extra packages.
+    """
+
+    ZLIB = "zlib"
+
+
 class CloudflareSettings(BaseSettings):
     """Summarize feature — Cloudflare AI Gateway credentials."""
 
@@ -77,6 +126,120 @@ class TranslationsBotConfig(BaseSettings):
     deepl: DeeplSettings = Field(default_factory=DeeplSettings)
 
 
+class SettingsCacheConfig(BaseSettings):
+    """Guild settings cache tuning (``PIBOT_SETTINGS_CACHE_*``)."""
+
+    model_config = SettingsConfigDict(
+        frozen=True,
+        extra="ignore",
+        env_ignore_empty=True,
+        env_prefix=f"{ENV_PREFIX}SETTINGS_CACHE_",
+        env_prefix_target="alias",
+    )
+
+    backend: SETTINGS_CACHE_BACKEND = Field(default=SETTINGS_CACHE_BACKEND.VALKEY, alias="BACKEND")
+    localMaxSize: int = Field(default=10_000, ge=0, alias="LOCAL_MAX_SIZE")
+    localTtlSeconds: float = Field(default=60.0, gt=0, alias="LOCAL_TTL_SECONDS")
+    layout: SETTINGS_CACHE_LAYOUT = Field(default=SETTINGS_CACHE_LAYOUT.KEYS, alias="LAYOUT")
+    codec: SETTINGS_CACHE_CODEC = Field(default=SETTINGS_CACHE_CODEC.BINARY, alias="CODEC")
+    softTtlSeconds: float = Field(default=300.0, gt=0, alias="SOFT_TTL_SECONDS")
+    hardTtlSeconds: float = Field(default=86_400.0, gt=0, alias="HARD_TTL_SECONDS")
+    watchChanges: bool = Field(default=False, alias="WATCH_CHANGES")
+    warmOnStartup: bool = Field(default=True, alias="WARM_ON_STARTUP")
+    warmBatchSize: int = Field(default=500, ge=1, alias="WARM_BATCH_SIZE")
+    warmConcurrency: int = Field(default=4, ge=1, alias="WARM_CONCURRENCY")
+    writeDelaySeconds: float = Field(default=0.0, ge=0, alias="WRITE_DELAY_SECONDS")
+    tracking: bool = Field(default=False, alias="TRACKING")
+    trackingMaxSize: int = Field(default=10_000, ge=1, alias="TRACKING_MAX_SIZE")
+
+    @model_validator(mode="after")
+    def _softTtlWithinHardTtl(self) -> Self:
+        """Reject a soft TTL longer than the hard TTL."""
+        if self.softTtlSeconds > self.hardTtlSeconds:
+            msg = "SOFT_TTL_SECONDS must not exceed HARD_TTL_SECONDS."
+            raise ValueError(msg)
+        return self
+
+
+class SettingsBreakerConfig(BaseSettings):
+    """Guild settings circuit breakers and last-known-good fallback (``PIBOT_SETTINGS_BREAKER_*``)."""
+
+    model_config = SettingsConfigDict(
+        frozen=True,
+        extra="ignore",
+        env_ignore_empty=True,
+        env_prefix=f"{ENV_PREFIX}SETTINGS_BREAKER_",
+        env_prefix_target="alias",
+    )
+
+    failureThreshold: int = Field(default=5, ge=1, alias="FAILURE_THRESHOLD")
+    resetTimeoutSeconds: float = Field(default=30.0, gt=0, alias="RESET_TIMEOUT_SECONDS")
+    callTimeoutSeconds: float = Field(default=5.0, ge=0, alias="CALL_TIMEOUT_SECONDS")
+    fallbackMaxSize: int = Field(default=10_000, ge=0, alias="FALLBACK_MAX_SIZE")
+
+
+class MongoClientConfig(BaseSettings):
+    """MongoDB connection pool, timeouts and wire options (``PIBOT_MONGODB_*``)."""
+
+    model_config = SettingsConfigDict(
+        frozen=True,
+        extra="ignore",
+        env_ignore_empty=True,
+        env_prefix=f"{ENV_PREFIX}MONGODB_",
+        env_prefix_target="alias",
+    )
+
+    maxPoolSize: int = Field(default=50, ge=1, alias="MAX_POOL_SIZE")
+    minPoolSize: int = Field(default=0, ge=0, alias="MIN_POOL_SIZE")
+    maxIdleTimeSeconds: float = Field(default=300.0, gt=0, alias="MAX_IDLE_TIME_SECONDS")
+    waitQueueTimeoutSeconds: float = Field(default=5.0, gt=0, alias="WAIT_QUEUE_TIMEOUT_SECONDS")
+    connectTimeoutSeconds: float = Field(default=5.0, gt=0, alias="CONNECT_TIMEOUT_SECONDS")
+    socketTimeoutSeconds: float = Field(default=20.0, gt=0, alias="SOCKET_TIMEOUT_SECONDS")
+    serverSelectionTimeoutSeconds: float = Field(default=10.0, gt=0, alias="SERVER_SELECTION_TIMEOUT_SECONDS")
+    compressors: Annotated[tuple[MONGODB_COMPRESSOR, ...], NoDecode] = Field(
+        default=(MONGODB_COMPRESSOR.ZLIB,),
+        alias="COMPRESSORS",
+    )
+    zlibCompressionLevel: int = Field(default=1, ge=-1, le=9, alias="ZLIB_COMPRESSION_LEVEL")
+    readPreference: MONGODB_READ_PREFERENCE = Field(default=MONGODB_READ_PREFERENCE.PRIMARY, alias="READ_PREFERENCE")
+    appName: str = Field(default="pibot", min_length=1, alias="APP_NAME")
+
+    @field_validator("compressors", mode="before")
+    @classmethod
+    def _splitCompressors(cls, value: object) -> object:
+        """Accept ``zlib`` or a comma-separated list from the environment (an empty value disables compression)."""
+        if isinstance(value, str):
+            return tuple(name.strip() for name in value.split(",") if name.strip())
+        return value
+
+    @model_validator(mode="after")
+    def _minPoolWithinMax(self) -> Self:
+        """Reject a minimum pool size above the maximum."""
+        if self.minPoolSize > self.maxPoolSize:
+            msg = "MIN_POOL_SIZE must not exceed MAX_POOL_SIZE."
+            raise ValueError(msg)
+        return self
+
+
+class ValkeyClientConfig(BaseSettings):
+    """Valkey connection pool and socket options (``PIBOT_VALKEY_*``)."""
+
+    model_config = SettingsConfigDict(
+        frozen=True,
+        extra="ignore",
+        env_ignore_empty=True,
+        env_prefix=f"{ENV_PREFIX}VALKEY_",
+        env_prefix_target="alias",
+    )
+
+    maxConnections: int = Field(default=50, ge=1, alias="MAX_CONNECTIONS")
+    poolTimeoutSeconds: float = Field(default=5.0, gt=0, alias="POOL_TIMEOUT_SECONDS")
+    socketTimeoutSeconds: float = Field(default=5.0, gt=0, alias="SOCKET_TIMEOUT_SECONDS")
+    connectTimeoutSeconds: float = Field(default=5.0, gt=0, alias="CONNECT_TIMEOUT_SECONDS")
+    healthCheckIntervalSeconds: int = Field(default=30, ge=0, alias="HEALTH_CHECK_INTERVAL_SECONDS")
+    socketKeepalive: bool = Field(default=True, alias="SOCKET_KEEPALIVE")
+
+
 class BotConfig(BaseSettings):
     """Runtime bot configuration from environment variables."""
 
@@ -89,16 +252,37 @@ class BotConfig(BaseSettings):
     )
 
     discordToken: str = Field(default=..., min_length=1, alias="DISCORD_TOKEN")
-    mongodbUri: str = Field(default=..., min_length=1, alias="MONGODB_URI")
-    valkeyUri: str = Field(default=..., min_length=1, alias="VALKEY_URI")
+    settingsStore: SETTINGS_STORE = Field(default=SETTINGS_STORE.MONGODB, alias="SETTINGS_STORE")
+    settingsSqlitePath: str = Field(default="pibot-settings.db", min_length=1, alias="SETTINGS_SQLITE_PATH")
+    mongodbUri: str = Field(default="", alias="MONGODB_URI")
+    valkeyUri: str = Field(default="", alias="VALKEY_URI")
+    mongodb: MongoClientConfig = Field(default_factory=MongoClientConfig)
+    valkey: ValkeyClientConfig = Field(default_factory=ValkeyClientConfig)
     logLevel: str = Field(default="INFO", alias="LOG_LEVEL")
     summarize: SummarizeBotConfig = Field(default_factory=SummarizeBotConfig)
     translations: TranslationsBotConfig = Field(default_factory=TranslationsBotConfig)
+    settingsCache: SettingsCacheConfig = Field(default_factory=SettingsCacheConfig)
+    settingsBreaker: SettingsBreakerConfig = Field(default_factory=SettingsBreakerConfig)
     commandSyncBehavior: COMMAND_SYNC_BEHAVIOR = Field(
         default=COMMAND_SYNC_BEHAVIOR.GLOBAL,
         alias="COMMAND_SYNC_BEHAVIOR",
     )
     enableDevTools: bool = Field(default=False, alias="ENABLE_DEV_TOOLS")
+    settingsMigrationBatchSize: int = Field(default=100, ge=0, alias="SETTINGS_MIGRATION_BATCH_SIZE")
+    settingsMigrationDelaySeconds: float = Field(default=1.0, ge=0, alias="SETTINGS_MIGRATION_DELAY_SECONDS")
+    metricsHost: str = Field(default="127.0.0.1", alias="METRICS_HOST")
+    metricsPort: int = Field(default=0, ge=0, le=65_535, alias="METRICS_PORT")
+
+    @model_validator(mode="after")
+    def _backendUris(self) -> Self:
+        """Require the connection URI of each selected settings backend."""
+        if self.settingsStore is SETTINGS_STORE.MONGODB and not self.mongodbUri:
+            msg = "MONGODB_URI is required when SETTINGS_STORE is mongodb."
+            raise ValueError(msg)
+        if self.settingsCache.backend is SETTINGS_CACHE_BACKEND.VALKEY and not self.valkeyUri:
+            msg = "VALKEY_URI is required when SETTINGS_CACHE_BACKEND is valkey."
+            raise ValueError(msg)
+        return self
 
     @property
     def logLevelValue(self) -> int:
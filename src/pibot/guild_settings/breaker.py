@@ -0,0 +1,140 @@
+"""Circuit breakers that let guild settings degrade while a backend is down."""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+
+from pymongo.errors import PyMongoError
+from valkey.exceptions import ValkeyError
+
+from pibot.config import SettingsBreakerConfig
+from pibot.guild_settings.metrics import BREAKER_OPENED, BREAKER_STATE
+
+LOGGER = logging.getLogger("guild_settings.breaker")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Errors that count as a backend failure; anything else is a bug and passes through untouched.
+BACKEND_ERRORS: tuple[type[Exception], ...] = (
+    TimeoutError,
+    OSError,
+    ValkeyError,
+    PyMongoError,
+    sqlite3.Error,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open."""
+
+
+# Everything a caller should treat as "backend unavailable".
+UNAVAILABLE_ERRORS: tuple[type[Exception], ...] = (CircuitOpenError, *BACKEND_ERRORS)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one backend.
+
+    After ``failureThreshold`` failed calls in a row (see :data:`BACKEND_ERRORS`,
+    plus calls slower than ``callTimeoutSeconds``) the breaker opens and
+    :meth:`call` raises :class:`CircuitOpenError` without touching the backend.
+    Once ``resetTimeoutSeconds`` have passed, one trial call is let through
+    (half-open); its success closes the breaker and its failure opens it again.
+    The state is exported as ``pibot_settings_breaker_state``.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        *,
+        failureThreshold: int = 5,
+        resetTimeoutSeconds: float = 30.0,
+        callTimeoutSeconds: float | None = None,
+    ) -> None:
+        """Initialize a closed breaker for ``backend`` (also its metrics label)."""
+        self.backend = backend
+        self._failureThreshold = failureThreshold
+        self._resetTimeoutSeconds = resetTimeoutSeconds
+        self._callTimeoutSeconds = callTimeoutSeconds
+        self._failures = 0
+        self._openedAt = 0.0
+        self._trialInFlight = False
+        self._setState(CLOSED)
+
+    @property
+    def state(self) -> str:
+        """Return :data:`CLOSED`, :data:`HALF_OPEN`, or :data:`OPEN`."""
+        return self._state
+
+    @property
+    def isOpen(self) -> bool:
+        """Return whether calls are currently refused without a trial."""
+        return self._state == OPEN and time.monotonic() - self._openedAt < self._resetTimeoutSeconds
+
+    async def call[T](self, operation: Callable[[], Awaitable[T]]) -> T:
+        """Run ``operation`` through the breaker, raising :class:`CircuitOpenError` while it is open."""
+        if not self._acquire():
+            msg = f"The {self.backend} circuit is open."
+            raise CircuitOpenError(msg)
+        trial = self._state == HALF_OPEN
+        try:
+            if self._callTimeoutSeconds is None:
+                result = await operation()
+            else:
+                result = await asyncio.wait_for(operation(), self._callTimeoutSeconds)
+        except BACKEND_ERRORS:
+            self._recordFailure()
+            raise
+        finally:
+            if trial:
+                self._trialInFlight = False
+        self._recordSuccess()
+        return result
+
+    def _acquire(self) -> bool:
+        """Return whether a call may go to the backend now, moving an expired open breaker to half-open."""
+        if self._state == OPEN and time.monotonic() - self._openedAt >= self._resetTimeoutSeconds:
+            self._setState(HALF_OPEN)
+        if self._state == CLOSED:
+            return True
+        if self._state == HALF_OPEN and not self._trialInFlight:
+            self._trialInFlight = True
+            return True
+        return False
+
+    def _recordSuccess(self) -> None:
+        """Reset the failure count and close the breaker."""
+        self._failures = 0
+        if self._state != CLOSED:
+            LOGGER.info("The %s circuit is closed again.", self.backend)
+            self._setState(CLOSED)
+
+    def _recordFailure(self) -> None:
+        """Count a failure and open the breaker at the threshold or after a failed trial."""
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self._failureThreshold):
+            LOGGER.warning("The %s circuit opened after %s failures.", self.backend, self._failures)
+            self._openedAt = time.monotonic()
+            self._setState(OPEN)
+            BREAKER_OPENED.inc(backend=self.backend)
+
+    def _setState(self, state: str) -> None:
+        """Switch state and export it."""
+        self._state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], backend=self.backend)
+
+
+def createBreaker(backend: str, config: SettingsBreakerConfig) -> CircuitBreaker:
+    """Return a breaker for ``backend`` with the configured threshold and timeouts."""
+    return CircuitBreaker(
+        backend,
+        failureThreshold=config.failureThreshold,
+        resetTimeoutSeconds=config.resetTimeoutSeconds,
+        callTimeoutSeconds=config.callTimeoutSeconds or None,
+    )
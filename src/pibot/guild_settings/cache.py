@@ -1,17 +1,222 @@
 """Cache backends for guild settings."""
 
-from typing import Protocol
+import asyncio
+import hashlib
+import logging
+import re
+import struct
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Protocol, cast
 
-from valkey.asyncio import Valkey
+import bson
+from bson.errors import InvalidBSON
+from valkey.asyncio import Valkey, ValkeyCluster
+from valkey.asyncio.client import Pipeline
+from valkey.asyncio.cluster import ClusterPipeline
+from valkey.exceptions import NoScriptError, ValkeyError
 
+from pibot.clients import ValkeyClient
+from pibot.config import SETTINGS_CACHE_CODEC, SETTINGS_CACHE_LAYOUT
+from pibot.guild_settings.breaker import BACKEND_ERRORS, CircuitBreaker, CircuitOpenError
+from pibot.guild_settings.metrics import ALL_GROUPS, countResult, timeOperation
 from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import getCodec, getSettingsGroups
+
+LOGGER = logging.getLogger("guild_settings.cache")
 
 CACHE_KEY_PREFIX = "pibot:settings"
+INVALIDATION_CHANNEL = f"{CACHE_KEY_PREFIX}:invalidate"
+LAYOUT_MARKER_KEY = f"{CACHE_KEY_PREFIX}:layout"
+# Cached value for a group with nothing stored; decodes to the shared defaults instance.
+DEFAULTS_MARKER = ""
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+# Channel Valkey publishes client-tracking invalidations on (RESP2 redirect mode).
+TRACKING_CHANNEL = "__redis__:invalidate"
+# First byte of every binary cache value; bump when the binary layout changes.
+BINARY_FORMAT = b"\x01"
+# Stores ARGV[1] under KEYS[1] (or its hash field ARGV[4]) as ``v<version>:<value>`` unless the
+# cached entry has a higher version; unversioned entries count as version 0. ARGV[3] is the
+# expiry in milliseconds, empty for none.
+SET_IF_NEWER_SCRIPT = """
+local field = ARGV[4]
+local current
+if field == "" then
+  current = redis.call("GET", KEYS[1])
+else
+  current = redis.call("HGET", KEYS[1], field)
+end
+if current and tonumber(ARGV[2]) < (tonumber(string.match(current, "^v(%d+):")) or 0) then
+  return 0
+end
+local value = "v" .. ARGV[2] .. ":" .. ARGV[1]
+if field == "" then
+  if ARGV[3] == "" then
+    redis.call("SET", KEYS[1], value)
+  else
+    redis.call("SET", KEYS[1], value, "PX", ARGV[3])
+  end
+else
+  redis.call("HSET", KEYS[1], field, value)
+  if ARGV[3] ~= "" then
+    redis.call("PEXPIRE", KEYS[1], ARGV[3])
+  end
+end
+return 1
+"""
+SET_IF_NEWER_SHA = hashlib.sha1(SET_IF_NEWER_SCRIPT.encode()).hexdigest()
+
+
+# Cache keys with or without the ``{guild}`` hash tag (keys written before cluster support have none).
+_FEATURE_KEY = re.compile(rf"{re.escape(CACHE_KEY_PREFIX)}:\{{?(\d+)\}}?:([^:]+)")
+_GUILD_KEY = re.compile(rf"{re.escape(CACHE_KEY_PREFIX)}:\{{?(\d+)\}}?")
+# Format byte, model schema hash, storedAt.
+_BINARY_HEADER = struct.Struct(">c8sq")
 
 
 def cacheKey(guildId: int, featureName: str) -> str:
     """Return the Valkey key for one guild feature settings group."""
-    return f"{CACHE_KEY_PREFIX}:{guildId}:{featureName}"
+    return f"{guildCacheKey(guildId)}:{featureName}"
+
+
+def guildCacheKey(guildId: int) -> str:
+    """
+    Return the Valkey hash key holding every settings group of one guild (``hash`` layout).
+
+    The guild ID is a hash tag, so in Valkey Cluster every key of one guild
+    lives in the same slot and multi-key reads of a guild stay single-slot.
+    """
+    return f"{CACHE_KEY_PREFIX}:{{{guildId}}}"
+
+
+@dataclass(frozen=True, slots=True)
+class CacheEntry[T: SettingsGroup]:
+    """A cached settings group, whether it is past the soft TTL, and the guild version it was cached at."""
+
+    value: T
+    stale: bool = False
+    # 0 when the entry was cached without a version.
+    version: int = 0
+
+
+def encodeCached(config: SettingsGroup, storedAt: int) -> str:
+    """
+    Serialize a settings group for Valkey as ``<storedAt>:<payload>``.
+
+    ``storedAt`` is the Unix time of the write; the payload is
+    :data:`DEFAULTS_MARKER` for all-default groups, otherwise model JSON.
+    """
+    payload = DEFAULTS_MARKER if config == getCodec(type(config)).defaults else config.model_dump_json()
+    return f"{storedAt}:{payload}"
+
+
+def decodeCached[T: SettingsGroup](model: type[T], raw: bytes | str) -> tuple[T, int | None]:
+    """Deserialize a cached settings group and its write time (``None`` for entries written without one)."""
+    payload = _text(raw)
+    storedAt: int | None = None
+    head, separator, rest = payload.partition(":")
+    if separator and head.isdigit():
+        storedAt, payload = int(head), rest
+    if payload == DEFAULTS_MARKER:
+        defaults = getCodec(model).defaults
+        if defaults is not None:
+            return cast(T, defaults), storedAt
+    return model.model_validate_json(payload), storedAt
+
+
+def splitVersion(raw: bytes | str) -> tuple[bytes | str, int]:
+    """Split a cached value into the payload and the ``v<version>:`` prefix added by :data:`SET_IF_NEWER_SCRIPT`."""
+    if isinstance(raw, bytes):
+        if raw[:1] != b"v":
+            return raw, 0
+        head, _, payload = raw.partition(b":")
+        return payload, int(head[1:])
+    if raw[:1] != "v":
+        return raw, 0
+    head, _, payload = raw.partition(":")
+    return payload, int(head[1:])
+
+
+def _text(value: bytes | str) -> str:
+    """Decode a Valkey reply that may be bytes or text depending on client options."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def invalidationMessage(sender: str, guildId: int, names: Sequence[str] | None) -> str:
+    """Return the :data:`INVALIDATION_CHANNEL` message telling every replica except ``sender`` to drop groups."""
+    groups = "*" if names is None else ",".join(names)
+    return f"{sender}:{guildId}:{groups}"
+
+
+class CacheCodec(Protocol):
+    """Turns settings groups into Valkey values and back."""
+
+    def encode(self, config: SettingsGroup, storedAt: int) -> bytes | str:
+        """Serialize a settings group written at Unix time ``storedAt``."""
+
+    def decode[T: SettingsGroup](self, model: type[T], raw: bytes | str) -> tuple[T, int | None] | None:
+        """Deserialize a value and its write time, or return ``None`` when it cannot be used."""
+
+
+class JsonCacheCodec:
+    """Text values in the :func:`encodeCached` format, validated with pydantic on every hit."""
+
+    def encode(self, config: SettingsGroup, storedAt: int) -> str:
+        """Serialize as ``<storedAt>:<model JSON>``."""
+        return encodeCached(config, storedAt)
+
+    def decode[T: SettingsGroup](self, model: type[T], raw: bytes | str) -> tuple[T, int | None] | None:
+        """Deserialize with full validation; unreadable values are misses."""
+        try:
+            return decodeCached(model, raw)
+        except ValueError:
+            return None
+
+
+class BinaryCacheCodec:
+    """
+    Compact values: a fixed header and a BSON body of positional field values.
+
+    The header holds a format byte, the model's schema hash, and ``storedAt``;
+    all-default groups have no body. Hits whose schema hash matches the running
+    model are rebuilt without re-validating (see
+    :meth:`~pibot.guild_settings.codec.SettingsCodec.fromTrusted`). Values from
+    another schema or format are misses, so deploys that change a model simply
+    repopulate its entries. Requires a client that returns bytes (the default).
+    """
+
+    def encode(self, config: SettingsGroup, storedAt: int) -> bytes:
+        """Serialize as header plus BSON body (header only for all-default groups)."""
+        codec = getCodec(type(config))
+        header = _BINARY_HEADER.pack(BINARY_FORMAT, codec.schemaHash, storedAt)
+        if config == codec.defaults:
+            return header
+        return header + bson.encode({"v": codec.toPositional(config)})
+
+    def decode[T: SettingsGroup](self, model: type[T], raw: bytes | str) -> tuple[T, int | None] | None:
+        """Deserialize a value written for the same schema; anything else is a miss."""
+        if not isinstance(raw, bytes) or len(raw) < _BINARY_HEADER.size:
+            return None
+        binaryFormat, schemaHash, storedAt = _BINARY_HEADER.unpack_from(raw)
+        codec = getCodec(model)
+        if binaryFormat != BINARY_FORMAT or schemaHash != codec.schemaHash:
+            return None
+        body = raw[_BINARY_HEADER.size :]
+        if not body:
+            return None if codec.defaults is None else (cast(T, codec.defaults), storedAt)
+        try:
+            return cast(T, codec.fromTrusted(bson.decode(body)["v"])), storedAt
+        except InvalidBSON, KeyError, ValueError:
+            return None
+
+
+CACHE_CODECS: dict[SETTINGS_CACHE_CODEC, type[CacheCodec]] = {
+    SETTINGS_CACHE_CODEC.JSON: JsonCacheCodec,
+    SETTINGS_CACHE_CODEC.BINARY: BinaryCacheCodec,
+}
 
 
 class SettingsCache(Protocol):
@@ -20,31 +225,864 @@ class SettingsCache(Protocol):
     async def get[T: SettingsGroup](self, guildId: int, model: type[T]) -> T | None:
         """Return a cached settings group, or ``None`` on miss."""
 
-    async def set(self, guildId: int, config: SettingsGroup) -> None:
-        """Store a settings group in the cache."""
+    async def getEntry[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return a cached settings group with its staleness, or ``None`` on miss."""
+
+    async def getMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Return cached settings groups by name; misses are omitted."""
+
+    async def set(
+        self,
+        guildId: int,
+        config: SettingsGroup,
+        *,
+        broadcast: bool = False,
+        version: int | None = None,
+    ) -> None:
+        """
+        Store a settings group; ``broadcast`` tells other replicas to drop their local copies.
+
+        With ``version`` (the guild settings version the config was read or
+        written at) the write is skipped when a newer version is cached;
+        entries written without one count as version 0.
+        """
+
+    async def setMany(
+        self,
+        guildId: int,
+        configs: Sequence[SettingsGroup],
+        *,
+        version: int | None = None,
+    ) -> None:
+        """Store several settings groups for one guild, skipping those cached at a newer ``version``."""
+
+    async def setBulk(self, groups: Mapping[int, Sequence[SettingsGroup]], *, version: int | None = None) -> None:
+        """Store settings groups for many guilds at once."""
+
+    async def invalidate(self, guildId: int, names: Sequence[str] | None = None) -> None:
+        """Drop cached settings groups of one guild (every group when ``names`` is ``None``)."""
 
     async def close(self) -> None:
         """Release cache resources."""
 
 
 class ValkeySettingsCache:
-    """Valkey-backed settings cache for multi-replica deployments."""
+    """
+    Valkey-backed settings cache for multi-replica deployments.
+
+    The ``keys`` layout stores one string per guild feature (:func:`cacheKey`).
+    The ``hash`` layout stores one hash per guild (:func:`guildCacheKey`) with a
+    field per feature, so bulk reads are one ``HMGET`` and invalidating a guild
+    is one ``DEL``. :meth:`migrateLayout` moves entries between the two.
 
-    def __init__(self, client: Valkey) -> None:
-        """Initialize with an async Valkey client."""
+    Entries older than ``softTtlSeconds`` are returned as stale so the caller
+    can refresh them in the background; entries older than ``hardTtlSeconds``
+    are misses and expire in Valkey. Values are written with ``codec``
+    (:class:`BinaryCacheCodec` by default); values it cannot decode are misses.
+    Writes that carry a ``version`` go through :data:`SET_IF_NEWER_SCRIPT`, so
+    an older snapshot never replaces an entry cached at a newer version.
+
+    With ``tracking``, :meth:`start` opens a dedicated connection that turns on
+    Valkey client tracking (broadcast mode for :data:`CACHE_KEY_PREFIX`) and
+    subscribes to the invalidations redirected to it. Decoded reads are then
+    kept in a local table of up to ``trackingMaxSize`` keys and served without
+    a round trip until Valkey reports the key changed or expired. The table is
+    only used while that connection is up and is emptied whenever it drops.
+    The connection comes from ``pubSubClient`` (``client`` by default). Tracking
+    is not available with a cluster client, whose keys live on several nodes.
+    """
+
+    def __init__(
+        self,
+        client: ValkeyClient,
+        *,
+        pubSubClient: Valkey | None = None,
+        layout: SETTINGS_CACHE_LAYOUT = SETTINGS_CACHE_LAYOUT.KEYS,
+        softTtlSeconds: float | None = None,
+        hardTtlSeconds: float | None = None,
+        codec: CacheCodec | None = None,
+        tracking: bool = False,
+        trackingMaxSize: int = 10_000,
+    ) -> None:
+        """Initialize with an async Valkey client, storage layout, optional TTLs, value codec, and tracking."""
         self._client = client
+        self._pubSubClient = pubSubClient
+        self._layout = layout
+        self._codec = codec or BinaryCacheCodec()
+        self._softTtlSeconds = softTtlSeconds
+        self._hardTtlSeconds = hardTtlSeconds
+        self._tracking = tracking
+        self._trackingMaxSize = trackingMaxSize
+        self._tracked: OrderedDict[str, dict[str, tuple[SettingsGroup, int | None, int]]] = OrderedDict()
+        self._trackingReady = False
+        # Bumped on every invalidation so reads racing one are not remembered.
+        self._trackingGeneration = 0
+        self._tracker: asyncio.Task[None] | None = None
+
+    @property
+    def layout(self) -> SETTINGS_CACHE_LAYOUT:
+        """Return the storage layout used for reads and writes."""
+        return self._layout
+
+    @property
+    def trackingActive(self) -> bool:
+        """Return whether reads are currently served from the client-tracking table."""
+        return self._trackingReady
 
     async def get[T: SettingsGroup](self, guildId: int, model: type[T]) -> T | None:
         """Return a cached settings group, or ``None`` on miss."""
-        raw = await self._client.get(cacheKey(guildId, model.name))
-        if raw is None:
+        entry = await self.getEntry(guildId, model)
+        return None if entry is None else entry.value
+
+    async def getEntry[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return a cached settings group with its staleness, or ``None`` on miss or past the hard TTL."""
+        if self._trackingReady:
+            entry = self._trackedEntry(guildId, model)
+            countResult("tracking", "get", model.name, "miss" if entry is None else "hit")
+            if entry is not None:
+                return entry
+        generation = self._trackingGeneration
+        with timeOperation("valkey", "get", model.name) as timer:
+            if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+                pending = self._client.hget(guildCacheKey(guildId), model.name)
+            else:
+                pending = self._client.get(cacheKey(guildId, model.name))
+            raw = await cast(Awaitable[bytes | None], pending)
+            decoded = None if raw is None else self._decode(model, raw)
+            entry = None if decoded is None else self._classify(*decoded)
+            timer.result = "miss" if entry is None else "hit"
+        if entry is not None and decoded is not None:
+            self._remember(guildId, model.name, decoded, generation)
+        return entry
+
+    async def getMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Return cached settings groups by name with one ``HMGET`` or ``MGET`` for untracked groups."""
+        found: dict[str, SettingsGroup] = {}
+        if self._trackingReady:
+            misses: list[type[SettingsGroup]] = []
+            for model in models:
+                entry = self._trackedEntry(guildId, model)
+                countResult("tracking", "getMany", model.name, "miss" if entry is None else "hit")
+                if entry is None:
+                    misses.append(model)
+                else:
+                    found[model.name] = entry.value
+            models = misses
+        if not models:
+            return found
+        generation = self._trackingGeneration
+        with timeOperation("valkey", "getMany", ALL_GROUPS):
+            if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+                pending = self._client.hmget(guildCacheKey(guildId), [model.name for model in models])
+            else:
+                pending = self._client.mget([cacheKey(guildId, model.name) for model in models])
+            raws = await cast(Awaitable[list[bytes | None]], pending)
+        for model, raw in zip(models, raws):
+            decoded = None if raw is None else self._decode(model, raw)
+            entry = None if decoded is None else self._classify(*decoded)
+            countResult("valkey", "getMany", model.name, "miss" if entry is None else "hit")
+            if entry is not None and decoded is not None:
+                found[model.name] = entry.value
+                self._remember(guildId, model.name, decoded, generation)
+        return found
+
+    async def set(
+        self,
+        guildId: int,
+        config: SettingsGroup,
+        *,
+        broadcast: bool = False,
+        version: int | None = None,
+    ) -> None:
+        """Store a settings group in the cache; Valkey is shared, so ``broadcast`` needs no extra work."""
+        await self.setMany(guildId, [config], version=version)
+
+    async def setMany(
+        self,
+        guildId: int,
+        configs: Sequence[SettingsGroup],
+        *,
+        version: int | None = None,
+    ) -> None:
+        """Store several settings groups in one round trip."""
+        await self.setBulk({guildId: configs}, version=version)
+
+    async def setBulk(self, groups: Mapping[int, Sequence[SettingsGroup]], *, version: int | None = None) -> None:
+        """
+        Store settings groups for many guilds in one pipelined round trip.
+
+        Versioned writes run :data:`SET_IF_NEWER_SCRIPT` per entry, so the
+        version check and the write are atomic in Valkey.
+        """
+        if not any(groups.values()):
+            return
+        names = {type(config).name for configs in groups.values() for config in configs}
+        group = names.pop() if len(names) == 1 else ALL_GROUPS
+        storedAt = int(time.time())
+        with timeOperation("valkey", "set", group):
+            if version is None:
+                await self._writeBulk(groups, storedAt)
+                return
+            try:
+                await self._writeIfNewer(groups, storedAt, version)
+            except NoScriptError:
+                # First write since the server started (or flushed its script cache).
+                await self._client.script_load(SET_IF_NEWER_SCRIPT)
+                await self._writeIfNewer(groups, storedAt, version)
+
+    async def _writeIfNewer(self, groups: Mapping[int, Sequence[SettingsGroup]], storedAt: int, version: int) -> None:
+        """Write encoded settings groups through :data:`SET_IF_NEWER_SCRIPT` in one pipeline."""
+        self._forget(
+            self._trackingKey(guildId, type(config).name) for guildId, configs in groups.items() for config in configs
+        )
+        ttlMs = "" if self._hardTtlMs is None else str(self._hardTtlMs)
+        async with self._client.pipeline(transaction=False) as pipe:
+            for guildId, configs in groups.items():
+                for config in configs:
+                    name = type(config).name
+                    # Script arguments are annotated as str; binary values are sent as-is.
+                    value = cast(str, self._codec.encode(config, storedAt))
+                    if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+                        pipe.evalsha(SET_IF_NEWER_SHA, 1, guildCacheKey(guildId), value, str(version), ttlMs, name)
+                    else:
+                        pipe.evalsha(SET_IF_NEWER_SHA, 1, cacheKey(guildId, name), value, str(version), ttlMs, "")
+            await pipe.execute()
+
+    async def _writeBulk(self, groups: Mapping[int, Sequence[SettingsGroup]], storedAt: int) -> None:
+        """Write encoded settings groups for many guilds in one pipeline."""
+        self._forget(
+            self._trackingKey(guildId, type(config).name) for guildId, configs in groups.items() for config in configs
+        )
+        async with self._client.pipeline(transaction=False) as pipe:
+            for guildId, configs in groups.items():
+                if not configs:
+                    continue
+                if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+                    mapping = {type(config).name: self._codec.encode(config, storedAt) for config in configs}
+                    pipe.hset(guildCacheKey(guildId), mapping=mapping)
+                    if self._hardTtlMs is not None:
+                        pipe.pexpire(guildCacheKey(guildId), self._hardTtlMs)
+                    continue
+                for config in configs:
+                    key = cacheKey(guildId, type(config).name)
+                    pipe.set(key, self._codec.encode(config, storedAt), px=self._hardTtlMs)
+            await pipe.execute()
+
+    async def invalidate(self, guildId: int, names: Sequence[str] | None = None) -> None:
+        """Drop cached settings groups of one guild (every group when ``names`` is ``None``)."""
+        group = names[0] if names is not None and len(names) == 1 else ALL_GROUPS
+        with timeOperation("valkey", "invalidate", group):
+            await self._invalidate(guildId, names)
+
+    async def _invalidate(self, guildId: int, names: Sequence[str] | None) -> None:
+        """Delete the hash, hash fields, or keys holding the given groups."""
+        if names is None:
+            self._forgetGuild(guildId)
+        else:
+            self._forget(self._trackingKey(guildId, name) for name in names)
+        if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+            if names is None:
+                await self._client.delete(guildCacheKey(guildId))
+            elif names:
+                await cast(Awaitable[int], self._client.hdel(guildCacheKey(guildId), *names))
+            return
+        # Every registered group rather than a SCAN, which would walk the whole keyspace on every primary.
+        keys = [cacheKey(guildId, name) for name in (getSettingsGroups() if names is None else names)]
+        if keys:
+            await cast(Awaitable[int], self._client.unlink(*keys))
+
+    async def invalidateBulk(self, groups: Mapping[int, Sequence[str]], *, broadcast: bool = False) -> None:
+        """
+        Drop the named settings groups of many guilds in one pipelined round trip.
+
+        With ``broadcast``, the same pipeline tells every replica's local cache to drop them too.
+        """
+        if not any(groups.values()):
+            return
+        self._forget(self._trackingKey(guildId, name) for guildId, names in groups.items() for name in names)
+        with timeOperation("valkey", "invalidate", ALL_GROUPS):
+            async with self._client.pipeline(transaction=False) as pipe:
+                for guildId, names in groups.items():
+                    if not names:
+                        continue
+                    if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+                        pipe.hdel(guildCacheKey(guildId), *names)
+                    else:
+                        pipe.unlink(*(cacheKey(guildId, name) for name in names))
+                    if broadcast and isinstance(pipe, Pipeline):
+                        pipe.publish(INVALIDATION_CHANNEL, invalidationMessage("bulk", guildId, names))
+                await pipe.execute()
+            if broadcast and isinstance(self._client, ValkeyCluster):
+                await self._publishBulk(groups)
+
+    async def _publishBulk(self, groups: Mapping[int, Sequence[str]]) -> None:
+        """Publish bulk invalidations through the single-node client; cluster clients cannot ``PUBLISH``."""
+        if self._pubSubClient is None:
+            LOGGER.warning("Other replicas keep their local settings copies: no pub/sub client for the cluster.")
+            return
+        async with self._pubSubClient.pipeline(transaction=False) as pipe:
+            for guildId, names in groups.items():
+                if names:
+                    pipe.publish(INVALIDATION_CHANNEL, invalidationMessage("bulk", guildId, names))
+            await pipe.execute()
+
+    async def migrateLayout(self, *, batchSize: int = 500) -> int:
+        """
+        Move entries written in another layout or key format into the configured one and return how many moved.
+
+        Covers the other layout and keys written without the ``{guild}`` hash
+        tag. Skipped when :data:`LAYOUT_MARKER_KEY` already records the
+        configured layout. Entries already present in the target layout win,
+        so a migration racing live writes never restores an older value.
+        """
+        if _text(await self._client.get(LAYOUT_MARKER_KEY) or b"") == self._layout.value:
+            return 0
+        targetType = "hash" if self._layout is SETTINGS_CACHE_LAYOUT.HASH else "string"
+        moved = 0
+        for keyType, keyPattern, move in (
+            ("string", _FEATURE_KEY, self._moveStrings),
+            ("hash", _GUILD_KEY, self._moveHashes),
+        ):
+            batch: list[str] = []
+            async for rawKey in self._client.scan_iter(match=f"{CACHE_KEY_PREFIX}:*", count=batchSize, _type=keyType):
+                key = _text(rawKey)
+                if keyPattern.fullmatch(key) is None or (keyType == targetType and "{" in key):
+                    continue
+                batch.append(key)
+                if len(batch) >= batchSize:
+                    moved += await move(batch)
+                    batch = []
+            if batch:
+                moved += await move(batch)
+        await self._client.set(LAYOUT_MARKER_KEY, self._layout.value)
+        self._forgetAll()
+        if moved:
+            LOGGER.info("Migrated %s cached settings entries to the %s layout.", moved, self._layout.value)
+        return moved
+
+    async def _moveStrings(self, keys: list[str]) -> int:
+        """Copy per-feature string keys into the configured layout and remove them."""
+        # One GET per key: a batch spans many guilds, so an MGET would be cross-slot in a cluster.
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(key)
+            raws = await pipe.execute()
+        moved = 0
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, raw in zip(keys, raws):
+                match = _FEATURE_KEY.fullmatch(key)
+                if raw is None or match is None:
+                    continue
+                self._copyEntry(pipe, int(match.group(1)), match.group(2), raw)
+                moved += 1
+            for key in keys:
+                pipe.unlink(key)
+            await pipe.execute()
+        return moved
+
+    async def _moveHashes(self, keys: list[str]) -> int:
+        """Copy per-guild hash fields into the configured layout and remove the hashes."""
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            hashes = await pipe.execute()
+        moved = 0
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, fields in zip(keys, hashes):
+                match = _GUILD_KEY.fullmatch(key)
+                if match is None:
+                    continue
+                for name, raw in fields.items():
+                    self._copyEntry(pipe, int(match.group(1)), _text(name), raw)
+                    moved += 1
+            for key in keys:
+                pipe.unlink(key)
+            await pipe.execute()
+        return moved
+
+    def _copyEntry(self, pipe: Pipeline | ClusterPipeline, guildId: int, name: str, raw: bytes) -> None:
+        """Queue writing one raw entry in the configured layout unless that entry is already cached there."""
+        if self._layout is SETTINGS_CACHE_LAYOUT.HASH:
+            pipe.hsetnx(guildCacheKey(guildId), name, cast(str, raw))
+            if self._hardTtlMs is not None:
+                pipe.pexpire(guildCacheKey(guildId), self._hardTtlMs)
+        else:
+            pipe.set(cacheKey(guildId, name), raw, nx=True, px=self._hardTtlMs)
+
+    @property
+    def _hardTtlMs(self) -> int | None:
+        """Return the hard TTL in milliseconds for Valkey expiry, or ``None`` when disabled."""
+        return None if self._hardTtlSeconds is None else int(self._hardTtlSeconds * 1000)
+
+    def _decode[T: SettingsGroup](self, model: type[T], raw: bytes | str) -> tuple[T, int | None, int] | None:
+        """Decode a raw value into the group, its write time, and its version, or ``None`` when unusable."""
+        payload, version = splitVersion(raw)
+        decoded = self._codec.decode(model, payload)
+        return None if decoded is None else (*decoded, version)
+
+    def _classify[T: SettingsGroup](self, value: T, storedAt: int | None, version: int) -> CacheEntry[T] | None:
+        """Return a decoded value as a fresh or stale entry, or ``None`` past the hard TTL."""
+        if storedAt is None:
+            # Written before entries carried a timestamp: serve once and refresh.
+            return CacheEntry(value, stale=True, version=version)
+        age = time.time() - storedAt
+        if self._hardTtlSeconds is not None and age > self._hardTtlSeconds:
             return None
-        return model.model_validate_json(raw)
+        stale = self._softTtlSeconds is not None and age > self._softTtlSeconds
+        return CacheEntry(value, stale=stale, version=version)
 
-    async def set(self, guildId: int, config: SettingsGroup) -> None:
-        """Store a settings group in the cache."""
-        await self._client.set(cacheKey(guildId, type(config).name), config.model_dump_json())
+    def start(self) -> None:
+        """Start the client-tracking connection (no-op unless ``tracking`` is enabled)."""
+        if self._tracking and isinstance(self._client, ValkeyCluster):
+            LOGGER.warning("Settings cache client tracking is not supported with Valkey Cluster; it stays off.")
+            return
+        if self._tracking and (self._tracker is None or self._tracker.done()):
+            self._tracker = asyncio.create_task(self._track(), name="settings-cache-tracking")
+
+    async def stop(self) -> None:
+        """Stop client tracking and drop the tracked table."""
+        if self._tracker is not None:
+            self._tracker.cancel()
+            try:
+                await self._tracker
+            except asyncio.CancelledError:
+                pass
+            self._tracker = None
+        self._forgetAll()
 
     async def close(self) -> None:
-        """Close the Valkey client."""
+        """Stop client tracking and close the Valkey clients."""
+        await self.stop()
         await self._client.aclose()
+        if self._pubSubClient is not None and self._pubSubClient is not self._client:
+            await self._pubSubClient.aclose()
+
+    def _trackingKey(self, guildId: int, name: str) -> str:
+        """Return the Valkey key that holds one settings group in the configured layout."""
+        return guildCacheKey(guildId) if self._layout is SETTINGS_CACHE_LAYOUT.HASH else cacheKey(guildId, name)
+
+    def _trackedEntry[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return a tracked settings group, or ``None`` when it is not tracked or past the hard TTL."""
+        key = self._trackingKey(guildId, model.name)
+        values = self._tracked.get(key)
+        tracked = None if values is None else values.get(model.name)
+        if tracked is None or not isinstance(tracked[0], model):
+            return None
+        self._tracked.move_to_end(key)
+        return self._classify(tracked[0], tracked[1], tracked[2])
+
+    def _remember(
+        self,
+        guildId: int,
+        name: str,
+        decoded: tuple[SettingsGroup, int | None, int],
+        generation: int,
+    ) -> None:
+        """Track a decoded read unless an invalidation arrived since the read started."""
+        if not self._trackingReady or generation != self._trackingGeneration:
+            return
+        key = self._trackingKey(guildId, name)
+        self._tracked.setdefault(key, {})[name] = decoded
+        self._tracked.move_to_end(key)
+        while len(self._tracked) > self._trackingMaxSize:
+            self._tracked.popitem(last=False)
+
+    def _forget(self, keys: Iterable[str]) -> None:
+        """Drop tracked keys after a local write or an invalidation push."""
+        self._trackingGeneration += 1
+        for key in keys:
+            self._tracked.pop(key, None)
+
+    def _forgetGuild(self, guildId: int) -> None:
+        """Drop every tracked key of one guild."""
+        prefix = f"{guildCacheKey(guildId)}:"
+        self._forget([key for key in self._tracked if key == guildCacheKey(guildId) or key.startswith(prefix)])
+
+    def _forgetAll(self) -> None:
+        """Drop the whole tracked table."""
+        self._trackingGeneration += 1
+        self._tracked.clear()
+
+    def _handleTrackingPush(self, data: object) -> None:
+        """Apply one invalidation push: a list of changed keys, or ``None`` after a flush."""
+        if isinstance(data, list):
+            self._forget(_text(key) for key in data)
+        else:
+            self._forgetAll()
+
+    async def _track(self) -> None:
+        """Keep a connection with client tracking redirected to itself, re-establishing it after failures."""
+        while True:
+            pubsub = cast(Valkey, self._pubSubClient or self._client).pubsub()
+            try:
+                await pubsub.connect()
+                connection = pubsub.connection
+                assert connection is not None
+                await connection.send_command("CLIENT", "ID")
+                clientId = await connection.read_response()
+                await connection.send_command(
+                    "CLIENT", "TRACKING", "ON", "REDIRECT", clientId, "BCAST", "PREFIX", f"{CACHE_KEY_PREFIX}:"
+                )
+                await connection.read_response()
+                await pubsub.subscribe(TRACKING_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self._forgetAll()
+                        self._trackingReady = True
+                        LOGGER.debug("Settings cache client tracking is active (client %s).", clientId)
+                    elif message["type"] == "message":
+                        self._handleTrackingPush(message["data"])
+            except ValkeyError, OSError:
+                LOGGER.warning("Settings cache client tracking lost; retrying.", exc_info=True)
+            finally:
+                self._trackingReady = False
+                self._forgetAll()
+                await pubsub.aclose()
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+class LocalSettingsCache:
+    """
+    Bounded in-process LRU/TTL layer in front of another settings cache.
+
+    Hits are served from memory without network I/O. Broadcast writes are
+    published on :data:`INVALIDATION_CHANNEL` so other replicas drop their
+    local copy and re-read the shared cache on the next load.
+
+    Versioned writes only reach the wrapped cache, which keeps the newest
+    version; the local copy is dropped and re-read from there on the next load.
+
+    Calls to the shared cache and pub/sub go through ``breaker``. While it is
+    failing, local hits are still served, shared reads count as misses, and
+    shared writes and invalidations are skipped.
+    """
+
+    def __init__(
+        self,
+        inner: SettingsCache,
+        client: Valkey,
+        *,
+        maxSize: int = 10_000,
+        ttlSeconds: float = 60.0,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """Initialize with the shared cache to wrap and a single-node Valkey client for pub/sub."""
+        self._inner = inner
+        self._client = client
+        self.breaker = breaker or CircuitBreaker("valkey")
+        self._maxSize = maxSize
+        self._ttlSeconds = ttlSeconds
+        self._entries: OrderedDict[tuple[int, str], tuple[float, SettingsGroup, int]] = OrderedDict()
+        # Bumped per guild on eviction and for all guilds on clear, so reads racing one are not remembered.
+        self._generations: dict[int, int] = {}
+        self._clears = 0
+        self._instanceId = uuid.uuid4().hex
+        self._listener: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        """Return the number of locally cached settings groups."""
+        return len(self._entries)
+
+    async def get[T: SettingsGroup](self, guildId: int, model: type[T]) -> T | None:
+        """Return a settings group from memory, falling back to the wrapped cache."""
+        entry = await self.getEntry(guildId, model)
+        return None if entry is None else entry.value
+
+    async def getEntry[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return a fresh local entry, or the wrapped cache's entry (and its staleness) on a local miss."""
+        key = (guildId, model.name)
+        local = self._entries.get(key)
+        if local is not None:
+            expiresAt, config, version = local
+            if expiresAt > time.monotonic() and isinstance(config, model):
+                self._entries.move_to_end(key)
+                countResult("local", "get", model.name, "hit")
+                return CacheEntry(config, version=version)
+            del self._entries[key]
+
+        countResult("local", "get", model.name, "miss")
+        generation = self._generation(guildId)
+        entry = await self._sharedCall(lambda: self._inner.getEntry(guildId, model), None)
+        if entry is not None and self._generation(guildId) == generation:
+            self._remember(guildId, entry.value, entry.version)
+        return entry
+
+    async def getMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Return settings groups from memory, reading only local misses from the wrapped cache."""
+        found: dict[str, SettingsGroup] = {}
+        misses: list[type[SettingsGroup]] = []
+        now = time.monotonic()
+        for model in models:
+            key = (guildId, model.name)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and isinstance(entry[1], model):
+                self._entries.move_to_end(key)
+                found[model.name] = entry[1]
+                countResult("local", "getMany", model.name, "hit")
+            else:
+                misses.append(model)
+                countResult("local", "getMany", model.name, "miss")
+        if misses:
+            generation = self._generation(guildId)
+            loaded = await self._sharedCall(lambda: self._inner.getMany(guildId, misses), {})
+            if self._generation(guildId) == generation:
+                for config in loaded.values():
+                    self._remember(guildId, config, 0)
+            found.update(loaded)
+        return found
+
+    async def set(
+        self,
+        guildId: int,
+        config: SettingsGroup,
+        *,
+        broadcast: bool = False,
+        version: int | None = None,
+    ) -> None:
+        """Store a settings group locally and in the wrapped cache, then notify other replicas."""
+        await self._sharedCall(lambda: self._inner.set(guildId, config, broadcast=broadcast, version=version), None)
+        self._store(guildId, config, version)
+        if broadcast:
+            await self._publish(guildId, [type(config).name])
+
+    async def setMany(
+        self,
+        guildId: int,
+        configs: Sequence[SettingsGroup],
+        *,
+        version: int | None = None,
+    ) -> None:
+        """Store several settings groups locally and in the wrapped cache."""
+        await self._sharedCall(lambda: self._inner.setMany(guildId, configs, version=version), None)
+        for config in configs:
+            self._store(guildId, config, version)
+
+    async def setBulk(self, groups: Mapping[int, Sequence[SettingsGroup]], *, version: int | None = None) -> None:
+        """Store settings groups for many guilds locally and in the wrapped cache."""
+        await self._sharedCall(lambda: self._inner.setBulk(groups, version=version), None)
+        for guildId, configs in groups.items():
+            for config in configs:
+                self._store(guildId, config, version)
+
+    async def invalidate(self, guildId: int, names: Sequence[str] | None = None) -> None:
+        """Drop settings groups here, in the wrapped cache, and on every other replica."""
+        self.evict(guildId, names)
+        await self._sharedCall(lambda: self._inner.invalidate(guildId, names), None)
+        await self._publish(guildId, names)
+
+    def evict(self, guildId: int, names: Sequence[str] | None = None) -> None:
+        """Drop locally cached settings groups of one guild (every group when ``names`` is ``None``)."""
+        self._generations[guildId] = self._generations.get(guildId, 0) + 1
+        if names is None:
+            names = [name for entryGuildId, name in self._entries if entryGuildId == guildId]
+        for name in names:
+            self._entries.pop((guildId, name), None)
+
+    def clear(self) -> None:
+        """Drop every locally cached settings group."""
+        self._clears += 1
+        self._generations.clear()
+        self._entries.clear()
+
+    def start(self) -> None:
+        """Start listening for invalidations published by other replicas (no-op when disabled)."""
+        if self._maxSize <= 0:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(), name="settings-cache-invalidation")
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations and drop local entries."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.clear()
+
+    async def close(self) -> None:
+        """Stop the invalidation listener and close the wrapped cache."""
+        await self.stop()
+        await self._inner.close()
+
+    def _generation(self, guildId: int) -> tuple[int, int]:
+        """Return a token that changes whenever entries of ``guildId`` are evicted."""
+        return self._clears, self._generations.get(guildId, 0)
+
+    def _store(self, guildId: int, config: SettingsGroup, version: int | None) -> None:
+        """Keep an unversioned write locally; drop the local copy for a versioned one."""
+        if version is None:
+            self._remember(guildId, config, 0)
+        else:
+            # The wrapped cache may reject the write as older than its entry; re-read whichever won.
+            self.evict(guildId, [type(config).name])
+
+    def _remember(self, guildId: int, config: SettingsGroup, version: int) -> None:
+        """Insert or refresh one entry and evict the least recently used beyond ``maxSize``."""
+        if self._maxSize <= 0:
+            return
+        key = (guildId, type(config).name)
+        self._entries[key] = (time.monotonic() + self._ttlSeconds, config, version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxSize:
+            self._entries.popitem(last=False)
+
+    async def _publish(self, guildId: int, names: Sequence[str] | None) -> None:
+        """Tell other replicas to drop their local copies of some settings groups."""
+        message = invalidationMessage(self._instanceId, guildId, names)
+        await self._sharedCall(lambda: self._client.publish(INVALIDATION_CHANNEL, message), None)
+
+    async def _sharedCall[R](self, operation: Callable[[], Awaitable[R]], default: R) -> R:
+        """Run a shared cache or pub/sub call through the breaker, returning ``default`` while Valkey is down."""
+        try:
+            return await self.breaker.call(operation)
+        except CircuitOpenError:
+            return default
+        except BACKEND_ERRORS:
+            LOGGER.warning("Shared settings cache call failed; serving local entries only.", exc_info=True)
+            return default
+
+    def _handleInvalidation(self, data: bytes | str) -> None:
+        """Apply one invalidation message built by :func:`invalidationMessage`."""
+        instanceId, _, rest = _text(data).partition(":")
+        guildId, _, groups = rest.partition(":")
+        if instanceId == self._instanceId or not guildId.isdigit() or not groups:
+            return
+        self.evict(int(guildId), None if groups == "*" else groups.split(","))
+        LOGGER.debug("Evicted %s for guild %s after a remote write.", groups, guildId)
+
+    async def _listen(self) -> None:
+        """Consume invalidation messages, resubscribing after connection failures."""
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Messages may have been missed while unsubscribed.
+                self.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._handleInvalidation(message["data"])
+            except ValkeyError, OSError:
+                LOGGER.warning("Settings invalidation subscription lost; retrying.", exc_info=True)
+            finally:
+                await pubsub.aclose()
+            self.clear()
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+class MemorySettingsCache:
+    """
+    Bounded in-process settings cache for single-node runs and benchmarks.
+
+    Entries live in one LRU keyed by guild and group, with the same soft and
+    hard TTL and version semantics as :class:`ValkeySettingsCache` but no
+    network I/O and no cross-process invalidation, so only use it when one
+    process owns the settings store.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxSize: int = 10_000,
+        softTtlSeconds: float | None = None,
+        hardTtlSeconds: float | None = None,
+    ) -> None:
+        """Initialize an empty cache; ``None`` disables a TTL and ``maxSize`` 0 disables caching."""
+        self._maxSize = maxSize
+        self._softTtlSeconds = softTtlSeconds
+        self._hardTtlSeconds = hardTtlSeconds
+        self._entries: OrderedDict[tuple[int, str], tuple[float, SettingsGroup, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached settings groups."""
+        return len(self._entries)
+
+    async def get[T: SettingsGroup](self, guildId: int, model: type[T]) -> T | None:
+        """Return a cached settings group, or ``None`` on miss."""
+        entry = await self.getEntry(guildId, model)
+        return None if entry is None else entry.value
+
+    async def getEntry[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return a cached settings group with its staleness, or ``None`` on miss or past the hard TTL."""
+        entry = self._lookup(guildId, model)
+        countResult("memory", "get", model.name, "miss" if entry is None else "hit")
+        return entry
+
+    async def getMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Return cached settings groups by name; misses are omitted."""
+        found: dict[str, SettingsGroup] = {}
+        for model in models:
+            entry = self._lookup(guildId, model)
+            countResult("memory", "getMany", model.name, "miss" if entry is None else "hit")
+            if entry is not None:
+                found[model.name] = entry.value
+        return found
+
+    async def set(
+        self,
+        guildId: int,
+        config: SettingsGroup,
+        *,
+        broadcast: bool = False,
+        version: int | None = None,
+    ) -> None:
+        """Store a settings group (``broadcast`` is ignored; there are no other replicas to tell)."""
+        self._remember(guildId, config, version)
+
+    async def setMany(
+        self,
+        guildId: int,
+        configs: Sequence[SettingsGroup],
+        *,
+        version: int | None = None,
+    ) -> None:
+        """Store several settings groups for one guild."""
+        for config in configs:
+            self._remember(guildId, config, version)
+
+    async def setBulk(self, groups: Mapping[int, Sequence[SettingsGroup]], *, version: int | None = None) -> None:
+        """Store settings groups for many guilds."""
+        for guildId, configs in groups.items():
+            for config in configs:
+                self._remember(guildId, config, version)
+
+    async def invalidate(self, guildId: int, names: Sequence[str] | None = None) -> None:
+        """Drop cached settings groups of one guild (every group when ``names`` is ``None``)."""
+        if names is None:
+            names = [name for entryGuildId, name in self._entries if entryGuildId == guildId]
+        for name in names:
+            self._entries.pop((guildId, name), None)
+
+    async def close(self) -> None:
+        """Drop every cached settings group."""
+        self._entries.clear()
+
+    def _lookup[T: SettingsGroup](self, guildId: int, model: type[T]) -> CacheEntry[T] | None:
+        """Return one entry classified against the TTLs, dropping it past the hard TTL."""
+        key = (guildId, model.name)
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        storedAt, config, version = cached
+        age = time.monotonic() - storedAt
+        if not isinstance(config, model) or (self._hardTtlSeconds is not None and age > self._hardTtlSeconds):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        stale = self._softTtlSeconds is not None and age > self._softTtlSeconds
+        return CacheEntry(config, stale=stale, version=version)
+
+    def _remember(self, guildId: int, config: SettingsGroup, version: int | None) -> None:
+        """Insert or refresh one entry unless a newer version is cached, evicting beyond ``maxSize``."""
+        if self._maxSize <= 0:
+            return
+        key = (guildId, type(config).name)
+        cached = self._entries.get(key)
+        if version is not None and cached is not None and version < cached[2]:
+            return
+        self._entries[key] = (time.monotonic(), config, version or 0)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxSize:
+            self._entries.popitem(last=False)
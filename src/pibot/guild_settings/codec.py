@@ -0,0 +1,135 @@
+"""Compiled per-model validation plans for guild settings."""
+
+import hashlib
+import json
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import cached_property, partial
+from types import UnionType
+from typing import Annotated, Any, Literal, Union, cast, get_args, get_origin
+
+from pydantic import TypeAdapter, ValidationError
+
+from pibot.guild_settings.model import SettingsGroup
+
+_PLAIN_TYPES = (bool, int, float, str, type(None))
+
+
+def _isPlain(annotation: object) -> bool:
+    """Whether values of ``annotation`` survive a JSON or BSON round trip as the same Python objects."""
+    if annotation in _PLAIN_TYPES:
+        return True
+    origin = get_origin(annotation)
+    arguments = get_args(annotation)
+    if origin is Literal:
+        return all(isinstance(argument, _PLAIN_TYPES) for argument in arguments)
+    if origin is Annotated:
+        return _isPlain(arguments[0])
+    if origin is dict:
+        return bool(arguments) and arguments[0] is str and _isPlain(arguments[1])
+    if origin in (Union, UnionType, list):
+        return bool(arguments) and all(_isPlain(argument) for argument in arguments)
+    return False
+
+
+@dataclass(frozen=True, slots=True)
+class FieldCodec:
+    """Compiled adapter and default for one settings field."""
+
+    name: str
+    adapter: TypeAdapter[object]
+    required: bool
+    default: object = None
+    defaultFactory: Callable[[], object] | None = None
+
+    def defaultValue(self) -> object:
+        """Return the model default (shared for plain defaults, fresh for factories)."""
+        if self.required:
+            msg = "Required settings cannot be reset to a model default."
+            raise ValueError(msg)
+        if self.defaultFactory is not None:
+            return self.defaultFactory()
+        return self.default
+
+
+class SettingsCodec:
+    """
+    Validation plan compiled once per :class:`SettingsGroup` subclass.
+
+    Holds a ``TypeAdapter`` per field (built from the field annotation plus its
+    non-UI metadata), the field defaults, and one shared frozen instance with
+    every field at its default (``None`` when the model has required fields). Use
+    :func:`pibot.guild_settings.registry.getCodec` rather than constructing one
+    directly so the compiled plan is shared.
+    """
+
+    def __init__(self, model: type[SettingsGroup]) -> None:
+        """Compile adapters and defaults for every field of ``model``."""
+        from pibot.guild_settings.ui.editors import partitionFieldMetadata
+
+        self.model = model
+        fields: dict[str, FieldCodec] = {}
+        for name, fieldInfo in model.model_fields.items():
+            _uiTypes, validation = partitionFieldMetadata(fieldInfo)
+            # The field annotation is a runtime value, not a type expression; build the Annotated form dynamically.
+            annotation: Any = (
+                cast(Any, Annotated)[fieldInfo.annotation, *validation] if validation else fieldInfo.annotation
+            )
+            required = fieldInfo.is_required()
+            hasFactory = not required and fieldInfo.default_factory is not None
+            fields[name] = FieldCodec(
+                name=name,
+                adapter=TypeAdapter(annotation),
+                required=required,
+                default=None if required or hasFactory else fieldInfo.get_default(),
+                defaultFactory=partial(fieldInfo.get_default, call_default_factory=True) if hasFactory else None,
+            )
+        self.fields = fields
+        self._plan = tuple(fields.values())
+        # Every field is JSON-native, so trusted positional values can skip validation.
+        self.constructible = all(_isPlain(fieldInfo.annotation) for fieldInfo in model.model_fields.values())
+        self.defaults: SettingsGroup | None = None
+        if not any(fieldCodec.required for fieldCodec in self._plan):
+            self.defaults = self._decode({})
+
+    def validateField(self, field: str, raw: object) -> object:
+        """Validate one raw value against the field's compiled adapter."""
+        return self.fields[field].adapter.validate_python(raw)
+
+    def fromStored(self, data: Mapping[str, object]) -> SettingsGroup:
+        """Build the model from partial stored fields, filling optional gaps with defaults."""
+        if not data and self.defaults is not None:
+            return self.defaults
+        return self._decode(data)
+
+    @cached_property
+    def schemaHash(self) -> bytes:
+        """Return an 8-byte fingerprint of the model JSON schema (field names, order, types, constraints)."""
+        schema = json.dumps(self.model.model_json_schema(), sort_keys=True)
+        return hashlib.blake2b(schema.encode(), digest_size=8).digest()
+
+    def toPositional(self, config: SettingsGroup) -> list[object]:
+        """Return the field values of ``config`` in declaration order, in JSON mode."""
+        return list(config.model_dump(mode="json").values())
+
+    def fromTrusted(self, values: Sequence[object]) -> SettingsGroup:
+        """Rebuild the model from :meth:`toPositional` output of the same schema, skipping validation when safe."""
+        data: dict[str, Any] = dict(zip(self.fields, values, strict=True))
+        if self.constructible:
+            return self.model.model_construct(**data)
+        return self.model.model_validate(data)
+
+    def _decode(self, data: Mapping[str, object]) -> SettingsGroup:
+        """Validate stored fields and defaults into a new model instance."""
+        values: dict[str, object] = {}
+        for fieldCodec in self._plan:
+            name = fieldCodec.name
+            if name in data:
+                try:
+                    values[name] = fieldCodec.adapter.validate_python(data[name])
+                except ValidationError as exc:
+                    msg = f"Invalid stored value for {name!r}: {exc.errors()[0]['msg']}"
+                    raise ValueError(msg) from exc
+            elif not fieldCodec.required:
+                values[name] = fieldCodec.defaultValue()
+        return self.model.model_validate(values)
@@ -7,3 +7,11 @@ class GuildSettingsError(Exception):
 
 class InvalidSettingValue(GuildSettingsError):
     """Raised when user-provided settings input fails validation."""
+
+
+class SettingsUnavailable(GuildSettingsError):
+    """Raised when settings cannot be read or changed because a backend is down."""
+
+
+class SettingsConflict(GuildSettingsError):
+    """Raised when a settings write keeps losing compare-and-set races to concurrent writes."""
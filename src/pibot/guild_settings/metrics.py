@@ -0,0 +1,51 @@
+"""Hit, miss, and latency metrics for guild settings caches and stores."""
+
+from pibot.metrics import REGISTRY, Counter, Gauge, Histogram, Timer
+
+SETTINGS_OPERATIONS = REGISTRY.register(
+    Counter(
+        "pibot_settings_operations_total",
+        "Guild settings cache and store operations by backend, operation, group, and result.",
+        ("backend", "operation", "group", "result"),
+    )
+)
+SETTINGS_LATENCY = REGISTRY.register(
+    Histogram(
+        "pibot_settings_operation_seconds",
+        "Latency of guild settings cache and store operations.",
+        ("backend", "operation", "group"),
+    )
+)
+BREAKER_STATE = REGISTRY.register(
+    Gauge(
+        "pibot_settings_breaker_state",
+        "Guild settings circuit breaker state by backend (0 closed, 1 half-open, 2 open).",
+        ("backend",),
+    )
+)
+BREAKER_OPENED = REGISTRY.register(
+    Counter(
+        "pibot_settings_breaker_opened_total",
+        "Times a guild settings circuit breaker opened, by backend.",
+        ("backend",),
+    )
+)
+SERVICE_EVENTS = REGISTRY.register(
+    Counter(
+        "pibot_settings_service_events_total",
+        "Guild settings service events (store loads, coalesced loads, warm-up progress, fallbacks, conflicts).",
+        ("event",),
+    )
+)
+# Group label for operations that span several settings groups.
+ALL_GROUPS = "*"
+
+
+def timeOperation(backend: str, operation: str, group: str) -> Timer:
+    """Return a timer recording one operation of ``backend`` on settings group ``group``."""
+    return Timer(SETTINGS_OPERATIONS, SETTINGS_LATENCY, backend=backend, operation=operation, group=group)
+
+
+def countResult(backend: str, operation: str, group: str, result: str) -> None:
+    """Count one per-group outcome (``hit`` or ``miss``) of a multi-group operation."""
+    SETTINGS_OPERATIONS.inc(backend=backend, operation=operation, group=group, result=result)
@@ -0,0 +1,168 @@
+"""Lazy and batch schema migrations for stored settings groups."""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Awaitable, Mapping, Sequence
+from typing import Any, cast
+
+from pymongo import UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from valkey.exceptions import ValkeyError
+
+from pibot.clients import ValkeyClient
+from pibot.guild_settings.cache import CACHE_KEY_PREFIX
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.serializer import fromStored, toStored
+from pibot.guild_settings.watcher import RELEASE_LEASE_SCRIPT, RENEW_LEASE_SCRIPT
+
+LOGGER = logging.getLogger("guild_settings.migration")
+
+# Stored next to a group's fields; absent means version 1.
+SCHEMA_VERSION_KEY = "_schemaVersion"
+# Holder of this key is the one replica running the batch migrator.
+MIGRATION_LEASE_KEY = f"{CACHE_KEY_PREFIX}:migration:leader"
+MIGRATION_LEASE_SECONDS = 60.0
+
+
+def stampVersion(model: type[SettingsGroup], stored: dict[str, object]) -> dict[str, object]:
+    """Add the schema version marker to stored fields (version 1 is implicit and never stored)."""
+    if model.schemaVersion > 1:
+        stored[SCHEMA_VERSION_KEY] = model.schemaVersion
+    return stored
+
+
+def upgradeGroup(model: type[SettingsGroup], data: Mapping[str, object]) -> dict[str, object] | None:
+    """Return stored fields migrated to the current schema version, or ``None`` when already current."""
+    version = data.get(SCHEMA_VERSION_KEY, 1)
+    if not data or version == model.schemaVersion:
+        return None
+    if not isinstance(version, int) or version > model.schemaVersion:
+        msg = f"Stored {model.name!r} settings have schema version {version!r}; the model is {model.schemaVersion}."
+        raise ValueError(msg)
+    migrated = {key: value for key, value in data.items() if key != SCHEMA_VERSION_KEY}
+    for step in range(version, model.schemaVersion):
+        migrated = model.migrations[step](migrated)
+    return stampVersion(model, toStored(fromStored(model, migrated)))
+
+
+def upgradeOperation(
+    guildId: int,
+    model: type[SettingsGroup],
+    data: Mapping[str, object],
+    upgraded: dict[str, object],
+) -> UpdateOne:
+    """Return a write-back of ``upgraded`` that only applies if the stored version is still the one read."""
+    versionPath = f"features.{model.name}.{SCHEMA_VERSION_KEY}"
+    version = data.get(SCHEMA_VERSION_KEY)
+    condition = {versionPath: {"$exists": False}} if version is None else {versionPath: version}
+    return UpdateOne({"_id": guildId, **condition}, {"$set": {f"features.{model.name}": upgraded}})
+
+
+class SettingsMigrator:
+    """
+    Walks the settings collection in ``_id`` order and upgrades outdated groups.
+
+    Each batch reads at most ``batchSize`` documents holding an outdated group,
+    writes them back with one unordered bulk write, and then sleeps
+    ``delaySeconds`` so the upgrade does not compete with live traffic. With a
+    Valkey ``leaseClient`` only the replica holding the migration lease walks
+    the collection; the others return at once.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        models: Sequence[type[SettingsGroup]],
+        *,
+        batchSize: int = 100,
+        delaySeconds: float = 1.0,
+        leaseClient: ValkeyClient | None = None,
+    ) -> None:
+        """Initialize for the given settings groups; only versioned groups are walked."""
+        self._collection = collection
+        self._models = [model for model in models if model.schemaVersion > 1]
+        self._batchSize = batchSize
+        self._delaySeconds = delaySeconds
+        self._client = leaseClient
+        self._instanceId = uuid.uuid4().hex
+
+    def _outdatedFilter(self) -> dict[str, Any]:
+        """Match documents holding at least one group below its model's schema version."""
+        return {
+            "$or": [
+                {
+                    f"features.{model.name}": {"$type": "object"},
+                    f"features.{model.name}.{SCHEMA_VERSION_KEY}": {"$ne": model.schemaVersion},
+                }
+                for model in self._models
+            ]
+        }
+
+    async def run(self) -> int:
+        """Upgrade every outdated group and return how many were written back."""
+        if not self._models:
+            return 0
+        if not await self._acquireLease():
+            LOGGER.info("Another replica is migrating stored settings; skipping.")
+            return 0
+        try:
+            return await self._migrate()
+        finally:
+            await self._releaseLease()
+
+    async def _migrate(self) -> int:
+        """Walk the collection in batches while holding the lease."""
+        upgradedGroups = 0
+        lastId: object = None
+        while True:
+            if lastId is not None and not await self._acquireLease():
+                LOGGER.warning("Lost the settings migration lease to another replica; stopping.")
+                break
+            query = self._outdatedFilter()
+            if lastId is not None:
+                query = {"$and": [query, {"_id": {"$gt": lastId}}]}
+            documents = await self._collection.find(query).sort("_id", 1).limit(self._batchSize).to_list()
+            if not documents:
+                break
+            operations: list[UpdateOne] = []
+            for document in documents:
+                features = document.get("features") or {}
+                for model in self._models:
+                    data = features.get(model.name)
+                    if not isinstance(data, Mapping):
+                        continue
+                    try:
+                        upgraded = upgradeGroup(model, data)
+                    except ValueError:
+                        LOGGER.warning("Cannot migrate %s for guild %s.", model.name, document["_id"], exc_info=True)
+                        continue
+                    if upgraded is not None:
+                        operations.append(upgradeOperation(document["_id"], model, data, upgraded))
+            if operations:
+                result = await self._collection.bulk_write(operations, ordered=False)
+                upgradedGroups += result.modified_count
+            lastId = documents[-1]["_id"]
+            LOGGER.info("Migrated %s settings groups so far.", upgradedGroups)
+            await asyncio.sleep(self._delaySeconds)
+        return upgradedGroups
+
+    async def _acquireLease(self) -> bool:
+        """Take or extend the migration lease and return whether this replica holds it (always without Valkey)."""
+        if self._client is None:
+            return True
+        leaseMs = int(MIGRATION_LEASE_SECONDS * 1000)
+        renew = self._client.eval(RENEW_LEASE_SCRIPT, 1, MIGRATION_LEASE_KEY, self._instanceId, str(leaseMs))
+        if await cast(Awaitable[int], renew):
+            return True
+        return bool(await self._client.set(MIGRATION_LEASE_KEY, self._instanceId, nx=True, px=leaseMs))
+
+    async def _releaseLease(self) -> None:
+        """Hand the migration lease back so a later run elsewhere does not wait for it to expire."""
+        if self._client is None:
+            return
+        try:
+            release = self._client.eval(RELEASE_LEASE_SCRIPT, 1, MIGRATION_LEASE_KEY, self._instanceId)
+            await cast(Awaitable[int], release)
+        except ValkeyError, OSError:
+            LOGGER.warning("Could not release the settings migration lease.", exc_info=True)
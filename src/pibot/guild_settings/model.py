@@ -1,17 +1,28 @@
 """Pydantic schema for per-feature guild settings."""
 
+from collections.abc import Callable, Mapping
 from typing import ClassVar
 
 from pydantic import BaseModel, ConfigDict, Field
 
+type Migration = Callable[[dict[str, object]], dict[str, object]]
+
 
 class SettingsGroup(BaseModel):
-    """Per-feature guild settings schema. Subclass once per feature; fields are the settings."""
+    """
+    Per-feature guild settings schema. Subclass once per feature; fields are the settings.
+
+    Bump ``schemaVersion`` when renaming or retyping a field and add a function
+    to ``migrations`` under the old version number; it receives stored fields
+    of that version and returns them in the next version's shape.
+    """
 
     model_config = ConfigDict(frozen=True)
 
     name: ClassVar[str]
     description: ClassVar[str]
     disableable: ClassVar[bool] = True
+    schemaVersion: ClassVar[int] = 1
+    migrations: ClassVar[Mapping[int, Migration]] = {}
 
     enabled: bool = Field(default=True, description="Whether this feature is active on the server")
@@ -1,22 +1,34 @@
 """Runtime registry of feature settings groups."""
 
+import importlib
+import importlib.util
 import logging
+import pkgutil
 
+from pibot.guild_settings.codec import SettingsCodec
 from pibot.guild_settings.model import SettingsGroup
 
 LOGGER = logging.getLogger("guild_settings.registry")
 
 _GROUPS: dict[str, type[SettingsGroup]] = {}
+_CODECS: dict[type[SettingsGroup], SettingsCodec] = {}
+_SORTED: tuple[tuple[str, type[SettingsGroup]], ...] | None = None
 
 
 def registerSettingsGroup[T: SettingsGroup](group: type[T]) -> type[T]:
     """Register a feature settings group. Called when a cog loads its config."""
+    missing = [version for version in range(1, group.schemaVersion) if version not in group.migrations]
+    if missing:
+        msg = f"Settings group {group.name!r} has no migrations from versions {missing}."
+        raise ValueError(msg)
     existing = _GROUPS.get(group.name)
     if existing is not None and existing is not group:
         msg = f"Duplicate settings group name: {group.name!r}"
         raise ValueError(msg)
     if existing is not group:
+        global _SORTED
         _GROUPS[group.name] = group
+        _SORTED = None
         LOGGER.debug("Registered settings group: %s", group.name)
     return group
 
@@ -24,3 +36,30 @@ def registerSettingsGroup[T: SettingsGroup](group: type[T]) -> type[T]:
 def getSettingsGroups() -> dict[str, type[SettingsGroup]]:
     """Return all settings groups registered by loaded cogs."""
     return dict(_GROUPS)
+
+
+def getSortedSettingsGroups() -> tuple[tuple[str, type[SettingsGroup]], ...]:
+    """Return ``(name, group)`` pairs sorted by name; the same tuple until another group registers."""
+    global _SORTED
+    if _SORTED is None:
+        _SORTED = tuple(sorted(_GROUPS.items()))
+    return _SORTED
+
+
+def discoverSettingsGroups() -> dict[str, type[SettingsGroup]]:
+    """Import the ``config`` module of every cog package (registering its groups) without loading the cogs."""
+    import pibot.cogs
+
+    for module in pkgutil.iter_modules(pibot.cogs.__path__, f"{pibot.cogs.__name__}."):
+        if module.ispkg and importlib.util.find_spec(f"{module.name}.config") is not None:
+            importlib.import_module(f"{module.name}.config")
+    return getSettingsGroups()
+
+
+def getCodec(model: type[SettingsGroup]) -> SettingsCodec:
+    """Return the compiled codec for a settings group, compiling it on first use."""
+    codec = _CODECS.get(model)
+    if codec is None:
+        codec = _CODECS[model] = SettingsCodec(model)
+        LOGGER.debug("Compiled settings codec: %s", model.name)
+    return codec
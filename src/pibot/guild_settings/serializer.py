@@ -1,13 +1,14 @@
 """Load, save, and parse guild settings values."""
 
 from collections.abc import Mapping
-from typing import Annotated
+from typing import cast
 
-from pydantic import TypeAdapter, ValidationError
+from pydantic import ValidationError
 from pydantic.fields import FieldInfo
 
 from pibot.guild_settings.errors import InvalidSettingValue
 from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import getCodec
 
 
 def fieldDefault(fieldInfo: FieldInfo) -> object:
@@ -18,36 +19,9 @@ def fieldDefault(fieldInfo: FieldInfo) -> object:
     return fieldInfo.get_default(call_default_factory=True)
 
 
-def _fieldTypeAdapter(model: type[SettingsGroup], field: str) -> TypeAdapter[object]:
-    """Return a type adapter for one model field."""
-    from pibot.guild_settings.ui.editors import partitionFieldMetadata
-
-    fieldInfo = model.model_fields[field]
-    _uiTypes, validation = partitionFieldMetadata(fieldInfo)
-    if validation:
-        annotated = Annotated[fieldInfo.annotation, *validation]
-        return TypeAdapter(annotated)
-    return TypeAdapter(fieldInfo.annotation)
-
-
-def _coerceStoredValue(model: type[SettingsGroup], field: str, raw: object) -> object:
-    """Coerce a MongoDB value into the field's Python type."""
-    try:
-        return _fieldTypeAdapter(model, field).validate_python(raw)
-    except ValidationError as exc:
-        msg = f"Invalid stored value for {field!r}: {exc.errors()[0]['msg']}"
-        raise ValueError(msg) from exc
-
-
 def fromStored[T: SettingsGroup](model: type[T], data: Mapping[str, object]) -> T:
     """Build settings from partial stored feature settings."""
-    values: dict[str, object] = {}
-    for name, fieldInfo in model.model_fields.items():
-        if name in data:
-            values[name] = _coerceStoredValue(model, name, data[name])
-        elif not fieldInfo.is_required():
-            values[name] = fieldDefault(fieldInfo)
-    return model.model_validate(values)
+    return cast(T, getCodec(model).fromStored(data))
 
 
 def parseSetting(model: type[SettingsGroup], field: str, raw: str) -> object:
@@ -56,7 +30,7 @@ def parseSetting(model: type[SettingsGroup], field: str, raw: str) -> object:
         msg = f"Unknown setting {field!r}"
         raise ValueError(msg)
     try:
-        return _fieldTypeAdapter(model, field).validate_python(raw)
+        return getCodec(model).validateField(field, raw)
     except ValidationError as exc:
         raise InvalidSettingValue(exc.errors()[0]["msg"]) from exc
 
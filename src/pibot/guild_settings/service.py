@@ -1,32 +1,271 @@
 """Guild settings — shared per-guild settings storage."""
 
+import asyncio
 import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import cast
 
+from pydantic import ValidationError
+
+from pibot.guild_settings.breaker import BACKEND_ERRORS, UNAVAILABLE_ERRORS, CircuitBreaker, CircuitOpenError
 from pibot.guild_settings.cache import SettingsCache
+from pibot.guild_settings.errors import InvalidSettingValue, SettingsConflict, SettingsUnavailable
+from pibot.guild_settings.metrics import SERVICE_EVENTS, countResult
+from pibot.guild_settings.migration import stampVersion
 from pibot.guild_settings.model import SettingsGroup
 from pibot.guild_settings.serializer import fieldDefault
-from pibot.guild_settings.store import SettingsStore
+from pibot.guild_settings.store import SettingsStore, Versioned
 
 LOGGER = logging.getLogger("guild_settings.service")
 
+READ_UNAVAILABLE = "Settings are temporarily unavailable. Try again in a moment."
+WRITE_UNAVAILABLE = "Settings cannot be changed right now. Try again in a moment."
+WRITE_CONFLICT = "These settings were changed by someone else at the same time. Try again."
+
+
+def _logRefreshFailure(task: asyncio.Task[SettingsGroup]) -> None:
+    """Log a failed background refresh; the stale entry keeps being served."""
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        LOGGER.warning("Background settings refresh failed.", exc_info=exc)
+
+
+@dataclass
+class LoadStats:
+    """
+    Counters for cache misses in :meth:`SettingsService.load`, progress of :meth:`SettingsService.warm`, and writes.
+
+    Every increment is also exported as ``pibot_settings_service_events_total``
+    with the field name as the ``event`` label.
+    """
+
+    storeLoads: int = 0
+    coalescedLoads: int = 0
+    staleRefreshes: int = 0
+    warmupTotalGuilds: int = 0
+    warmupWarmedGuilds: int = 0
+    bufferedWrites: int = 0
+    flushedWrites: int = 0
+    fallbackLoads: int = 0
+    writeConflicts: int = 0
+
+    def add(self, name: str, amount: int = 1) -> None:
+        """Increase one counter, mirrored in ``pibot_settings_service_events_total`` with ``event=name``."""
+        setattr(self, name, getattr(self, name) + amount)
+        SERVICE_EVENTS.inc(amount, event=name)
+
+
+@dataclass
+class _PendingWrite:
+    """Latest config and changed fields of one settings group awaiting a buffered store write."""
+
+    config: SettingsGroup
+    fields: set[str]
+    # Guild version the first buffered change was made on; the flush writes against it.
+    version: int
+    timer: asyncio.Task[None] | None = None
+
 
 class SettingsService:
-    """Shared per-guild settings storage with a Valkey (or other) cache."""
+    """
+    Shared per-guild settings storage with a Valkey (or other) cache.
 
-    def __init__(self, store: SettingsStore, cache: SettingsCache) -> None:
+    With ``writeDelaySeconds`` above zero, updates are written behind: the cache
+    and this service see the new config at once, while changes to the same
+    guild and group within the window are merged into one store write.
+    That write is compare-and-set against the version the first change was
+    made on, and the buffered config is cached one version above it, so store
+    reads taken before the flush never replace it in the cache.
+    Call :meth:`flush` before shutdown so buffered changes are not lost.
+
+    Store calls go through ``storeBreaker``; cache calls go through
+    ``cacheBreaker`` only when one is given, for caches without a breaker of
+    their own (:class:`LocalSettingsCache` already guards its Valkey calls).
+    While the cache is failing it is bypassed. While the store is failing,
+    loads fall back to the last config this service saw for the group (up to
+    ``fallbackMaxSize`` groups) and writes raise :class:`SettingsUnavailable`.
+
+    Written-through updates are compare-and-set: the group is taken from the
+    cache when it knows the guild version (otherwise read from the store), and
+    the write only applies if no other replica wrote that guild since; otherwise
+    it is re-read from the store and retried up to ``conflictRetries`` times
+    before :class:`SettingsConflict`.
+    Cache writes carry the version they were read or written at, so an older
+    snapshot never replaces a newer one in the cache.
+    """
+
+    def __init__(
+        self,
+        store: SettingsStore,
+        cache: SettingsCache,
+        *,
+        writeDelaySeconds: float = 0.0,
+        cacheBreaker: CircuitBreaker | None = None,
+        storeBreaker: CircuitBreaker | None = None,
+        fallbackMaxSize: int = 10_000,
+        conflictRetries: int = 3,
+    ) -> None:
         """Initialize the service."""
         self.store = store
         self.cache = cache
+        self.stats = LoadStats()
+        self.cacheBreaker = cacheBreaker
+        self.storeBreaker = storeBreaker or CircuitBreaker("store")
+        self._fallbackMaxSize = fallbackMaxSize
+        self._conflictRetries = conflictRetries
+        self._lastKnownGood: OrderedDict[tuple[int, str], SettingsGroup] = OrderedDict()
+        self._inflight: dict[tuple[int, str], asyncio.Task[SettingsGroup]] = {}
+        self._writeDelaySeconds = writeDelaySeconds
+        self._pending: dict[tuple[int, str], _PendingWrite] = {}
+        self._writeLock = asyncio.Lock()
 
     async def load[T: SettingsGroup](self, guildId: int, model: type[T]) -> T:
-        """Load one settings group for a guild."""
-        cached = await self.cache.get(guildId, model)
+        """
+        Load one settings group for a guild; concurrent misses share one store read.
+
+        Stale cache hits are returned immediately while a background store read
+        refreshes the entry.
+        """
+        pending = self._pending.get((guildId, model.name))
+        if pending is not None:
+            return cast(T, pending.config)
+        cached = await self._cacheCall(lambda: self.cache.getEntry(guildId, model), None)
         if cached is not None:
             LOGGER.debug("Cache hit for %s in guild %s.", model.name, guildId)
-            return cached
-        config = await self.store.load(guildId, model.name, model)
-        await self.cache.set(guildId, config)
-        return config
+            if cached.stale:
+                self._refreshInBackground(guildId, model)
+            self._rememberGood(guildId, cached.value)
+            return cached.value
+
+        task = self._inflight.get((guildId, model.name))
+        if task is None:
+            task = self._startStoreLoad(guildId, model)
+        else:
+            self.stats.add("coalescedLoads")
+            LOGGER.debug("Coalesced load of %s in guild %s.", model.name, guildId)
+        # Shield so one cancelled waiter does not cancel the read for everyone else.
+        return cast(T, await asyncio.shield(task))
+
+    async def loadMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> list[SettingsGroup]:
+        """Load several settings groups for a guild, in the order given, with one cache and one store read."""
+        found = await self._cacheCall(lambda: self.cache.getMany(guildId, models), {})
+        for model in models:
+            pending = self._pending.get((guildId, model.name))
+            if pending is not None:
+                found[model.name] = pending.config
+        misses = [model for model in models if model.name not in found]
+        if misses:
+            self.stats.add("storeLoads")
+            try:
+                loaded = await self.storeBreaker.call(lambda: self.store.loadMany(guildId, misses))
+            except UNAVAILABLE_ERRORS as exc:
+                loaded = {model.name: self._fallback(guildId, model, exc) for model in misses}
+            else:
+                # No version from this read: only fill entries nobody cached at a known version.
+                await self._cacheCall(lambda: self.cache.setMany(guildId, list(loaded.values()), version=0), None)
+            found.update(loaded)
+        for config in found.values():
+            self._rememberGood(guildId, config)
+        return [found[model.name] for model in models]
+
+    async def warm(
+        self,
+        guildIds: Sequence[int],
+        models: Sequence[type[SettingsGroup]],
+        *,
+        batchSize: int = 500,
+        concurrency: int = 4,
+    ) -> None:
+        """Preload settings for many guilds: batched ``$in`` store reads and pipelined cache writes."""
+        if not guildIds or not models:
+            return
+        self.stats.add("warmupTotalGuilds", len(guildIds))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warmBatch(batch: Sequence[int]) -> None:
+            async with semaphore:
+                loaded = await self.storeBreaker.call(lambda: self.store.loadGuilds(batch, models))
+                await self._cacheCall(lambda: self.cache.setBulk(loaded, version=0), None)
+                self.stats.add("warmupWarmedGuilds", len(batch))
+                LOGGER.info(
+                    "Warmed settings for %s/%s guilds.",
+                    self.stats.warmupWarmedGuilds,
+                    self.stats.warmupTotalGuilds,
+                )
+
+        await asyncio.gather(
+            *(warmBatch(guildIds[start : start + batchSize]) for start in range(0, len(guildIds), batchSize))
+        )
+
+    def lastKnown[T: SettingsGroup](self, guildId: int, model: type[T]) -> T | None:
+        """Return the buffered or last loaded config of one group without I/O, or ``None`` when not seen yet."""
+        pending = self._pending.get((guildId, model.name))
+        config = pending.config if pending is not None else self._lastKnownGood.get((guildId, model.name))
+        return None if config is None else cast(T, config)
+
+    def _startStoreLoad(self, guildId: int, model: type[SettingsGroup]) -> asyncio.Task[SettingsGroup]:
+        """Start the single in-flight store read for one group."""
+        key = (guildId, model.name)
+        task = asyncio.create_task(self._loadFromStore(guildId, model))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _refreshInBackground(self, guildId: int, model: type[SettingsGroup]) -> None:
+        """Re-read a stale group from the store unless a read is already in flight."""
+        if (guildId, model.name) in self._inflight:
+            return
+        self.stats.add("staleRefreshes")
+        task = self._startStoreLoad(guildId, model)
+        task.add_done_callback(_logRefreshFailure)
+
+    async def _loadFromStore[T: SettingsGroup](self, guildId: int, model: type[T]) -> T:
+        """Read one settings group from the store and populate the cache."""
+        self.stats.add("storeLoads")
+        try:
+            loaded = await self.storeBreaker.call(lambda: self.store.loadVersioned(guildId, model))
+        except UNAVAILABLE_ERRORS as exc:
+            return self._fallback(guildId, model, exc)
+        pending = self._pending.get((guildId, model.name))
+        if pending is not None:
+            # A buffered update landed while reading; the store copy is already outdated.
+            return cast(T, pending.config)
+        await self._cacheCall(lambda: self.cache.set(guildId, loaded.value, version=loaded.version), None)
+        self._rememberGood(guildId, loaded.value)
+        return loaded.value
+
+    def _fallback[T: SettingsGroup](self, guildId: int, model: type[T], error: Exception) -> T:
+        """Return the last known good config while the store is unavailable, or raise :class:`SettingsUnavailable`."""
+        config = self._lastKnownGood.get((guildId, model.name))
+        countResult("fallback", "load", model.name, "miss" if config is None else "hit")
+        if config is None:
+            raise SettingsUnavailable(READ_UNAVAILABLE) from error
+        self.stats.add("fallbackLoads")
+        LOGGER.debug("Serving last known %s for guild %s: %s", model.name, guildId, error)
+        return cast(T, config)
+
+    def _rememberGood(self, guildId: int, config: SettingsGroup) -> None:
+        """Keep ``config`` as the fallback for its group, evicting the least recently seen beyond the limit."""
+        if self._fallbackMaxSize <= 0:
+            return
+        key = (guildId, type(config).name)
+        self._lastKnownGood[key] = config
+        self._lastKnownGood.move_to_end(key)
+        while len(self._lastKnownGood) > self._fallbackMaxSize:
+            self._lastKnownGood.popitem(last=False)
+
+    async def _cacheCall[R](self, operation: Callable[[], Awaitable[R]], default: R) -> R:
+        """Run a cache operation (through ``cacheBreaker`` if set), returning ``default`` while it is unavailable."""
+        try:
+            if self.cacheBreaker is None:
+                return await operation()
+            return await self.cacheBreaker.call(operation)
+        except CircuitOpenError:
+            return default
+        except BACKEND_ERRORS:
+            LOGGER.warning("Guild settings cache call failed; bypassing the cache.", exc_info=True)
+            return default
 
     async def update[T: SettingsGroup](
         self,
@@ -36,19 +275,98 @@ class SettingsService:
         value: object,
     ) -> T:
         """Set one field on a settings group and return the updated config."""
-        config = await self.load(guildId, model)
-        updated = config.model_copy(update={field: value})
-        storedValue = getattr(updated, field)
-        fieldInfo = model.model_fields[field]
+        return await self.updateMany(guildId, model, {field: value})
 
-        if fieldInfo.is_required() or storedValue != fieldDefault(fieldInfo):
-            await self.store.setField(guildId, model.name, field, storedValue)
-        else:
-            await self.store.unsetField(guildId, model.name, field)
+    async def updateMany[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        changes: Mapping[str, object],
+    ) -> T:
+        """Set several fields on a settings group with one store write and return the updated config."""
+        unknown = sorted(set(changes) - set(model.model_fields))
+        if unknown:
+            msg = f"Unknown settings {', '.join(unknown)} for {model.name}."
+            raise ValueError(msg)
+        if self._writeDelaySeconds <= 0:
+            current = await self._cachedVersion(guildId, model)
+            try:
+                written = await self._compareAndSet(guildId, model, changes, current)
+            except UNAVAILABLE_ERRORS as exc:
+                raise SettingsUnavailable(WRITE_UNAVAILABLE) from exc
+            await self._cacheCall(
+                lambda: self.cache.set(guildId, written.value, broadcast=True, version=written.version), None
+            )
+            self._rememberGood(guildId, written.value)
+            return written.value
 
-        await self.cache.set(guildId, updated)
+        pending = self._pending.get((guildId, model.name))
+        current = None if pending is None else Versioned(cast(T, pending.config), pending.version)
+        if current is None:
+            current = await self._cachedVersion(guildId, model)
+        if current is None:
+            try:
+                current = await self.storeBreaker.call(lambda: self.store.loadVersioned(guildId, model))
+            except UNAVAILABLE_ERRORS as exc:
+                raise SettingsUnavailable(WRITE_UNAVAILABLE) from exc
+        updated = _applyChanges(model, current.value, changes)
+        if self.storeBreaker.isOpen:
+            # Buffering now would only lose the edit when the flush fails.
+            raise SettingsUnavailable(WRITE_UNAVAILABLE)
+        self._bufferWrite(guildId, updated, changes, current.version)
+        # The version the flush writes unless another replica gets there first.
+        flushedVersion = current.version + 1
+        await self._cacheCall(lambda: self.cache.set(guildId, updated, broadcast=True, version=flushedVersion), None)
+        self._rememberGood(guildId, updated)
         return updated
 
+    async def _cachedVersion[T: SettingsGroup](self, guildId: int, model: type[T]) -> Versioned[T] | None:
+        """Return the cached group with the guild version it was cached at, or ``None`` when that is unknown."""
+        cached = await self._cacheCall(lambda: self.cache.getEntry(guildId, model), None)
+        if cached is None or cached.version <= 0:
+            return None
+        return Versioned(cached.value, cached.version)
+
+    async def _compareAndSet[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        changes: Mapping[str, object],
+        current: Versioned[T] | None = None,
+    ) -> Versioned[T]:
+        """
+        Apply ``changes`` to the group with a versioned write, re-reading and retrying after conflicts.
+
+        The first attempt starts from ``current`` when given; the store is only
+        read when there is none or after a conflict.
+        """
+        for _attempt in range(self._conflictRetries + 1):
+            if current is None:
+                current = await self.storeBreaker.call(lambda: self.store.loadVersioned(guildId, model))
+            written = await self._tryWrite(guildId, model, changes, current)
+            if written is not None:
+                return written
+            current = None
+            self.stats.add("writeConflicts")
+            LOGGER.info("Settings write for %s in guild %s lost a race; retrying.", model.name, guildId)
+        raise SettingsConflict(WRITE_CONFLICT)
+
+    async def _tryWrite[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        changes: Mapping[str, object],
+        current: Versioned[T],
+    ) -> Versioned[T] | None:
+        """Write ``changes`` on top of ``current`` at its version; ``None`` when another write got there first."""
+        updated = _applyChanges(model, current.value, changes)
+        values, unset = _storedChanges(updated, changes)
+        if not values and not unset:
+            return Versioned(updated, current.version)
+        return await self.storeBreaker.call(
+            lambda: self.store.updateGroup(guildId, model, values, unset, expectedVersion=current.version)
+        )
+
     async def reset[T: SettingsGroup](
         self,
         guildId: int,
@@ -58,3 +376,81 @@ class SettingsService:
         """Remove one stored field and return the config with model defaults applied."""
         fieldInfo = model.model_fields[field]
         return await self.update(guildId, model, field, fieldDefault(fieldInfo))
+
+    async def flush(self) -> None:
+        """Write every buffered update to the store now."""
+        for key in list(self._pending):
+            await self._flushPending(key)
+
+    def _bufferWrite(
+        self,
+        guildId: int,
+        config: SettingsGroup,
+        changes: Mapping[str, object],
+        version: int,
+    ) -> None:
+        """Merge changed fields into the pending write of one group, scheduling a flush for the first change."""
+        key = (guildId, type(config).name)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingWrite(config, set(), version)
+            pending.timer = asyncio.create_task(self._flushLater(key))
+        else:
+            self.stats.add("bufferedWrites")
+        pending.config = config
+        pending.fields.update(changes)
+
+    async def _flushLater(self, key: tuple[int, str]) -> None:
+        """Flush one pending write once the buffering window has passed."""
+        await asyncio.sleep(self._writeDelaySeconds)
+        await self._flushPending(key)
+
+    async def _flushPending(self, key: tuple[int, str]) -> None:
+        """Write one pending group to the store with a compare-and-set; on failure evict the unsaved value."""
+        async with self._writeLock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            if pending.timer is not None and pending.timer is not asyncio.current_task():
+                pending.timer.cancel()
+            guildId, name = key
+            changes = {field: getattr(pending.config, field) for field in pending.fields}
+            current = Versioned(pending.config, pending.version)
+            try:
+                written = await self._compareAndSet(guildId, type(pending.config), changes, current)
+            except Exception:
+                LOGGER.exception("Buffered settings write for %s in guild %s failed.", name, guildId)
+                await self._cacheCall(lambda: self.cache.invalidate(guildId, [name]), None)
+                self._lastKnownGood.pop(key, None)
+                return
+            self.stats.add("flushedWrites")
+            if key not in self._pending:
+                # Replace the buffered value with the stored group at the version actually written.
+                await self._cacheCall(
+                    lambda: self.cache.set(guildId, written.value, broadcast=True, version=written.version), None
+                )
+
+
+def _applyChanges[T: SettingsGroup](model: type[T], config: T, changes: Mapping[str, object]) -> T:
+    """Return ``config`` with ``changes`` applied and the whole group re-validated."""
+    try:
+        return model.model_validate(config.model_dump() | dict(changes))
+    except ValidationError as exc:
+        raise InvalidSettingValue(exc.errors()[0]["msg"]) from exc
+
+
+def _storedChanges(config: SettingsGroup, fields: Iterable[str]) -> tuple[dict[str, object], list[str]]:
+    """Split the given fields of ``config`` into stored values and fields back at their defaults to unset."""
+    model = type(config)
+    values: dict[str, object] = {}
+    unset: list[str] = []
+    for field in fields:
+        fieldInfo = model.model_fields[field]
+        storedValue = getattr(config, field)
+        if fieldInfo.is_required() or storedValue != fieldDefault(fieldInfo):
+            values[field] = storedValue
+        else:
+            unset.append(field)
+    if values or unset:
+        values = stampVersion(model, values)
+    return values, unset
@@ -1,6 +1,9 @@
 """Interactive guild settings panel."""
 
+import asyncio
 import logging
+import re
+from typing import Self, cast
 
 import discord
 from discord import ui
@@ -10,11 +13,16 @@ from pibot.cogs.error_handler import handleInteractionError, sendInteractionErro
 from pibot.guild_settings.errors import GuildSettingsError
 from pibot.guild_settings.model import SettingsGroup
 from pibot.guild_settings.registry import getSettingsGroups
-from pibot.guild_settings.serializer import fieldDefault, parseModalSetting
-from pibot.guild_settings.ui.editors import SettingEditor, bindUiCallback, resolveSettingEditor
+from pibot.guild_settings.serializer import fieldDefault, parseModalSetting, parseSetting
+from pibot.guild_settings.ui.editors import SETTING_CUSTOM_ID, resolveSettingEditor, settingCustomId
+from pibot.guild_settings.ui.plan import FieldPlan, featureSelectOptions, getPanelPlan
 
 logger = logging.getLogger("guild_settings.settings_ui")
 
+MODAL_TIMEOUT_SECONDS = 600
+# Leaves room within Discord's 3-second deadline to send the modal after a slow load.
+MODAL_LOAD_TIMEOUT_SECONDS = 2.0
+
 
 class SettingValueModal(ui.Modal):
     """Modal editor for one string or integer setting."""
@@ -36,7 +44,7 @@ class SettingValueModal(ui.Modal):
         if not fieldInfo.is_required():
             placeholder = f"Leave empty for default ({fieldDefault(fieldInfo)})"[:100]
 
-        super().__init__(title=field[:45])
+        super().__init__(title=field[:45], timeout=MODAL_TIMEOUT_SECONDS)
         self.bot = bot
         self.guildId = guildId
         self.configClass = configClass
@@ -76,7 +84,7 @@ class SettingValueModal(ui.Modal):
             self.field,
             interaction.guild.name if interaction.guild else self.guildId,
         )
-        view = SettingsPanelView(self.bot, self.guildId, self.configClass, config)
+        view = SettingsPanelView(self.guildId, self.configClass, config)
         await interaction.edit_original_response(view=view)
 
     async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
@@ -91,188 +99,180 @@ class SettingValueModal(ui.Modal):
         )
 
 
+class SettingsComponent(
+    ui.DynamicItem[ui.Button | ui.Select | ui.ChannelSelect],
+    template=SETTING_CUSTOM_ID,
+):
+    """
+    Persistent settings panel control routed by its custom ID.
+
+    The custom ID (see :func:`settingCustomId`) carries the action, guild,
+    settings group, field and, for ``set``, the value to apply, so a click is
+    handled by loading the current settings instead of looking up a view held
+    in memory. A ``set`` applies the encoded value, so clicking a panel that
+    is out of date never undoes someone else's change. Register the class
+    with :meth:`discord.Client.add_dynamic_items` to receive clicks.
+    """
+
+    def __init__(self, item: ui.Button | ui.Select | ui.ChannelSelect) -> None:
+        """Wrap a control whose custom ID matches :data:`SETTING_CUSTOM_ID`."""
+        super().__init__(item)
+        parts = self.custom_id.split(":")
+        self.action = parts[1]
+        self.guildId = int(parts[2])
+        self.groupName = parts[3]
+        self.field = parts[4] if len(parts) > 4 else None
+        self.value = parts[5] if len(parts) > 5 else None
+
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: ui.Item,
+        match: re.Match[str],
+        /,
+    ) -> Self:
+        """Rebuild the control for a clicked component."""
+        return cls(cast(ui.Button | ui.Select | ui.ChannelSelect, item))
+
+    async def interaction_check(self, interaction: discord.Interaction, /) -> bool:
+        """Only administrators of the encoded guild may use the panel."""
+        if interaction.guild_id == self.guildId and interaction.permissions.administrator:
+            return True
+        await sendInteractionErrorMessage(interaction, "You cannot change these settings.")
+        return False
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        """Apply the action, then show the updated panel or report the failure."""
+        try:
+            await self._apply(interaction, cast(Bot, interaction.client))
+        except GuildSettingsError as error:
+            await sendInteractionErrorMessage(interaction, str(error))
+        except NotImplementedError:
+            await sendInteractionErrorMessage(interaction, "Unsupported interaction.")
+        except Exception:
+            logger.exception("Unhandled error in settings panel for %r.", self.custom_id)
+            await sendInteractionErrorMessage(interaction, "Something went wrong while updating settings.")
+
+    async def _apply(self, interaction: discord.Interaction, bot: Bot) -> None:
+        """Run the encoded action against freshly loaded settings."""
+        settingsGroups = getSettingsGroups()
+        groupName = self.groupName
+        if self.action == "feature":
+            groupName = interaction.data.get("values", [None])[0] if interaction.data else None
+        configClass = settingsGroups.get(groupName or "")
+        if configClass is None:
+            raise GuildSettingsError("Unknown settings group.")
+        if self.field is not None and self.field not in configClass.model_fields:
+            raise GuildSettingsError("Unknown setting.")
+
+        if self.action == "edit" and self.field is not None:
+            config = await self._modalConfig(bot, configClass)
+            await interaction.response.send_modal(SettingValueModal(bot, self.guildId, configClass, config, self.field))
+            return
+
+        await interaction.response.defer()
+        if self.field is None:
+            config = await bot.guildSettings.load(self.guildId, configClass)
+        elif self.action == "reset":
+            if configClass.model_fields[self.field].is_required():
+                raise GuildSettingsError(f"**{self.field}** cannot be reset.")
+            config = await bot.guildSettings.reset(self.guildId, configClass, self.field)
+        else:
+            if self.action == "set" and self.value is not None:
+                value = parseSetting(configClass, self.field, self.value)
+            else:
+                config = await bot.guildSettings.load(self.guildId, configClass)
+                editor = resolveSettingEditor(configClass, self.field)
+                value = editor.parseInteractionValue(interaction, configClass, config, self.field)
+            config = await bot.guildSettings.update(self.guildId, configClass, self.field, value)
+            logger.info(
+                "%s set %s.%s for guild %s.",
+                interaction.user,
+                configClass.name,
+                self.field,
+                interaction.guild.name if interaction.guild else self.guildId,
+            )
+        await interaction.edit_original_response(view=SettingsPanelView(self.guildId, configClass, config))
+
+    async def _modalConfig[T: SettingsGroup](self, bot: Bot, configClass: type[T]) -> T:
+        """
+        Return the config to pre-fill the edit modal with, well within the interaction deadline.
+
+        The modal has to be the first response, so it is built from the config
+        this replica last saw and only loads when it has seen none, giving up
+        after :data:`MODAL_LOAD_TIMEOUT_SECONDS`.
+        """
+        config = bot.guildSettings.lastKnown(self.guildId, configClass)
+        if config is not None:
+            return config
+        try:
+            async with asyncio.timeout(MODAL_LOAD_TIMEOUT_SECONDS):
+                return await bot.guildSettings.load(self.guildId, configClass)
+        except TimeoutError:
+            raise GuildSettingsError("Settings are taking too long to load; try again.") from None
+
+
+def _routedControl(item: ui.Button | ui.Select | ui.ChannelSelect) -> ui.Item[ui.LayoutView]:
+    """Wrap one control in :class:`SettingsComponent` for a layout view."""
+    # DynamicItem is annotated for classic views only; discord.py accepts it in layout views too.
+    return cast(ui.Item[ui.LayoutView], SettingsComponent(item))
+
+
+def routeControls(item: ui.Item) -> None:
+    """Wrap the interactive controls inside ``item`` in :class:`SettingsComponent`."""
+    if isinstance(item, ui.ActionRow):
+        children = item.children
+        item.clear_items()
+        for child in children:
+            item.add_item(_routedControl(cast(ui.Button | ui.Select | ui.ChannelSelect, child)))
+    elif isinstance(item, ui.Section) and isinstance(item.accessory, ui.Button):
+        item.accessory = _routedControl(item.accessory)
+
+
 class SettingsPanelView(ui.LayoutView):
-    """In-chat settings editor for one feature page."""
+    """
+    In-chat settings editor for one feature page.
 
-    def __init__(
-        self,
-        bot: Bot,
-        guildId: int,
-        configClass: type[SettingsGroup],
-        config: SettingsGroup,
-    ) -> None:
+    Every control is a :class:`SettingsComponent`, so the view has no timeout
+    and is not kept after it is sent; each click renders a fresh page.
+    """
+
+    def __init__(self, guildId: int, configClass: type[SettingsGroup], config: SettingsGroup) -> None:
         """Build the panel for the given feature."""
-        super().__init__(timeout=600)
-        self.bot = bot
+        super().__init__(timeout=None)
         self.guildId = guildId
         self.configClass = configClass
         self.config = config
-        self.settingsGroups = getSettingsGroups()
         self._build()
 
     def _build(self) -> None:
         """Add layout components for the current feature."""
-        containerItems: list[ui.Item] = [
-            ui.TextDisplay(
-                f"## {self.configClass.name}\n{self.configClass.description}\nChanges save immediately.",
-            ),
-            self._featureSelectRow(),
-        ]
-
-        for field in self.configClass.model_fields:
-            if field == "enabled" and not self.configClass.disableable:
-                continue
-            containerItems.extend(self._settingControls(field))
+        plan = getPanelPlan(self.configClass)
+        containerItems: list[ui.Item] = [ui.TextDisplay(plan.heading), self._featureSelectRow()]
+        for fieldPlan in plan.fields:
+            containerItems.extend(self._settingControls(fieldPlan))
 
         self.add_item(ui.Container(*containerItems, accent_color=discord.Color.blurple()))
 
     def _featureSelectRow(self) -> ui.ActionRow:
         """Feature picker across registered cogs."""
-        options = [
-            discord.SelectOption(
-                label=groupName,
-                value=groupName,
-                description=groupClass.description[:100],
-                default=groupName == self.configClass.name,
-            )
-            for groupName, groupClass in sorted(self.settingsGroups.items())
-        ]
         select = ui.Select(
             placeholder="Choose feature",
-            options=options,
-            custom_id="settings:feature",
+            options=featureSelectOptions(self.configClass.name),
+            custom_id=settingCustomId("feature", self.guildId, self.configClass.name),
         )
+        return ui.ActionRow(_routedControl(select))
 
-        async def callback(interaction: discord.Interaction) -> None:
-            groupName = interaction.data.get("values", [None])[0] if interaction.data else None
-            if groupName is None or groupName not in self.settingsGroups:
-                raise GuildSettingsError("Unknown settings group.")
-            await self._refreshPanel(interaction, groupName=groupName)
-
-        bindUiCallback(select, callback)
-        return ui.ActionRow(select)
-
-    def _settingControls(self, field: str) -> list[ui.Item]:
+    def _settingControls(self, fieldPlan: FieldPlan) -> list[ui.Item]:
         """Return layout items for one setting field."""
-        fieldInfo = self.configClass.model_fields[field]
-        description = fieldInfo.description or field
-        editor = resolveSettingEditor(self.configClass, field)
-        header = ui.TextDisplay(f"**{field}**\n{description}\n{editor.formatStatusLine(self.config, field)}")
-        controls = editor.buildControls(self.configClass, self.config, field, header)
-        self._bindSettingCallbacks(field, editor, controls)
-        return controls
-
-    def _bindSettingCallbacks(self, field: str, editor: type[SettingEditor], items: list[ui.Item]) -> None:
-        """Attach per-field component callbacks owned by this view."""
-        for item in items:
-            for interactive in self._iterInteractiveItems(item):
-
-                async def callback(
-                    interaction: discord.Interaction, fieldName: str = field, editorCls: type[SettingEditor] = editor
-                ) -> None:
-                    await self._handleEditorInteraction(interaction, fieldName, editorCls)
-
-                bindUiCallback(interactive, callback)
-
-    def _iterInteractiveItems(self, item: ui.Item) -> list[ui.Button | ui.Select | ui.ChannelSelect]:
-        """Return interactive controls inside a layout item."""
-        controls: list[ui.Button | ui.Select | ui.ChannelSelect] = []
-        if isinstance(item, (ui.Button, ui.Select, ui.ChannelSelect)):
-            controls.append(item)
-            return controls
-        if isinstance(item, ui.ActionRow):
-            for child in item.children:
-                controls.extend(self._iterInteractiveItems(child))
-            return controls
-        if isinstance(item, ui.Section) and item.accessory is not None:
-            controls.extend(self._iterInteractiveItems(item.accessory))
+        field, editor = fieldPlan.name, fieldPlan.editor
+        header = ui.TextDisplay(f"{fieldPlan.title}\n{editor.formatStatusLine(self.config, field)}")
+        controls = editor.buildControls(self.configClass, self.config, field, header, guildId=self.guildId)
+        for item in controls:
+            routeControls(item)
         return controls
 
-    async def _handleEditorInteraction(
-        self, interaction: discord.Interaction, field: str, editor: type[SettingEditor]
-    ) -> None:
-        """Route one component interaction to editor logic and apply the result."""
-        customId = interaction.data.get("custom_id") if interaction.data else None
-        if customId == f"settings:edit:{field}":
-            await self.openSettingModal(interaction, field)
-            return
-        if customId == f"settings:reset:{field}":
-            await self.resetSetting(interaction, field)
-            return
-        value = editor.parseInteractionValue(interaction, self.configClass, self.config, field)
-        await self.persistSetting(interaction, field, value)
-
-    async def persistSetting(self, interaction: discord.Interaction, field: str, value: object) -> None:
-        """Persist one setting and refresh the panel."""
-        await interaction.response.defer()
-        config = await self.bot.guildSettings.update(self.guildId, self.configClass, field, value)
-        logger.info(
-            "%s set %s.%s for guild %s.",
-            interaction.user,
-            self.configClass.name,
-            field,
-            interaction.guild.name if interaction.guild else self.guildId,
-        )
-        await self._refreshPanel(interaction, config=config)
-
-    async def resetSetting(self, interaction: discord.Interaction, field: str) -> None:
-        """Reset one optional setting to its model default."""
-        fieldInfo = self.configClass.model_fields[field]
-        if fieldInfo.is_required():
-            raise GuildSettingsError(f"**{field}** cannot be reset.")
-        await interaction.response.defer()
-        config = await self.bot.guildSettings.reset(self.guildId, self.configClass, field)
-        await self._refreshPanel(interaction, config=config)
-
-    async def openSettingModal(self, interaction: discord.Interaction, field: str) -> None:
-        """Open the text modal editor for one field."""
-        await interaction.response.send_modal(
-            SettingValueModal(
-                self.bot,
-                self.guildId,
-                self.configClass,
-                self.config,
-                field,
-            ),
-        )
-
-    async def _refreshPanel(
-        self,
-        interaction: discord.Interaction,
-        *,
-        groupName: str | None = None,
-        config: SettingsGroup | None = None,
-    ) -> None:
-        if not interaction.response.is_done():
-            await interaction.response.defer()
-
-        groupName = groupName or self.configClass.name
-        configClass = self.settingsGroups[groupName]
-        if config is None or type(config) is not configClass:
-            config = await self.bot.guildSettings.load(self.guildId, configClass)
-        view = SettingsPanelView(self.bot, self.guildId, configClass, config)
-        await interaction.edit_original_response(view=view)
-
-    async def on_error(
-        self,
-        interaction: discord.Interaction,
-        error: Exception,
-        item: ui.Item,
-    ) -> None:
-        """Show validation failures and log unexpected panel errors."""
-        if isinstance(error, NotImplementedError):
-            await sendInteractionErrorMessage(interaction, "Unsupported interaction.")
-            return
-        await handleInteractionError(
-            interaction,
-            error,
-            userErrorType=GuildSettingsError,
-            fallbackMessage="Something went wrong while updating settings.",
-            log=logger,
-            logMessage="Unhandled error in settings panel for item %r.",
-            logArgs=(item,),
-        )
-
 
 async def sendSettingsPanel(
     bot: Bot,
@@ -300,5 +300,5 @@ async def sendSettingsPanel(
 
     configClass = settingsGroups[resolvedGroup]
     config = await bot.guildSettings.load(interaction.guild.id, configClass)
-    view = SettingsPanelView(bot, interaction.guild.id, configClass, config)
+    view = SettingsPanelView(interaction.guild.id, configClass, config)
     await interaction.edit_original_response(view=view)
@@ -1,16 +1,141 @@
-"""MongoDB persistence for per-guild settings."""
+"""Persistence backends for per-guild settings."""
 
+import asyncio
+import json
 import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Callable, Generator, Iterable, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Protocol, cast
 
-from pymongo import AsyncMongoClient
+from pydantic_core import to_jsonable_python
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
+from pibot.guild_settings.metrics import ALL_GROUPS, timeOperation
+from pibot.guild_settings.migration import upgradeGroup, upgradeOperation
 from pibot.guild_settings.model import SettingsGroup
 from pibot.guild_settings.serializer import fromStored
 
 LOGGER = logging.getLogger("guild_settings.store")
 
+# Guild IDs per ``IN (...)`` query, well below SQLite's bound-parameter limit.
+SQLITE_BATCH_SIZE = 500
+# Per-guild write counter, bumped by every settings write; absent means version 0.
+VERSION_FIELD = "version"
 
-class SettingsStore:
+
+@dataclass(frozen=True, slots=True)
+class Versioned[T: SettingsGroup]:
+    """A settings group and the version of the guild settings it was read from or written as."""
+
+    value: T
+    version: int
+
+
+def _groupData(guildSettings: Mapping[str, Any] | None, name: str) -> Mapping[str, object]:
+    """Return the stored fields for one settings group of a guild document."""
+    features = (guildSettings or {}).get("features") or {}
+    return features.get(name) or {}
+
+
+def _encodeFeatures(features: Mapping[str, Any]) -> str:
+    """Serialize the ``features`` object of one SQLite row as compact JSON."""
+    return json.dumps(features, default=to_jsonable_python, separators=(",", ":"))
+
+
+def _decodeGroup(
+    guildId: int,
+    model: type[SettingsGroup],
+    guildSettings: Mapping[str, Any] | None,
+    name: str,
+) -> tuple[SettingsGroup, UpdateOne | None]:
+    """Decode one group, migrating older stored shapes and returning the write-back for them."""
+    data = _groupData(guildSettings, name)
+    upgraded = upgradeGroup(model, data)
+    if upgraded is None:
+        return fromStored(model, data), None
+    return fromStored(model, upgraded), upgradeOperation(guildId, model, data, upgraded)
+
+
+def groupProjection(names: Iterable[str]) -> dict[str, int]:
+    """Return a projection that fetches only the named settings groups of a guild document."""
+    return {f"features.{name}": 1 for name in names}
+
+
+def _documentVersion(guildSettings: Mapping[str, Any] | None) -> int:
+    """Return the version of a guild document (``0`` when missing or written before versioning)."""
+    return int((guildSettings or {}).get(VERSION_FIELD) or 0)
+
+
+def _fieldUpdate(name: str, values: Mapping[str, object], unset: Sequence[str]) -> dict[str, dict[str, object]]:
+    """Return the update document setting and removing group fields and bumping the guild version."""
+    update: dict[str, dict[str, object]] = {"$inc": {VERSION_FIELD: 1}}
+    if values:
+        update["$set"] = {f"features.{name}.{field}": value for field, value in values.items()}
+    if unset:
+        update["$unset"] = {f"features.{name}.{field}": "" for field in unset}
+    return update
+
+
+class SettingsStore(Protocol):
+    """Async persistence for guild settings groups."""
+
+    async def load[T: SettingsGroup](self, guildId: int, name: str, model: type[T]) -> T:
+        """Load one settings group for a guild (model defaults when nothing is stored)."""
+
+    async def loadVersioned[T: SettingsGroup](self, guildId: int, model: type[T]) -> Versioned[T]:
+        """Load one settings group for a guild with the current guild version."""
+
+    async def loadMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Load several settings groups for a guild by name."""
+
+    async def loadGuilds(
+        self,
+        guildIds: Sequence[int],
+        models: Sequence[type[SettingsGroup]],
+    ) -> dict[int, list[SettingsGroup]]:
+        """Load settings groups for many guilds."""
+
+    async def setField(self, guildId: int, name: str, field: str, value: object) -> None:
+        """Persist one settings group field."""
+
+    async def unsetField(self, guildId: int, name: str, field: str) -> None:
+        """Remove one stored settings group field."""
+
+    async def updateFields(
+        self,
+        guildId: int,
+        name: str,
+        values: Mapping[str, object],
+        unset: Sequence[str],
+    ) -> None:
+        """Set and remove several fields of one settings group in a single write, without a version check."""
+
+    async def updateGroup[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        values: Mapping[str, object],
+        unset: Sequence[str],
+        *,
+        expectedVersion: int | None = None,
+    ) -> Versioned[T] | None:
+        """
+        Set and remove group fields in one write and return the stored group with the new guild version.
+
+        With ``expectedVersion`` the write only applies while the guild is still
+        at that version; ``None`` is returned when another write got there first.
+        """
+
+    async def close(self) -> None:
+        """Release store resources."""
+
+
+class MongoSettingsStore:
     """MongoDB access layer for the discord.settings collection."""
 
     def __init__(self, client: AsyncMongoClient) -> None:
@@ -18,26 +143,356 @@ class SettingsStore:
         self.collection = client["discord"]["settings"]
 
     async def load[T: SettingsGroup](self, guildId: int, name: str, model: type[T]) -> T:
-        """Load one settings group for a guild."""
-        guildSettings = await self.collection.find_one({"_id": guildId})
-        groupData = (guildSettings or {}).get("features", {}).get(name, {})
-        return fromStored(model, groupData)
+        """Load one settings group for a guild through :meth:`loadVersioned`."""
+        return (await self.loadVersioned(guildId, model)).value
+
+    async def loadVersioned[T: SettingsGroup](self, guildId: int, model: type[T]) -> Versioned[T]:
+        """Load one settings group and the guild document version from one read."""
+        projection = groupProjection([model.name]) | {VERSION_FIELD: 1}
+        with timeOperation("mongo", "load", model.name):
+            guildSettings = await self.collection.find_one({"_id": guildId}, projection)
+        config, writeBack = _decodeGroup(guildId, model, guildSettings, model.name)
+        await self._writeBack([writeBack])
+        return Versioned(cast(T, config), _documentVersion(guildSettings))
+
+    async def loadMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Load several settings groups for a guild from one document read."""
+        projection = groupProjection(model.name for model in models)
+        with timeOperation("mongo", "loadMany", ALL_GROUPS):
+            guildSettings = await self.collection.find_one({"_id": guildId}, projection)
+        decoded = {model.name: _decodeGroup(guildId, model, guildSettings, model.name) for model in models}
+        await self._writeBack([writeBack for _, writeBack in decoded.values()])
+        return {name: config for name, (config, _) in decoded.items()}
+
+    async def loadGuilds(
+        self,
+        guildIds: Sequence[int],
+        models: Sequence[type[SettingsGroup]],
+    ) -> dict[int, list[SettingsGroup]]:
+        """Load settings groups for many guilds with one ``$in`` query; guilds without a document get defaults."""
+        projection = groupProjection(model.name for model in models)
+        cursor = self.collection.find({"_id": {"$in": list(guildIds)}}, projection)
+        with timeOperation("mongo", "loadGuilds", ALL_GROUPS):
+            documents = {document["_id"]: document async for document in cursor}
+        loaded: dict[int, list[SettingsGroup]] = {}
+        writeBacks: list[UpdateOne | None] = []
+        for guildId in guildIds:
+            decoded = [_decodeGroup(guildId, model, documents.get(guildId), model.name) for model in models]
+            loaded[guildId] = [config for config, _ in decoded]
+            writeBacks.extend(writeBack for _, writeBack in decoded)
+        await self._writeBack(writeBacks)
+        return loaded
 
     async def setField(self, guildId: int, name: str, field: str, value: object) -> None:
         """Persist one settings group field."""
-        fieldKey = f"features.{name}.{field}"
-        await self.collection.update_one(
-            {"_id": guildId},
-            {"$set": {fieldKey: value}},
-            upsert=True,
+        await self.updateFields(guildId, name, {field: value}, ())
+
+    async def unsetField(self, guildId: int, name: str, field: str) -> None:
+        """Remove one stored settings group field."""
+        await self.updateFields(guildId, name, {}, (field,))
+
+    async def updateFields(
+        self,
+        guildId: int,
+        name: str,
+        values: Mapping[str, object],
+        unset: Sequence[str],
+    ) -> None:
+        """Set and remove several fields of one settings group; the version-free form of :meth:`updateGroup`."""
+        if not values and not unset:
+            return
+        operation = "setField" if not unset else "unsetField" if not values else "updateFields"
+        with timeOperation("mongo", operation, name):
+            await self._writeGroup(guildId, name, values, unset, None)
+        LOGGER.info(
+            "Updated %s for guild %s (set %s, unset %s).",
+            name,
+            guildId,
+            sorted(values),
+            sorted(unset),
+        )
+
+    async def updateGroup[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        values: Mapping[str, object],
+        unset: Sequence[str],
+        *,
+        expectedVersion: int | None = None,
+    ) -> Versioned[T] | None:
+        """
+        Update one group with ``findOneAndUpdate`` and return the group and version after the write.
+
+        With ``expectedVersion`` the filter also matches the guild version, so
+        the write is a compare-and-set; a document created by a concurrent
+        upsert surfaces as a duplicate key and is reported as a conflict too.
+        """
+        with timeOperation("mongo", "updateGroup", model.name) as timer:
+            guildSettings = await self._writeGroup(guildId, model.name, values, unset, expectedVersion)
+            # Removing fields never creates a document; with none stored there is nothing to remove.
+            if (
+                guildSettings is None
+                and not values
+                and expectedVersion in (None, 0)
+                and await self.collection.find_one({"_id": guildId}, {"_id": 1}) is None
+            ):
+                return Versioned(fromStored(model, {}), 0)
+            if guildSettings is None:
+                timer.result = "conflict"
+                return None
+        LOGGER.info(
+            "Updated %s for guild %s to version %s (set %s, unset %s).",
+            model.name,
+            guildId,
+            _documentVersion(guildSettings),
+            sorted(values),
+            sorted(unset),
+        )
+        config, writeBack = _decodeGroup(guildId, model, guildSettings, model.name)
+        await self._writeBack([writeBack])
+        return Versioned(cast(T, config), _documentVersion(guildSettings))
+
+    async def _writeGroup(
+        self,
+        guildId: int,
+        name: str,
+        values: Mapping[str, object],
+        unset: Sequence[str],
+        expectedVersion: int | None,
+    ) -> Mapping[str, Any] | None:
+        """Apply one group update and return the group and version after it, or ``None`` when nothing matched."""
+        query: dict[str, object] = {"_id": guildId}
+        if expectedVersion is not None:
+            # Documents written before versioning have no version field and count as version 0.
+            query[VERSION_FIELD] = expectedVersion or {"$in": [None, 0]}
+        try:
+            return await self.collection.find_one_and_update(
+                query,
+                _fieldUpdate(name, values, unset),
+                projection=groupProjection([name]) | {VERSION_FIELD: 1},
+                # Only upsert when something is set; removing fields never creates a document.
+                upsert=bool(values),
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None
+
+    async def _writeBack(self, operations: Sequence[UpdateOne | None]) -> None:
+        """Persist groups migrated on read; each write applies only if nobody migrated the group meanwhile."""
+        pending = [operation for operation in operations if operation is not None]
+        if not pending:
+            return
+        with timeOperation("mongo", "migrate", ALL_GROUPS):
+            await self.collection.bulk_write(pending, ordered=False)
+        LOGGER.info("Migrated %s settings groups to their current schema on read.", len(pending))
+
+    async def close(self) -> None:
+        """Do nothing; the MongoDB client is owned by the caller."""
+
+
+class SqliteSettingsStore:
+    """
+    Embedded SQLite persistence for single-node deployments, load tests, and benchmarks.
+
+    Each guild is one row whose ``features`` column holds a JSON object shaped
+    like the ``features`` field of the MongoDB document, so groups migrate on
+    read the same way. The database runs in WAL mode. Calls run in a worker
+    thread on one connection, one at a time.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        """Open (or create) the database at ``path``; ``:memory:`` keeps it in process memory."""
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS settings "
+            "(guild_id INTEGER PRIMARY KEY, features TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0)"
         )
-        LOGGER.info("Set %s.%s for guild %s.", name, field, guildId)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(settings)")}
+        if VERSION_FIELD not in columns:
+            self._connection.execute("ALTER TABLE settings ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._lock = threading.Lock()
+
+    async def load[T: SettingsGroup](self, guildId: int, name: str, model: type[T]) -> T:
+        """Load one settings group for a guild through :meth:`loadVersioned`."""
+        return (await self.loadVersioned(guildId, model)).value
+
+    async def loadVersioned[T: SettingsGroup](self, guildId: int, model: type[T]) -> Versioned[T]:
+        """Load one settings group and the guild row version from one read."""
+        with timeOperation("sqlite", "load", model.name):
+            loaded = await self._run(lambda: self._loadGuilds([guildId], [model]))
+        configs, version = loaded[guildId]
+        return Versioned(cast(T, configs[0]), version)
+
+    async def loadMany(self, guildId: int, models: Sequence[type[SettingsGroup]]) -> dict[str, SettingsGroup]:
+        """Load several settings groups for a guild from one row read."""
+        with timeOperation("sqlite", "loadMany", ALL_GROUPS):
+            loaded = await self._run(lambda: self._loadGuilds([guildId], models))
+        return {model.name: config for model, config in zip(models, loaded[guildId][0], strict=True)}
+
+    async def loadGuilds(
+        self,
+        guildIds: Sequence[int],
+        models: Sequence[type[SettingsGroup]],
+    ) -> dict[int, list[SettingsGroup]]:
+        """Load settings groups for many guilds in batched ``IN`` queries; guilds without a row get defaults."""
+        with timeOperation("sqlite", "loadGuilds", ALL_GROUPS):
+            loaded = await self._run(lambda: self._loadGuilds(guildIds, models))
+        return {guildId: configs for guildId, (configs, _) in loaded.items()}
+
+    async def setField(self, guildId: int, name: str, field: str, value: object) -> None:
+        """Persist one settings group field."""
+        await self.updateFields(guildId, name, {field: value}, ())
 
     async def unsetField(self, guildId: int, name: str, field: str) -> None:
         """Remove one stored settings group field."""
-        fieldKey = f"features.{name}.{field}"
-        await self.collection.update_one(
-            {"_id": guildId},
-            {"$unset": {fieldKey: ""}},
+        await self.updateFields(guildId, name, {}, (field,))
+
+    async def updateFields(
+        self,
+        guildId: int,
+        name: str,
+        values: Mapping[str, object],
+        unset: Sequence[str],
+    ) -> None:
+        """Set and remove several fields of one settings group; the version-free form of :meth:`updateGroup`."""
+        if not values and not unset:
+            return
+        operation = "setField" if not unset else "unsetField" if not values else "updateFields"
+        with timeOperation("sqlite", operation, name):
+            await self._run(lambda: self._updateGroup(guildId, name, values, unset, None))
+        LOGGER.info(
+            "Updated %s for guild %s (set %s, unset %s).",
+            name,
+            guildId,
+            sorted(values),
+            sorted(unset),
+        )
+
+    async def updateGroup[T: SettingsGroup](
+        self,
+        guildId: int,
+        model: type[T],
+        values: Mapping[str, object],
+        unset: Sequence[str],
+        *,
+        expectedVersion: int | None = None,
+    ) -> Versioned[T] | None:
+        """Update one group in a write transaction that checks ``expectedVersion`` and bumps the row version."""
+        with timeOperation("sqlite", "updateGroup", model.name) as timer:
+            written = await self._run(lambda: self._updateGroup(guildId, model.name, values, unset, expectedVersion))
+            if written is None:
+                timer.result = "conflict"
+                return None
+        data, version = written
+        LOGGER.info(
+            "Updated %s for guild %s to version %s (set %s, unset %s).",
+            model.name,
+            guildId,
+            version,
+            sorted(values),
+            sorted(unset),
+        )
+        return Versioned(fromStored(model, upgradeGroup(model, data) or data), version)
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        await self._run(self._connection.close)
+
+    async def _run[R](self, function: Callable[[], R]) -> R:
+        """Run a blocking database call in a worker thread, one call at a time."""
+        return await asyncio.to_thread(lambda: self._locked(function))
+
+    def _locked[R](self, function: Callable[[], R]) -> R:
+        """Hold the connection lock for one call, even if the awaiting task was cancelled meanwhile."""
+        with self._lock:
+            return function()
+
+    @contextmanager
+    def _transaction(self, mode: str = "IMMEDIATE") -> Generator[sqlite3.Connection]:
+        """Hold a transaction: a write lock from the start by default, or a ``DEFERRED`` read snapshot."""
+        self._connection.execute(f"BEGIN {mode}")
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def _loadGuilds(
+        self,
+        guildIds: Sequence[int],
+        models: Sequence[type[SettingsGroup]],
+    ) -> dict[int, tuple[list[SettingsGroup], int]]:
+        """Decode groups and the row version of many guilds, writing back any group migrated on read."""
+        with self._transaction("DEFERRED") as connection:
+            rows: dict[int, tuple[dict[str, Any], int]] = {}
+            for start in range(0, len(guildIds), SQLITE_BATCH_SIZE):
+                batch = list(guildIds[start : start + SQLITE_BATCH_SIZE])
+                placeholders = ",".join("?" * len(batch))
+                query = f"SELECT guild_id, features, version FROM settings WHERE guild_id IN ({placeholders})"
+                rows.update(
+                    (guildId, (json.loads(features), version))
+                    for guildId, features, version in connection.execute(query, batch)
+                )
+        loaded: dict[int, tuple[list[SettingsGroup], int]] = {}
+        migrated: list[tuple[str, int, int]] = []
+        for guildId in guildIds:
+            features, version = rows.get(guildId, ({}, 0))
+            configs: list[SettingsGroup] = []
+            changed = False
+            for model in models:
+                data = _groupData({"features": features}, model.name)
+                upgraded = upgradeGroup(model, data)
+                if upgraded is not None:
+                    features[model.name] = data = upgraded
+                    changed = True
+                configs.append(fromStored(model, data))
+            loaded[guildId] = (configs, version)
+            if changed:
+                migrated.append((_encodeFeatures(features), guildId, version))
+        if migrated:
+            # Only rows unchanged since the read; schema upgrades keep the stored values, so the version stays.
+            with self._transaction() as connection:
+                connection.executemany("UPDATE settings SET features = ? WHERE guild_id = ? AND version = ?", migrated)
+            LOGGER.info("Migrated settings of %s guilds to their current schema on read.", len(migrated))
+        return loaded
+
+    def _updateGroup(
+        self,
+        guildId: int,
+        name: str,
+        values: Mapping[str, object],
+        unset: Sequence[str],
+        expectedVersion: int | None,
+    ) -> tuple[Mapping[str, object], int] | None:
+        """
+        Apply one group update to a guild row and return the group and the new row version.
+
+        Returns ``None`` when the row is no longer at ``expectedVersion``.
+        Removing fields never creates a row.
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT features, version FROM settings WHERE guild_id = ?", (guildId,)).fetchone()
+            features, version = ({}, 0) if row is None else (json.loads(row[0]), row[1])
+            if expectedVersion is not None and version != expectedVersion:
+                return None
+            if row is None and not values:
+                return {}, 0
+            group = features.setdefault(name, {})
+            group.update(values)
+            for field in unset:
+                group.pop(field, None)
+            self._writeRow(connection, guildId, features, version + 1)
+            return group, version + 1
+
+    @staticmethod
+    def _writeRow(connection: sqlite3.Connection, guildId: int, features: Mapping[str, Any], version: int) -> None:
+        """Upsert the ``features`` JSON and version of one guild."""
+        connection.execute(
+            "INSERT INTO settings (guild_id, features, version) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET features = excluded.features, version = excluded.version",
+            (guildId, _encodeFeatures(features), version),
         )
-        LOGGER.info("Unset %s.%s for guild %s.", name, field, guildId)
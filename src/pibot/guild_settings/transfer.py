@@ -0,0 +1,125 @@
+"""Streaming NDJSON export and import of guild settings documents."""
+
+import json
+import logging
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, TextIO
+
+from pydantic_core import to_jsonable_python
+from pymongo import UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+
+from pibot.guild_settings.cache import ValkeySettingsCache
+from pibot.guild_settings.migration import stampVersion, upgradeGroup
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import discoverSettingsGroups
+from pibot.guild_settings.serializer import fromStored, toStored
+from pibot.guild_settings.store import VERSION_FIELD
+
+LOGGER = logging.getLogger("guild_settings.transfer")
+
+
+@dataclass
+class TransferStats:
+    """Counts reported by :func:`exportSettings` and :func:`importSettings`."""
+
+    guilds: int = 0
+    groups: int = 0
+    skippedGroups: int = 0
+    skippedLines: int = 0
+
+
+def normalizeFeatures(
+    guildId: int,
+    features: Mapping[str, Any],
+    groups: Mapping[str, type[SettingsGroup]],
+    stats: TransferStats,
+) -> dict[str, dict[str, object]]:
+    """Migrate and validate each settings group of a guild document; unknown or invalid groups are dropped."""
+    normalized: dict[str, dict[str, object]] = {}
+    for name, data in features.items():
+        model = groups.get(name)
+        if model is None or not isinstance(data, Mapping):
+            LOGGER.warning("Skipping unknown settings group %r of guild %s.", name, guildId)
+            stats.skippedGroups += 1
+            continue
+        try:
+            upgraded = upgradeGroup(model, data)
+            config = fromStored(model, data if upgraded is None else upgraded)
+        except ValueError as exc:
+            LOGGER.warning("Skipping invalid settings group %r of guild %s: %s", name, guildId, exc)
+            stats.skippedGroups += 1
+            continue
+        normalized[name] = stampVersion(model, toStored(config))
+        stats.groups += 1
+    return normalized
+
+
+async def exportSettings(collection: AsyncCollection, output: TextIO, *, batchSize: int = 500) -> TransferStats:
+    """Write every guild settings document to ``output`` as one JSON line each, validated against the registry."""
+    groups = discoverSettingsGroups()
+    stats = TransferStats()
+    async for document in collection.find({}, batch_size=batchSize).sort("_id", 1):
+        guildId = document["_id"]
+        features = normalizeFeatures(guildId, document.get("features") or {}, groups, stats)
+        line = {"_id": guildId, "features": to_jsonable_python(features)}
+        output.write(json.dumps(line, separators=(",", ":")) + "\n")
+        stats.guilds += 1
+    return stats
+
+
+async def importSettings(
+    collection: AsyncCollection,
+    lines: Iterable[str],
+    *,
+    cache: ValkeySettingsCache | None = None,
+    batchSize: int = 500,
+) -> TransferStats:
+    """
+    Upsert guild settings from NDJSON lines in unordered bulk writes of ``batchSize``.
+
+    Each imported group replaces the stored group; groups not in a line are left
+    alone. After every batch the affected cache entries are dropped and running
+    replicas are told to evict their local copies.
+    """
+    groups = discoverSettingsGroups()
+    stats = TransferStats()
+    operations: list[UpdateOne] = []
+    touched: dict[int, set[str]] = {}
+
+    async def flush() -> None:
+        if not operations:
+            return
+        await collection.bulk_write(operations, ordered=False)
+        if cache is not None:
+            await cache.invalidateBulk({guildId: sorted(names) for guildId, names in touched.items()}, broadcast=True)
+        LOGGER.info("Imported settings for %s guilds.", stats.guilds)
+        operations.clear()
+        touched.clear()
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            document = json.loads(line)
+            guildId = document["_id"]
+            features = document.get("features") or {}
+            if not isinstance(guildId, int) or not isinstance(features, Mapping):
+                raise TypeError
+        except ValueError, KeyError, TypeError, AttributeError:
+            LOGGER.warning("Skipping malformed line %s.", number)
+            stats.skippedLines += 1
+            continue
+        normalized = normalizeFeatures(guildId, features, groups, stats)
+        if not normalized:
+            continue
+        update = {f"features.{name}": stored for name, stored in normalized.items()}
+        # Bump the guild version so in-flight compare-and-set writes see the import.
+        operations.append(UpdateOne({"_id": guildId}, {"$set": update, "$inc": {VERSION_FIELD: 1}}, upsert=True))
+        touched.setdefault(guildId, set()).update(normalized)
+        stats.guilds += 1
+        if len(operations) >= batchSize:
+            await flush()
+    await flush()
+    return stats
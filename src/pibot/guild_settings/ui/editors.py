@@ -4,9 +4,8 @@ from __future__ import annotations
 
 import inspect
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Coroutine
 from enum import Enum
-from typing import Any, ClassVar, Literal, Union, cast, get_args, get_origin
+from typing import Any, ClassVar, Literal, Union, get_args, get_origin
 
 import discord
 from discord import ui
@@ -27,6 +26,19 @@ def unwrapAnnotation(annotation: object) -> object:
     return annotation
 
 
+SETTING_CUSTOM_ID = (
+    r"settings:(?P<action>[a-z]+):(?P<guildId>[0-9]+):(?P<group>[^:]+)(?::(?P<field>\w+)(?::(?P<value>[^:]+))?)?"
+)
+
+
+def settingCustomId(action: str, guildId: int, group: str, field: str | None = None, value: str | None = None) -> str:
+    """Return the custom ID routing a panel ``action`` to a guild, settings group, optional field and value."""
+    customId = f"settings:{action}:{guildId}:{group}"
+    if field is None:
+        return customId
+    return f"{customId}:{field}" if value is None else f"{customId}:{field}:{value}"
+
+
 def partitionFieldMetadata(fieldInfo: FieldInfo) -> tuple[list[type[SettingEditor]], list[object]]:
     """Split field metadata into UI editors and Pydantic validators."""
     uiTypes = [meta for meta in fieldInfo.metadata if isinstance(meta, type) and issubclass(meta, SettingEditor)]
@@ -85,7 +97,13 @@ class SettingEditor(ABC):
     @classmethod
     @abstractmethod
     def buildControls(
-        cls, configClass: type[SettingsGroup], config: SettingsGroup, field: str, header: ui.TextDisplay
+        cls,
+        configClass: type[SettingsGroup],
+        config: SettingsGroup,
+        field: str,
+        header: ui.TextDisplay,
+        *,
+        guildId: int,
     ) -> list[ui.Item]:
         """Build Discord layout components for one setting field."""
 
@@ -115,39 +133,30 @@ class BoolEditor(SettingEditor):
 
     @classmethod
     def buildControls(
-        cls, configClass: type[SettingsGroup], config: SettingsGroup, field: str, header: ui.TextDisplay
+        cls,
+        configClass: type[SettingsGroup],
+        config: SettingsGroup,
+        field: str,
+        header: ui.TextDisplay,
+        *,
+        guildId: int,
     ) -> list[ui.Item]:
-        """Build a toggle button for a boolean setting."""
+        """Build a button that sets a boolean setting to the opposite of the value shown."""
         value = getattr(config, field)
         button = ui.Button(
             label="Turn off" if value else "Turn on",
             style=discord.ButtonStyle.success if value else discord.ButtonStyle.danger,
-            custom_id=f"settings:toggle:{field}",
+            custom_id=settingCustomId("set", guildId, configClass.name, field, "0" if value else "1"),
         )
         return [ui.Section(header, accessory=button)]
 
-    @classmethod
-    def parseInteractionValue(
-        cls, interaction: discord.Interaction, configClass: type[SettingsGroup], config: SettingsGroup, field: str
-    ) -> object:
-        """Toggle the boolean field value."""
-        return not getattr(config, field)
-
-
-def bindUiCallback(
-    item: ui.Button | ui.Select | ui.ChannelSelect,
-    callback: Callable[[discord.Interaction], Coroutine[Any, Any, None]],
-) -> None:
-    """Assign a callback to a Discord UI item (discord.py stubs expect a bound method)."""
-    item.callback = cast(Any, callback)
-
 
-def defaultResetButton(field: str) -> ui.Button:
+def defaultResetButton(guildId: int, configClass: type[SettingsGroup], field: str) -> ui.Button:
     """Build a button that resets one optional field to its model default."""
     button = ui.Button(
         label="Use default",
         style=discord.ButtonStyle.secondary,
-        custom_id=f"settings:reset:{field}",
+        custom_id=settingCustomId("reset", guildId, configClass.name, field),
     )
 
     return button
@@ -158,7 +167,13 @@ class ChoiceEditor(SettingEditor):
 
     @classmethod
     def buildControls(
-        cls, configClass: type[SettingsGroup], config: SettingsGroup, field: str, header: ui.TextDisplay
+        cls,
+        configClass: type[SettingsGroup],
+        config: SettingsGroup,
+        field: str,
+        header: ui.TextDisplay,
+        *,
+        guildId: int,
     ) -> list[ui.Item]:
         """Build a select menu for a choice-based setting."""
         fieldInfo = configClass.model_fields[field]
@@ -170,7 +185,7 @@ class ChoiceEditor(SettingEditor):
             options=[
                 discord.SelectOption(label=choice, value=choice, default=choice == str(value)) for choice in choices
             ],
-            custom_id=f"settings:choice:{field}",
+            custom_id=settingCustomId("choice", guildId, configClass.name, field),
         )
         return [header, ui.ActionRow(select)]
 
@@ -235,15 +250,21 @@ class ChannelEditor(SettingEditor):
 
     @classmethod
     def buildControls(
-        cls, configClass: type[SettingsGroup], config: SettingsGroup, field: str, header: ui.TextDisplay
+        cls,
+        configClass: type[SettingsGroup],
+        config: SettingsGroup,
+        field: str,
+        header: ui.TextDisplay,
+        *,
+        guildId: int,
     ) -> list[ui.Item]:
         """Build a channel select and optional reset button."""
         channelSelect = ui.ChannelSelect(
             placeholder="Select a channel",
             channel_types=[discord.ChannelType.text, discord.ChannelType.news],
-            custom_id=f"settings:channel:{field}",
+            custom_id=settingCustomId("channel", guildId, configClass.name, field),
         )
-        return [header, ui.ActionRow(channelSelect), ui.ActionRow(defaultResetButton(field))]
+        return [header, ui.ActionRow(channelSelect), ui.ActionRow(defaultResetButton(guildId, configClass, field))]
 
     @classmethod
     def parseInteractionValue(
@@ -262,20 +283,26 @@ class TextInputEditor(SettingEditor):
 
     @classmethod
     def buildControls(
-        cls, configClass: type[SettingsGroup], config: SettingsGroup, field: str, header: ui.TextDisplay
+        cls,
+        configClass: type[SettingsGroup],
+        config: SettingsGroup,
+        field: str,
+        header: ui.TextDisplay,
+        *,
+        guildId: int,
     ) -> list[ui.Item]:
         """Build edit and optional reset buttons that open a modal."""
         fieldInfo = configClass.model_fields[field]
         editButton = ui.Button(
             label="Edit",
             style=discord.ButtonStyle.primary,
-            custom_id=f"settings:edit:{field}",
+            custom_id=settingCustomId("edit", guildId, configClass.name, field),
         )
 
         if fieldInfo.is_required():
             return [header, ui.ActionRow(editButton)]
 
-        return [header, ui.ActionRow(editButton, defaultResetButton(field))]
+        return [header, ui.ActionRow(editButton, defaultResetButton(guildId, configClass, field))]
 
 
 class StringEditor(TextInputEditor):
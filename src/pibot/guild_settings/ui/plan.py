@@ -0,0 +1,67 @@
+"""Per-model render plans for the settings panel."""
+
+from dataclasses import dataclass
+
+import discord
+
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import getSortedSettingsGroups
+from pibot.guild_settings.ui.editors import SettingEditor, resolveSettingEditor
+
+
+@dataclass(frozen=True, slots=True)
+class FieldPlan:
+    """Resolved editor and static header text for one panel field."""
+
+    name: str
+    title: str
+    editor: type[SettingEditor]
+
+
+@dataclass(frozen=True, slots=True)
+class PanelPlan:
+    """Everything about a feature page that does not depend on the stored values."""
+
+    heading: str
+    fields: tuple[FieldPlan, ...]
+
+
+_PLANS: dict[type[SettingsGroup], PanelPlan] = {}
+_FEATURE_OPTIONS: tuple[tuple[tuple[str, type[SettingsGroup]], ...], tuple[tuple[str, str], ...]] | None = None
+
+
+def getPanelPlan(model: type[SettingsGroup]) -> PanelPlan:
+    """Return the render plan for a settings group, resolving editors on first use."""
+    plan = _PLANS.get(model)
+    if plan is None:
+        fields = tuple(
+            FieldPlan(
+                name=name,
+                title=f"**{name}**\n{fieldInfo.description or name}",
+                editor=resolveSettingEditor(model, name),
+            )
+            for name, fieldInfo in model.model_fields.items()
+            if name != "enabled" or model.disableable
+        )
+        heading = f"## {model.name}\n{model.description}\nChanges save immediately."
+        plan = _PLANS[model] = PanelPlan(heading=heading, fields=fields)
+    return plan
+
+
+def featureSelectOptions(current: str) -> list[discord.SelectOption]:
+    """Return feature picker options sorted by name, with ``current`` preselected."""
+    global _FEATURE_OPTIONS
+    groups = getSortedSettingsGroups()
+    if _FEATURE_OPTIONS is None or _FEATURE_OPTIONS[0] is not groups:
+        _FEATURE_OPTIONS = (groups, tuple((name, group.description[:100]) for name, group in groups))
+    return [
+        discord.SelectOption(label=name, value=name, description=description, default=name == current)
+        for name, description in _FEATURE_OPTIONS[1]
+    ]
+
+
+def clearPanelPlans() -> None:
+    """Drop every cached plan and the feature options (for benchmarks and tests)."""
+    global _FEATURE_OPTIONS
+    _PLANS.clear()
+    _FEATURE_OPTIONS = None
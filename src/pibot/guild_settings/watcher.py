@@ -0,0 +1,180 @@
+"""MongoDB change-stream watcher that keeps the settings cache coherent with external writes."""
+
+import asyncio
+import contextlib
+import logging
+import uuid
+from collections.abc import Awaitable, Mapping
+from typing import Any, cast
+
+import bson
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import OperationFailure, PyMongoError
+from valkey.exceptions import ValkeyError
+
+from pibot.clients import ValkeyClient
+from pibot.guild_settings.cache import CACHE_KEY_PREFIX, SettingsCache
+
+LOGGER = logging.getLogger("guild_settings.watcher")
+
+RESUME_TOKEN_KEY = f"{CACHE_KEY_PREFIX}:changestream:token"
+# Holder of this key is the one replica that tails the change stream.
+LEADER_KEY = f"{CACHE_KEY_PREFIX}:changestream:leader"
+LEADER_LEASE_SECONDS = 30.0
+RESTART_DELAY_SECONDS = 5.0
+# Extends KEYS[1] to ARGV[2] milliseconds when ARGV[1] holds it; returns 0 otherwise.
+RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+  return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+# Deletes KEYS[1] when ARGV[1] holds it.
+RELEASE_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+  return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+# Server error code when a resume token has fallen off the oplog.
+CHANGE_STREAM_HISTORY_LOST = 286
+
+_WATCHED_OPERATIONS = ["insert", "update", "replace", "delete"]
+
+
+def changedGroups(change: Mapping[str, Any]) -> list[str] | None:
+    """
+    Return the settings group names touched by one change event.
+
+    ``None`` means every group of the guild may have changed (whole-document
+    writes or a write to ``features`` itself); an empty list means no group did.
+    """
+    if change["operationType"] != "update":
+        return None
+    description = change.get("updateDescription") or {}
+    paths = [*(description.get("updatedFields") or {}), *(description.get("removedFields") or [])]
+    names: set[str] = set()
+    for path in paths:
+        root, _, rest = path.partition(".")
+        if root != "features":
+            continue
+        if not rest:
+            return None
+        names.add(rest.partition(".")[0])
+    return sorted(names)
+
+
+class SettingsChangeWatcher:
+    """
+    Tail the settings collection change stream and evict affected cache entries.
+
+    Catches writes made outside :class:`~pibot.guild_settings.service.SettingsService`
+    (manual fixes, scripts). Only the replica holding the Valkey lease at
+    :data:`LEADER_KEY` watches, so each change is evicted and broadcast once
+    rather than once per replica; the others wait to take over when the lease
+    lapses. The resume token is stored in Valkey after each event so the next
+    leader continues where the previous one stopped.
+    """
+
+    def __init__(self, collection: AsyncCollection, cache: SettingsCache, client: ValkeyClient) -> None:
+        """Initialize with the settings collection, the cache to evict from, and Valkey for the lease and tokens."""
+        self._collection = collection
+        self._cache = cache
+        self._client = client
+        self._instanceId = uuid.uuid4().hex
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start watching in a background task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="settings-change-watcher")
+
+    async def stop(self) -> None:
+        """Stop watching and hand the lease to another replica."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await cast(Awaitable[int], self._client.eval(RELEASE_LEASE_SCRIPT, 1, LEADER_KEY, self._instanceId))
+        except ValkeyError, OSError:
+            LOGGER.warning("Could not release the settings change stream lease.", exc_info=True)
+
+    async def apply(self, change: Mapping[str, Any]) -> None:
+        """Evict the cache entries affected by one change event."""
+        guildId = change["documentKey"]["_id"]
+        names = changedGroups(change)
+        if names == []:
+            return
+        await self._cache.invalidate(guildId, names)
+        LOGGER.debug("Evicted %s for guild %s after a %s.", names or "all groups", guildId, change["operationType"])
+
+    async def _run(self) -> None:
+        """Watch while holding the lease until cancelled, restarting after errors."""
+        while True:
+            try:
+                if await self._acquireLease():
+                    await self._lead()
+            except OperationFailure as exc:
+                if exc.code != CHANGE_STREAM_HISTORY_LOST:
+                    LOGGER.warning("Settings change stream failed; restarting.", exc_info=True)
+                else:
+                    LOGGER.warning("Settings change stream resume token expired; continuing from now.")
+                    await self._forgetResumeToken()
+            except PyMongoError, ValkeyError, OSError:
+                LOGGER.warning("Settings change stream failed; restarting.", exc_info=True)
+            await asyncio.sleep(RESTART_DELAY_SECONDS)
+
+    async def _forgetResumeToken(self) -> None:
+        """Drop the stored resume token; on failure the next attempt hits the expired token and tries again."""
+        try:
+            await self._client.delete(RESUME_TOKEN_KEY)
+        except ValkeyError, OSError:
+            LOGGER.warning("Could not drop the expired settings change stream resume token.", exc_info=True)
+
+    async def _acquireLease(self) -> bool:
+        """Take or extend the watcher lease and return whether this replica holds it."""
+        leaseMs = int(LEADER_LEASE_SECONDS * 1000)
+        renew = self._client.eval(RENEW_LEASE_SCRIPT, 1, LEADER_KEY, self._instanceId, str(leaseMs))
+        # The asyncio clients always return an awaitable; valkey annotates eval for sync and async clients alike.
+        if await cast(Awaitable[int], renew):
+            return True
+        if await self._client.set(LEADER_KEY, self._instanceId, nx=True, px=leaseMs):
+            LOGGER.info("Took over the settings change stream.")
+            return True
+        return False
+
+    async def _lead(self) -> None:
+        """Watch the change stream, renewing the lease and stopping as soon as it is lost."""
+        watch = asyncio.create_task(self._watch())
+        try:
+            while not watch.done():
+                await asyncio.wait({watch}, timeout=LEADER_LEASE_SECONDS / 3)
+                if not watch.done() and not await self._acquireLease():
+                    LOGGER.warning("Lost the settings change stream lease to another replica.")
+                    break
+        finally:
+            if not watch.done():
+                watch.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await watch
+        if not watch.cancelled():
+            watch.result()
+
+    async def _watch(self) -> None:
+        """Open the change stream from the stored resume token and apply events until it closes."""
+        rawToken = await self._client.get(RESUME_TOKEN_KEY)
+        resumeAfter = bson.decode(rawToken) if rawToken else None
+        pipeline = [{"$match": {"operationType": {"$in": _WATCHED_OPERATIONS}}}]
+        async with await self._collection.watch(pipeline, resume_after=resumeAfter) as stream:
+            LOGGER.info("Watching settings changes%s.", " from stored resume token" if resumeAfter else "")
+            async for change in stream:
+                await self.apply(change)
+                if stream.resume_token is not None:
+                    await self._client.set(RESUME_TOKEN_KEY, bson.encode(stream.resume_token))
+        # The stream only ends on an invalidate event (collection dropped or renamed).
+        LOGGER.warning("Settings change stream was invalidated; restarting from now.")
+        await self._client.delete(RESUME_TOKEN_KEY)
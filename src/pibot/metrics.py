@@ -0,0 +1,244 @@
+"""In-process metrics with a Prometheus text exposition endpoint."""
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Self
+
+LOGGER = logging.getLogger("pibot.metrics")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Scrapers that have not sent a complete request by then are disconnected.
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labelText(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Return ``{name="value",...}`` for one series (empty when there are no labels)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelNames: Sequence[str] = ()) -> None:
+        """Initialize an empty counter."""
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the series selected by ``labels``."""
+        key = tuple(labels[name] for name in self.labelNames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of one series (``0`` when never incremented)."""
+        return self._values.get(tuple(labels[name] for name in self.labelNames), 0.0)
+
+    def render(self) -> list[str]:
+        """Return exposition lines for every series."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labelText(self.labelNames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelNames: Sequence[str] = ()) -> None:
+        """Initialize an empty gauge."""
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` (negative to subtract) to the series selected by ``labels``."""
+        key = tuple(labels[name] for name in self.labelNames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Subtract ``amount`` from the series selected by ``labels``."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the series selected by ``labels`` to ``value``."""
+        self._values[tuple(labels[name] for name in self.labelNames)] = value
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of one series (``0`` when never set)."""
+        return self._values.get(tuple(labels[name] for name in self.labelNames), 0.0)
+
+    def render(self) -> list[str]:
+        """Return exposition lines for every series."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labelText(self.labelNames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with a fixed set of label names and bucket bounds."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelNames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize an empty histogram."""
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self.buckets = (*sorted(buckets), math.inf)
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation in the series selected by ``labels``."""
+        key = tuple(labels[name] for name in self.labelNames)
+        counts, total = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        total[0] += value
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations in one series."""
+        series = self._series.get(tuple(labels[name] for name in self.labelNames))
+        return 0 if series is None else series[0][-1]
+
+    def render(self) -> list[str]:
+        """Return exposition lines (buckets, sum, count) for every series."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, counts, strict=True):
+                labels = _labelText(self.labelNames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_labelText(self.labelNames, key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labelText(self.labelNames, key)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def register[M: Counter | Gauge | Histogram](self, metric: M) -> M:
+        """Add a metric and return it; names must be unique."""
+        if metric.name in self._metrics:
+            msg = f"Metric {metric.name!r} is already registered."
+            raise ValueError(msg)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Timer:
+    """
+    Context manager that records one operation in a counter and a latency histogram.
+
+    Set :attr:`result` inside the block to label the outcome (e.g. ``hit`` or
+    ``miss``); it defaults to ``ok`` and becomes ``error`` when the block raises.
+    """
+
+    def __init__(self, counter: Counter, histogram: Histogram, **labels: str) -> None:
+        """Bind the metrics and the labels shared by both (the counter also gets ``result``)."""
+        self._counter = counter
+        self._histogram = histogram
+        self._labels = labels
+        self.result = "ok"
+        self._start = 0.0
+
+    def __enter__(self) -> Self:
+        """Start timing."""
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        excType: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Record the elapsed time and outcome."""
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+        self._counter.inc(1.0, **{**self._labels, "result": "error" if excType is not None else self.result})
+
+
+class MetricsServer:
+    """Minimal HTTP server answering every ``GET`` with the registry exposition."""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int) -> None:
+        """Initialize without listening yet."""
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+        LOGGER.info("Serving metrics on %s:%s.", self._host, self._port)
+
+    async def stop(self) -> None:
+        """Stop listening and wait for the socket to close."""
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one scrape request and close the connection."""
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT_SECONDS):
+                requestLine = await reader.readline()
+                while (await reader.readline()).strip():
+                    pass
+            if requestLine.startswith(b"GET "):
+                status, body = "200 OK", self._registry.render().encode()
+            else:
+                status, body = "405 Method Not Allowed", b""
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except ConnectionError, TimeoutError:
+            pass
+        finally:
+            writer.close()
@@ -4,11 +4,13 @@ import pytest
 from pymongo import AsyncMongoClient
 from testcontainers.community.mongodb import MongoDbContainer
 from testcontainers.community.valkey import ValkeyContainer
+from testcontainers.core.container import DockerContainer
+from testcontainers.core.waiting_utils import wait_for_logs
 from valkey.asyncio import Valkey
 
 from pibot.guild_settings.cache import ValkeySettingsCache
 from pibot.guild_settings.service import SettingsService
-from pibot.guild_settings.store import SettingsStore
+from pibot.guild_settings.store import MongoSettingsStore
 
 
 @pytest.fixture(scope="session")
@@ -25,6 +27,36 @@ def valkeyContainer():
     yield valkey
 
 
+# Cluster nodes announce 127.0.0.1 and are published on the same host ports, so redirects resolve locally.
+VALKEY_CLUSTER_PORTS = (7000, 7001, 7002)
+
+
+@pytest.fixture(scope="session")
+def valkeyClusterContainer():
+  """Three-primary Valkey Cluster in one testcontainer (needs a local Docker daemon)."""
+  nodes = " ".join(f"127.0.0.1:{port}" for port in VALKEY_CLUSTER_PORTS)
+  script = " && ".join(
+    [
+      f"valkey-server --port {port} --bind 0.0.0.0 --protected-mode no --cluster-enabled yes"
+      f" --cluster-config-file nodes-{port}.conf --cluster-announce-ip 127.0.0.1 --daemonize yes"
+      for port in VALKEY_CLUSTER_PORTS
+    ]
+    + [
+      "sleep 1",
+      f"valkey-cli --cluster create {nodes} --cluster-replicas 0 --cluster-yes",
+      "sleep 2",
+      "echo cluster-ready",
+      "tail -f /dev/null",
+    ]
+  )
+  container = DockerContainer("valkey/valkey:8").with_command(["sh", "-c", script])
+  for port in VALKEY_CLUSTER_PORTS:
+    container = container.with_bind_ports(port, port)
+  with container:
+    wait_for_logs(container, "cluster-ready")
+    yield container
+
+
 @pytest.fixture
 async def mongoClient(mongoContainer):
   """Async MongoDB client connected to the testcontainer."""
@@ -46,7 +78,7 @@ async def valkeyClient(valkeyContainer):
 @pytest.fixture
 async def settingsStore(mongoClient):
   """Yield a settings store backed by real MongoDB."""
-  yield SettingsStore(mongoClient)
+  yield MongoSettingsStore(mongoClient)
 
 
 @pytest.fixture
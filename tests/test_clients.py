@@ -0,0 +1,68 @@
+"""Tests for MongoDB and Valkey client construction and pool metrics."""
+
+from valkey.asyncio import Valkey
+
+from pibot.clients import (
+    MONGODB,
+    POOL_CREATED,
+    POOL_IN_USE,
+    POOL_WAITING,
+    VALKEY,
+    createMongoClient,
+    createValkeyClient,
+    createValkeyPubSubClient,
+)
+from pibot.config import MONGODB_READ_PREFERENCE, MongoClientConfig, ValkeyClientConfig
+
+
+async def testValkeyPoolRecordsUsage(valkeyContainer) -> None:
+    """The Valkey pool counts created connections and returns in-use connections to zero."""
+    # Arrange
+    created = POOL_CREATED.value(client=VALKEY)
+    client = createValkeyClient(valkeyContainer.get_connection_url(), ValkeyClientConfig(MAX_CONNECTIONS=4))
+
+    # Act
+    try:
+        assert await client.ping()
+        inUse = POOL_IN_USE.value(client=VALKEY)
+    finally:
+        await client.aclose()
+
+    # Assert
+    assert isinstance(client, Valkey)
+    assert client.connection_pool.max_connections == 4
+    assert POOL_CREATED.value(client=VALKEY) == created + 1
+    assert inUse == 0
+    assert POOL_WAITING.value(client=VALKEY) == 0
+
+
+async def testValkeyPubSubClientHasNoReadTimeout() -> None:
+    """Single-node pub/sub clients wait on idle subscriptions instead of timing out after the driver default."""
+    # Act
+    client = createValkeyPubSubClient("valkey://localhost:6379/0", ValkeyClientConfig())
+
+    # Assert
+    assert client.connection_pool.connection_kwargs["socket_timeout"] is None
+    await client.aclose()
+
+
+async def testMongoClientAppliesConfigAndRecordsUsage(mongoContainer) -> None:
+    """The MongoDB client uses the configured pool options and reports pool checkouts."""
+    # Arrange
+    created = POOL_CREATED.value(client=MONGODB)
+    config = MongoClientConfig(MAX_POOL_SIZE=7, READ_PREFERENCE=MONGODB_READ_PREFERENCE.PRIMARY_PREFERRED)
+    client = createMongoClient(mongoContainer.get_connection_url(), config)
+
+    # Act
+    try:
+        await client["discord"].command("ping")
+        options = client.options
+    finally:
+        await client.close()
+
+    # Assert
+    assert options.pool_options.max_pool_size == 7
+    assert options.read_preference.mongos_mode == "primaryPreferred"
+    assert POOL_CREATED.value(client=MONGODB) > created
+    assert POOL_IN_USE.value(client=MONGODB) == 0
+    assert POOL_WAITING.value(client=MONGODB) == 0
@@ -3,7 +3,16 @@
 import pytest
 from pydantic import ValidationError
 
-from pibot.config import COMMAND_SYNC_BEHAVIOR, BotConfig
+from pibot.config import (
+    COMMAND_SYNC_BEHAVIOR,
+    MONGODB_COMPRESSOR,
+    MONGODB_READ_PREFERENCE,
+    SETTINGS_CACHE_BACKEND,
+    SETTINGS_CACHE_CODEC,
+    SETTINGS_CACHE_LAYOUT,
+    SETTINGS_STORE,
+    BotConfig,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -13,7 +22,48 @@ def botEnv(monkeypatch: pytest.MonkeyPatch) -> None:
     for name in (
         "PIBOT_COMMAND_SYNC_BEHAVIOR",
         "PIBOT_ENABLE_DEV_TOOLS",
+        "PIBOT_METRICS_HOST",
+        "PIBOT_SETTINGS_STORE",
+        "PIBOT_SETTINGS_SQLITE_PATH",
+        "PIBOT_SETTINGS_MIGRATION_BATCH_SIZE",
+        "PIBOT_SETTINGS_MIGRATION_DELAY_SECONDS",
+        "PIBOT_METRICS_PORT",
         "PIBOT_LOG_LEVEL",
+        "PIBOT_SETTINGS_CACHE_BACKEND",
+        "PIBOT_SETTINGS_CACHE_LOCAL_MAX_SIZE",
+        "PIBOT_SETTINGS_CACHE_LOCAL_TTL_SECONDS",
+        "PIBOT_SETTINGS_CACHE_LAYOUT",
+        "PIBOT_SETTINGS_CACHE_CODEC",
+        "PIBOT_SETTINGS_CACHE_SOFT_TTL_SECONDS",
+        "PIBOT_SETTINGS_CACHE_HARD_TTL_SECONDS",
+        "PIBOT_SETTINGS_CACHE_WATCH_CHANGES",
+        "PIBOT_SETTINGS_CACHE_WARM_ON_STARTUP",
+        "PIBOT_SETTINGS_CACHE_WARM_BATCH_SIZE",
+        "PIBOT_SETTINGS_CACHE_WARM_CONCURRENCY",
+        "PIBOT_SETTINGS_CACHE_WRITE_DELAY_SECONDS",
+        "PIBOT_SETTINGS_CACHE_TRACKING",
+        "PIBOT_SETTINGS_CACHE_TRACKING_MAX_SIZE",
+        "PIBOT_SETTINGS_BREAKER_FAILURE_THRESHOLD",
+        "PIBOT_SETTINGS_BREAKER_RESET_TIMEOUT_SECONDS",
+        "PIBOT_SETTINGS_BREAKER_CALL_TIMEOUT_SECONDS",
+        "PIBOT_SETTINGS_BREAKER_FALLBACK_MAX_SIZE",
+        "PIBOT_MONGODB_MAX_POOL_SIZE",
+        "PIBOT_MONGODB_MIN_POOL_SIZE",
+        "PIBOT_MONGODB_MAX_IDLE_TIME_SECONDS",
+        "PIBOT_MONGODB_WAIT_QUEUE_TIMEOUT_SECONDS",
+        "PIBOT_MONGODB_CONNECT_TIMEOUT_SECONDS",
+        "PIBOT_MONGODB_SOCKET_TIMEOUT_SECONDS",
+        "PIBOT_MONGODB_SERVER_SELECTION_TIMEOUT_SECONDS",
+        "PIBOT_MONGODB_COMPRESSORS",
+        "PIBOT_MONGODB_ZLIB_COMPRESSION_LEVEL",
+        "PIBOT_MONGODB_READ_PREFERENCE",
+        "PIBOT_MONGODB_APP_NAME",
+        "PIBOT_VALKEY_MAX_CONNECTIONS",
+        "PIBOT_VALKEY_POOL_TIMEOUT_SECONDS",
+        "PIBOT_VALKEY_SOCKET_TIMEOUT_SECONDS",
+        "PIBOT_VALKEY_CONNECT_TIMEOUT_SECONDS",
+        "PIBOT_VALKEY_HEALTH_CHECK_INTERVAL_SECONDS",
+        "PIBOT_VALKEY_SOCKET_KEEPALIVE",
     ):
         monkeypatch.delenv(name, raising=False)
 
@@ -52,6 +102,9 @@ def testRuntimeFlagsDefaultFromEnv() -> None:
     # Assert
     assert config.commandSyncBehavior is COMMAND_SYNC_BEHAVIOR.GLOBAL
     assert config.enableDevTools is False
+    assert config.metricsPort == 0
+    assert config.metricsHost == "127.0.0.1"
+    assert config.settingsMigrationBatchSize == 100
 
 
 def testRuntimeFlagsOverrideFromEnv(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -98,6 +151,37 @@ def testRequiredValkeyUriRaisesWhenMissing(monkeypatch: pytest.MonkeyPatch) -> N
         BotConfig()
 
 
+def testEmbeddedBackendsNeedNoUris(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The SQLite store and memory cache start without MongoDB or Valkey URIs."""
+    # Arrange
+    monkeypatch.delenv("PIBOT_MONGODB_URI", raising=False)
+    monkeypatch.delenv("PIBOT_VALKEY_URI", raising=False)
+    monkeypatch.setenv("PIBOT_SETTINGS_STORE", "sqlite")
+    monkeypatch.setenv("PIBOT_SETTINGS_SQLITE_PATH", "/tmp/settings.db")
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_BACKEND", "memory")
+
+    # Act
+    config = BotConfig()
+
+    # Assert
+    assert config.settingsStore is SETTINGS_STORE.SQLITE
+    assert config.settingsSqlitePath == "/tmp/settings.db"
+    assert config.settingsCache.backend is SETTINGS_CACHE_BACKEND.MEMORY
+    assert config.mongodbUri == ""
+
+
+def testSqliteStoreStillNeedsValkeyUriForValkeyCache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Only the MongoDB URI becomes optional when just the store is embedded."""
+    # Arrange
+    monkeypatch.delenv("PIBOT_MONGODB_URI", raising=False)
+    monkeypatch.delenv("PIBOT_VALKEY_URI", raising=False)
+    monkeypatch.setenv("PIBOT_SETTINGS_STORE", "sqlite")
+
+    # Act / Assert
+    with pytest.raises(ValidationError):
+        BotConfig()
+
+
 def testValkeyUriLoadsFromEnv() -> None:
     """Valkey URI loads from env."""
     config = BotConfig()
@@ -105,6 +189,119 @@ def testValkeyUriLoadsFromEnv() -> None:
     assert config.valkeyUri == "valkey://localhost:6379/0"
 
 
+def testSettingsCacheDefaults() -> None:
+    """Local settings cache tuning uses defaults when unset."""
+    config = BotConfig()
+
+    assert config.settingsStore is SETTINGS_STORE.MONGODB
+    assert config.settingsCache.backend is SETTINGS_CACHE_BACKEND.VALKEY
+    assert config.settingsCache.localMaxSize == 10_000
+    assert config.settingsCache.localTtlSeconds == 60.0
+    assert config.settingsCache.layout is SETTINGS_CACHE_LAYOUT.KEYS
+    assert config.settingsCache.codec is SETTINGS_CACHE_CODEC.BINARY
+    assert config.settingsCache.softTtlSeconds == 300.0
+    assert config.settingsCache.hardTtlSeconds == 86_400.0
+    assert config.settingsCache.watchChanges is False
+    assert config.settingsCache.warmOnStartup is True
+    assert config.settingsCache.warmBatchSize == 500
+    assert config.settingsCache.warmConcurrency == 4
+    assert config.settingsCache.writeDelaySeconds == 0.0
+    assert config.settingsCache.tracking is False
+    assert config.settingsCache.trackingMaxSize == 10_000
+
+
+def testSettingsCacheOverrideFromEnv(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Local settings cache tuning loads from env."""
+    # Arrange
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_LOCAL_MAX_SIZE", "0")
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_LOCAL_TTL_SECONDS", "2.5")
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_LAYOUT", "hash")
+
+    # Act
+    config = BotConfig()
+
+    # Assert
+    assert config.settingsCache.localMaxSize == 0
+    assert config.settingsCache.localTtlSeconds == 2.5
+    assert config.settingsCache.layout is SETTINGS_CACHE_LAYOUT.HASH
+
+
+def testSettingsCacheSoftTtlAboveHardTtlRaises(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A soft TTL longer than the hard TTL fails at config load."""
+    # Arrange
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_SOFT_TTL_SECONDS", "600")
+    monkeypatch.setenv("PIBOT_SETTINGS_CACHE_HARD_TTL_SECONDS", "60")
+
+    # Act / Assert
+    with pytest.raises(ValidationError):
+        BotConfig()
+
+
+def testSettingsBreakerDefaults() -> None:
+    """Settings circuit breakers use defaults when unset."""
+    config = BotConfig()
+
+    assert config.settingsBreaker.failureThreshold == 5
+    assert config.settingsBreaker.resetTimeoutSeconds == 30.0
+    assert config.settingsBreaker.callTimeoutSeconds == 5.0
+    assert config.settingsBreaker.fallbackMaxSize == 10_000
+
+
+def testClientPoolDefaults() -> None:
+    """MongoDB and Valkey clients get production pool defaults when unset."""
+    config = BotConfig()
+
+    assert config.mongodb.maxPoolSize == 50
+    assert config.mongodb.minPoolSize == 0
+    assert config.mongodb.waitQueueTimeoutSeconds == 5.0
+    assert config.mongodb.compressors == (MONGODB_COMPRESSOR.ZLIB,)
+    assert config.mongodb.readPreference is MONGODB_READ_PREFERENCE.PRIMARY
+    assert config.valkey.maxConnections == 50
+    assert config.valkey.poolTimeoutSeconds == 5.0
+    assert config.valkey.healthCheckIntervalSeconds == 30
+    assert config.valkey.socketKeepalive is True
+
+
+def testClientPoolOverrideFromEnv(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Pool sizes, compressors and read preference load from env."""
+    # Arrange
+    monkeypatch.setenv("PIBOT_MONGODB_MAX_POOL_SIZE", "200")
+    monkeypatch.setenv("PIBOT_MONGODB_COMPRESSORS", " zlib, ")
+    monkeypatch.setenv("PIBOT_MONGODB_READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setenv("PIBOT_VALKEY_MAX_CONNECTIONS", "8")
+
+    # Act
+    config = BotConfig()
+
+    # Assert
+    assert config.mongodbUri == "mongodb://localhost:27017/"
+    assert config.mongodb.maxPoolSize == 200
+    assert config.mongodb.compressors == (MONGODB_COMPRESSOR.ZLIB,)
+    assert config.mongodb.readPreference is MONGODB_READ_PREFERENCE.SECONDARY_PREFERRED
+    assert config.valkey.maxConnections == 8
+
+
+def testUnsupportedMongoCompressorRaises(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Compressors that need packages the bot does not ship fail at config load."""
+    # Arrange
+    monkeypatch.setenv("PIBOT_MONGODB_COMPRESSORS", "zstd,zlib")
+
+    # Act / Assert
+    with pytest.raises(ValidationError):
+        BotConfig()
+
+
+def testMongoMinPoolAboveMaxRaises(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A minimum MongoDB pool size above the maximum fails at config load."""
+    # Arrange
+    monkeypatch.setenv("PIBOT_MONGODB_MAX_POOL_SIZE", "5")
+    monkeypatch.setenv("PIBOT_MONGODB_MIN_POOL_SIZE", "10")
+
+    # Act / Assert
+    with pytest.raises(ValidationError):
+        BotConfig()
+
+
 def testRequiredCloudflareBaseUrlRaisesWhenMissing(monkeypatch: pytest.MonkeyPatch) -> None:
     """Cloudflare base URL env var is required."""
     # Arrange
@@ -10,7 +10,7 @@ from pibot.cogs.summarize.config import SummarizeConfig
 from pibot.cogs.translations.config import TranslationsConfig
 from pibot.guild_settings.errors import InvalidSettingValue
 from pibot.guild_settings.model import SettingsGroup
-from pibot.guild_settings.registry import getSettingsGroups
+from pibot.guild_settings.registry import getCodec, getSettingsGroups
 from pibot.guild_settings.serializer import fromStored, parseModalSetting, parseSetting
 
 
@@ -94,3 +94,37 @@ def testGeneralConfigModelDefault() -> None:
 
     # Assert
     assert config.prefix == defaults.prefix
+
+
+def testCodecIsCompiledOncePerModel() -> None:
+    """The registry memoizes one compiled codec per settings group."""
+    assert getCodec(SummarizeConfig) is getCodec(SummarizeConfig)
+    assert getCodec(SummarizeConfig) is not getCodec(GeneralConfig)
+
+
+def testCodecDefaultsMatchModelDefaults() -> None:
+    """Compiled defaults match the pydantic field defaults."""
+    codec = getCodec(GeneralConfig)
+
+    assert codec.fields["prefix"].defaultValue() == "."
+    assert codec.fields["commandChannelId"].defaultValue() is None
+
+
+def testFromStoredRejectsInvalidStoredValue() -> None:
+    """Stored values failing field validation name the offending field."""
+    with pytest.raises(ValueError, match="Invalid stored value for 'maxMessages'"):
+        fromStored(SummarizeConfig, {"maxMessages": "many"})
+
+
+def testEmptyStoredDataReturnsSharedDefaults() -> None:
+    """Groups with nothing stored share one frozen defaults instance."""
+    first = fromStored(SummarizeConfig, {})
+    second = fromStored(SummarizeConfig, {})
+
+    assert first is second
+    assert first is getCodec(SummarizeConfig).defaults
+
+
+def testRequiredFieldModelHasNoSharedDefaults() -> None:
+    """Models with required fields cannot provide an all-defaults instance."""
+    assert getCodec(RequiredFieldConfig).defaults is None
@@ -1,12 +1,14 @@
-"""Tests for SettingsStore MongoDB persistence."""
+"""Tests for MongoSettingsStore MongoDB persistence."""
 
+from pibot.cogs.admin.config import AdminConfig
+from pibot.cogs.general.config import GeneralConfig
 from pibot.cogs.summarize.config import SummarizeConfig
-from pibot.guild_settings.store import SettingsStore
+from pibot.guild_settings.store import VERSION_FIELD, MongoSettingsStore, groupProjection
 
 GUILD_ID = 1
 
 
-async def testStoreSetFieldPersistsOneField(settingsStore: SettingsStore) -> None:
+async def testStoreSetFieldPersistsOneField(settingsStore: MongoSettingsStore) -> None:
     """Field-scoped writes store only the changed field."""
     # Act
     await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
@@ -17,7 +19,7 @@ async def testStoreSetFieldPersistsOneField(settingsStore: SettingsStore) -> Non
     assert raw["features"]["summarize"] == {"maxMessages": 500}
 
 
-async def testStoreSetFieldPreservesSiblingFields(settingsStore: SettingsStore) -> None:
+async def testStoreSetFieldPreservesSiblingFields(settingsStore: MongoSettingsStore) -> None:
     """Field-scoped writes do not replace sibling fields in the same group."""
     # Arrange
     await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "cooldownSeconds", 120)
@@ -31,7 +33,7 @@ async def testStoreSetFieldPreservesSiblingFields(settingsStore: SettingsStore)
     assert raw["features"]["summarize"] == {"cooldownSeconds": 120, "maxMessages": 500}
 
 
-async def testStoreUnsetFieldLeavesEmptyGroupShell(settingsStore: SettingsStore) -> None:
+async def testStoreUnsetFieldLeavesEmptyGroupShell(settingsStore: MongoSettingsStore) -> None:
     """Unset on the last stored field leaves an empty group object."""
     # Arrange
     await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
@@ -45,7 +47,7 @@ async def testStoreUnsetFieldLeavesEmptyGroupShell(settingsStore: SettingsStore)
     assert raw["features"]["summarize"] == {}
 
 
-async def testStoreUnsetFieldPreservesSiblingFields(settingsStore: SettingsStore) -> None:
+async def testStoreUnsetFieldPreservesSiblingFields(settingsStore: MongoSettingsStore) -> None:
     """Unset removes only the targeted field."""
     # Arrange
     await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "cooldownSeconds", 120)
@@ -58,3 +60,90 @@ async def testStoreUnsetFieldPreservesSiblingFields(settingsStore: SettingsStore
     # Assert
     assert raw is not None
     assert raw["features"]["summarize"] == {"cooldownSeconds": 120}
+
+
+async def testStoreLoadManyDecodesEachGroupFromOneRead(settingsStore: MongoSettingsStore) -> None:
+    """Several groups load from a single document read with defaults for unset groups."""
+    # Arrange
+    await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
+    await settingsStore.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+
+    # Act
+    loaded = await settingsStore.loadMany(GUILD_ID, [SummarizeConfig, GeneralConfig, AdminConfig])
+
+    # Assert
+    assert loaded["summarize"] == SummarizeConfig(maxMessages=500)
+    assert loaded["general"] == GeneralConfig(prefix="!")
+    assert loaded["admin"] == AdminConfig()
+
+
+async def testStoreLoadManyWithoutDocumentUsesDefaults(settingsStore: MongoSettingsStore) -> None:
+    """Guilds without a document load every group from model defaults."""
+    loaded = await settingsStore.loadMany(GUILD_ID, [SummarizeConfig, GeneralConfig])
+
+    assert loaded == {"summarize": SummarizeConfig(), "general": GeneralConfig()}
+
+
+async def testStoreLoadGuildsReadsEveryGuildInOneQuery(settingsStore: MongoSettingsStore) -> None:
+    """Bulk guild loads return every requested guild, with defaults for guilds without a document."""
+    # Arrange
+    await settingsStore.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+
+    # Act
+    loaded = await settingsStore.loadGuilds([GUILD_ID, GUILD_ID + 1], [GeneralConfig, SummarizeConfig])
+
+    # Assert
+    assert loaded[GUILD_ID] == [GeneralConfig(prefix="!"), SummarizeConfig()]
+    assert loaded[GUILD_ID + 1] == [GeneralConfig(), SummarizeConfig()]
+
+
+async def testStoreUpdateFieldsSetsAndUnsetsInOneWrite(settingsStore: MongoSettingsStore) -> None:
+    """Combined updates set new fields and remove others from the same group."""
+    # Arrange
+    await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
+
+    # Act
+    await settingsStore.updateFields(GUILD_ID, SummarizeConfig.name, {"cooldownSeconds": 120}, ["maxMessages"])
+
+    # Assert
+    raw = await settingsStore.collection.find_one({"_id": GUILD_ID})
+    assert raw is not None
+    assert raw["features"]["summarize"] == {"cooldownSeconds": 120}
+
+
+def testGroupProjectionSelectsOnlyNamedGroups() -> None:
+    """Projections fetch only the requested ``features.<name>`` paths."""
+    assert groupProjection(["general", "summarize"]) == {"features.general": 1, "features.summarize": 1}
+
+
+async def testStoreLoadIgnoresOtherGroups(settingsStore: MongoSettingsStore) -> None:
+    """Single-group loads still decode correctly when the document holds other groups."""
+    # Arrange
+    await settingsStore.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+    await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
+
+    # Act
+    summarize = await settingsStore.load(GUILD_ID, SummarizeConfig.name, SummarizeConfig)
+
+    # Assert
+    assert summarize.maxMessages == 500
+
+
+async def testStoreUpdateGroupBumpsVersionAndRejectsStaleWrites(settingsStore: MongoSettingsStore) -> None:
+    """Versioned writes apply only at the expected version and leave the document alone otherwise."""
+    # Arrange
+    first = await settingsStore.updateGroup(GUILD_ID, GeneralConfig, {"prefix": "!"}, [], expectedVersion=0)
+
+    # Act
+    stale = await settingsStore.updateGroup(GUILD_ID, GeneralConfig, {"prefix": "?"}, [], expectedVersion=0)
+    second = await settingsStore.updateGroup(GUILD_ID, GeneralConfig, {"prefix": "$"}, [], expectedVersion=1)
+
+    # Assert
+    assert first is not None
+    assert first.version == 1
+    assert stale is None
+    assert second is not None
+    assert (second.value.prefix, second.version) == ("$", 2)
+    raw = await settingsStore.collection.find_one({"_id": GUILD_ID})
+    assert raw is not None
+    assert raw[VERSION_FIELD] == 2
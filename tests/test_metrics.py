@@ -0,0 +1,160 @@
+"""Tests for the in-process metrics registry and exposition format."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from pibot import metrics
+from pibot.cogs.general.config import GeneralConfig
+from pibot.guild_settings.service import SettingsService
+from pibot.metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry, MetricsServer, Timer
+
+
+def testCounterRendersLabelledSeries() -> None:
+    """Counters render HELP, TYPE, and one line per label set."""
+    # Arrange
+    counter = Counter("demo_total", "Demo counter.", ("result",))
+
+    # Act
+    counter.inc(result="hit")
+    counter.inc(2, result="hit")
+    counter.inc(result='mi"ss')
+
+    # Assert
+    assert counter.render() == [
+        "# HELP demo_total Demo counter.",
+        "# TYPE demo_total counter",
+        'demo_total{result="hit"} 3',
+        'demo_total{result="mi\\"ss"} 1',
+    ]
+
+
+def testGaugeGoesUpAndDown() -> None:
+    """Gauges track a current value per label set and render as gauges."""
+    # Arrange
+    gauge = Gauge("demo_in_use", "Demo gauge.", ("client",))
+
+    # Act
+    gauge.inc(3, client="valkey")
+    gauge.dec(client="valkey")
+    gauge.inc(client="mongodb")
+    gauge.dec(client="mongodb")
+
+    # Assert
+    assert gauge.value(client="valkey") == 2
+    assert gauge.render() == [
+        "# HELP demo_in_use Demo gauge.",
+        "# TYPE demo_in_use gauge",
+        'demo_in_use{client="mongodb"} 0',
+        'demo_in_use{client="valkey"} 2',
+    ]
+
+
+def testHistogramBucketsAreCumulative() -> None:
+    """Histogram buckets count every observation at or below their bound."""
+    # Arrange
+    histogram = Histogram("demo_seconds", "Demo histogram.", buckets=(0.1, 1.0))
+
+    # Act
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    # Assert
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_seconds_count 3" in lines
+    assert histogram.count() == 3
+
+
+def testTimerRecordsResultAndErrors() -> None:
+    """Timers count the labelled outcome, or ``error`` when the block raises."""
+    # Arrange
+    counter = Counter("ops_total", "Ops.", ("operation", "result"))
+    histogram = Histogram("ops_seconds", "Ops latency.", ("operation",))
+
+    # Act
+    with Timer(counter, histogram, operation="get") as timer:
+        timer.result = "hit"
+    with pytest.raises(RuntimeError), Timer(counter, histogram, operation="get"):
+        raise RuntimeError
+
+    # Assert
+    assert counter.value(operation="get", result="hit") == 1
+    assert counter.value(operation="get", result="error") == 1
+    assert histogram.count(operation="get") == 2
+
+
+def testRegistryRejectsDuplicateNames() -> None:
+    """Metric names are unique within a registry."""
+    registry = MetricsRegistry()
+    registry.register(Counter("dup_total", "First."))
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(Counter("dup_total", "Second."))
+
+
+async def testMetricsServerServesExposition() -> None:
+    """The HTTP endpoint answers GET requests with the rendered registry."""
+    # Arrange
+    registry = MetricsRegistry()
+    registry.register(Counter("served_total", "Served.")).inc()
+    server = MetricsServer(registry, "127.0.0.1", 0)
+    await server.start()
+    assert server._server is not None
+    port = server._server.sockets[0].getsockname()[1]
+
+    # Act
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    await server.stop()
+
+    # Assert
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert response.endswith(b"served_total 1\n")
+
+
+async def testMetricsServerDropsIdleConnections(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Connections that never finish their request are closed after the read timeout."""
+    # Arrange
+    monkeypatch.setattr(metrics, "REQUEST_TIMEOUT_SECONDS", 0.05)
+    server = MetricsServer(MetricsRegistry(), "127.0.0.1", 0)
+    await server.start()
+    assert server._server is not None
+    port = server._server.sockets[0].getsockname()[1]
+
+    # Act
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\n")
+    response = await asyncio.wait_for(reader.read(), timeout=1.0)
+    writer.close()
+    await server.stop()
+
+    # Assert
+    assert response == b""
+
+
+async def testSettingsServiceStatsAreExported() -> None:
+    """SettingsService counters such as warm-up progress appear in the registry exposition."""
+    # Arrange
+    store = MagicMock()
+    store.loadGuilds = AsyncMock(
+        side_effect=lambda guildIds, models: {guildId: [GeneralConfig()] for guildId in guildIds}
+    )
+    cache = MagicMock()
+    cache.setBulk = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    await service.warm([1, 2], [GeneralConfig])
+    exposition = REGISTRY.render()
+
+    # Assert
+    assert "# TYPE pibot_settings_service_events_total counter" in exposition
+    assert 'pibot_settings_service_events_total{event="warmupTotalGuilds"}' in exposition
+    assert 'pibot_settings_service_events_total{event="warmupWarmedGuilds"}' in exposition
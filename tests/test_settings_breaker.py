@@ -0,0 +1,89 @@
+"""Tests for the guild settings circuit breaker."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from pibot.guild_settings.breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpenError
+from pibot.guild_settings.metrics import BREAKER_STATE
+
+
+async def testBreakerOpensAfterConsecutiveFailures() -> None:
+    """The breaker opens at the failure threshold and then refuses calls without running them."""
+    # Arrange
+    breaker = CircuitBreaker("test-open", failureThreshold=2)
+    failing = AsyncMock(side_effect=ConnectionError("down"))
+
+    # Act
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(failing)
+
+    # Assert
+    assert breaker.state == OPEN
+    assert failing.await_count == 2
+    assert BREAKER_STATE.value(backend="test-open") == 2
+
+
+async def testBreakerCountsSlowCallsAsFailures() -> None:
+    """Calls slower than the call timeout raise ``TimeoutError`` and count toward opening."""
+    # Arrange
+    breaker = CircuitBreaker("test-slow", failureThreshold=1, callTimeoutSeconds=0.01)
+
+    # Act
+    with pytest.raises(TimeoutError):
+        await breaker.call(lambda: asyncio.sleep(1))
+
+    # Assert
+    assert breaker.state == OPEN
+
+
+async def testBreakerClosesAfterSuccessfulTrial() -> None:
+    """After the reset timeout one trial call is allowed and its success closes the breaker."""
+    # Arrange
+    breaker = CircuitBreaker("test-trial", failureThreshold=1, resetTimeoutSeconds=0.01)
+    with pytest.raises(OSError):
+        await breaker.call(AsyncMock(side_effect=OSError))
+    await asyncio.sleep(0.02)
+
+    # Act
+    result = await breaker.call(AsyncMock(return_value="ok"))
+
+    # Assert
+    assert result == "ok"
+    assert breaker.state == CLOSED
+    assert BREAKER_STATE.value(backend="test-trial") == 0
+
+
+async def testBreakerReopensAfterFailedTrial() -> None:
+    """A failed half-open trial opens the breaker again."""
+    # Arrange
+    breaker = CircuitBreaker("test-reopen", failureThreshold=3, resetTimeoutSeconds=0.01)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            await breaker.call(AsyncMock(side_effect=OSError))
+    await asyncio.sleep(0.02)
+
+    # Act
+    with pytest.raises(OSError):
+        await breaker.call(AsyncMock(side_effect=OSError))
+
+    # Assert
+    assert breaker.state == OPEN
+    assert breaker.isOpen
+
+
+async def testBreakerIgnoresNonBackendErrors() -> None:
+    """Errors that are not backend failures pass through without counting."""
+    # Arrange
+    breaker = CircuitBreaker("test-bug", failureThreshold=1)
+
+    # Act
+    with pytest.raises(KeyError):
+        await breaker.call(AsyncMock(side_effect=KeyError("bug")))
+
+    # Assert
+    assert breaker.state == CLOSED
@@ -0,0 +1,184 @@
+"""Tests for the in-process LocalSettingsCache layer."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.breaker import CircuitBreaker
+from pibot.guild_settings.cache import CacheEntry, LocalSettingsCache, MemorySettingsCache, ValkeySettingsCache
+from pibot.guild_settings.model import SettingsGroup
+
+GUILD_ID = 999002
+
+
+def makeInner(config: SettingsGroup | None = None) -> MagicMock:
+    """Return a mock shared cache whose ``getEntry`` returns ``config`` as a fresh entry."""
+    inner = MagicMock()
+    inner.getEntry = AsyncMock(return_value=None if config is None else CacheEntry(config))
+    inner.set = AsyncMock()
+    inner.setMany = AsyncMock()
+    inner.invalidate = AsyncMock()
+    inner.close = AsyncMock()
+    return inner
+
+
+async def testLocalHitSkipsInnerCache() -> None:
+    """A second read is served from memory without touching the wrapped cache."""
+    # Arrange
+    config = SummarizeConfig(maxMessages=42)
+    inner = makeInner(config)
+    cache = LocalSettingsCache(inner, MagicMock())
+
+    # Act
+    first = await cache.get(GUILD_ID, SummarizeConfig)
+    second = await cache.get(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert first is config
+    assert second is config
+    inner.getEntry.assert_awaited_once_with(GUILD_ID, SummarizeConfig)
+
+
+async def testInvalidationDuringReadIsNotOverwritten() -> None:
+    """A shared read that races a remote invalidation is returned but not kept locally."""
+    # Arrange
+    inner = makeInner()
+    cache = LocalSettingsCache(inner, MagicMock())
+
+    async def readRacingInvalidation(guildId: int, model: type[SettingsGroup]) -> CacheEntry:
+        cache._handleInvalidation(f"other:{guildId}:{model.name}")
+        return CacheEntry(model())
+
+    inner.getEntry.side_effect = readRacingInvalidation
+
+    # Act
+    await cache.get(GUILD_ID, SummarizeConfig)
+    await cache.get(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert inner.getEntry.await_count == 2
+    assert len(cache) == 0
+
+
+async def testLocalEntriesExpireAfterTtl() -> None:
+    """Entries older than the TTL are re-read from the wrapped cache."""
+    # Arrange
+    inner = makeInner(SummarizeConfig())
+    cache = LocalSettingsCache(inner, MagicMock(), ttlSeconds=0.01)
+    await cache.get(GUILD_ID, SummarizeConfig)
+
+    # Act
+    await asyncio.sleep(0.02)
+    await cache.get(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert inner.getEntry.await_count == 2
+
+
+async def testLocalCacheEvictsLeastRecentlyUsed() -> None:
+    """The cache never holds more than ``maxSize`` entries."""
+    # Arrange
+    cache = LocalSettingsCache(makeInner(), MagicMock(), maxSize=2)
+
+    # Act
+    for guildId in range(3):
+        await cache.set(guildId, GeneralConfig())
+
+    # Assert
+    assert len(cache) == 2
+    assert await cache.get(0, GeneralConfig) is None
+
+
+async def testLocalCacheDisabledWithZeroSize() -> None:
+    """A zero ``maxSize`` passes every read through to the wrapped cache."""
+    # Arrange
+    inner = makeInner(GeneralConfig())
+    cache = LocalSettingsCache(inner, MagicMock(), maxSize=0)
+
+    # Act
+    await cache.get(GUILD_ID, GeneralConfig)
+    await cache.get(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert len(cache) == 0
+    assert inner.getEntry.await_count == 2
+
+
+async def testInvalidateDropsLocalAndSharedEntries() -> None:
+    """Invalidating a guild drops every local entry, forwards to the wrapped cache, and notifies replicas."""
+    # Arrange
+    inner = makeInner()
+    client = MagicMock()
+    client.publish = AsyncMock()
+    cache = LocalSettingsCache(inner, client)
+    await cache.setMany(GUILD_ID, [GeneralConfig(), SummarizeConfig()])
+    await cache.set(GUILD_ID + 1, GeneralConfig())
+
+    # Act
+    await cache.invalidate(GUILD_ID)
+
+    # Assert
+    assert len(cache) == 1
+    inner.invalidate.assert_awaited_once_with(GUILD_ID, None)
+    client.publish.assert_awaited_once()
+
+
+async def testOlderVersionedWriteDoesNotReplaceLocalEntry() -> None:
+    """A versioned write rejected by the wrapped cache never becomes the local copy."""
+    # Arrange
+    cache = LocalSettingsCache(MemorySettingsCache(), MagicMock())
+    newer = GeneralConfig(prefix="!")
+    await cache.set(GUILD_ID, newer, version=3)
+    await cache.get(GUILD_ID, GeneralConfig)
+
+    # Act
+    await cache.set(GUILD_ID, GeneralConfig(prefix="?"), version=2)
+    await cache.setBulk({GUILD_ID: [GeneralConfig()]}, version=0)
+    loaded = await cache.get(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert loaded == newer
+
+
+async def testLocalHitsSurviveSharedCacheOutage() -> None:
+    """With Valkey failing, local entries are still served and shared misses do not raise."""
+    # Arrange
+    inner = makeInner()
+    inner.getEntry.side_effect = ConnectionError("valkey down")
+    inner.set.side_effect = ConnectionError("valkey down")
+    cache = LocalSettingsCache(inner, MagicMock(), breaker=CircuitBreaker("valkey", failureThreshold=1))
+    config = GeneralConfig(prefix="!")
+    await cache.set(GUILD_ID, config)
+
+    # Act
+    local = await cache.get(GUILD_ID, GeneralConfig)
+    shared = await cache.get(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert local is config
+    assert shared is None
+    assert cache.breaker.isOpen
+    inner.getEntry.assert_not_awaited()
+
+
+async def testBroadcastWriteEvictsOtherReplicas(valkeyClient) -> None:
+    """A broadcast write on one replica drops the stale local copy on another."""
+    # Arrange
+    writer = LocalSettingsCache(ValkeySettingsCache(valkeyClient), valkeyClient)
+    reader = LocalSettingsCache(ValkeySettingsCache(valkeyClient), valkeyClient)
+    reader.start()
+    await asyncio.sleep(0.1)
+    await writer.set(GUILD_ID, SummarizeConfig(maxMessages=1))
+    assert await reader.get(GUILD_ID, SummarizeConfig) == SummarizeConfig(maxMessages=1)
+
+    # Act
+    await writer.set(GUILD_ID, SummarizeConfig(maxMessages=2), broadcast=True)
+    for _ in range(50):
+        if len(reader) == 0:
+            break
+        await asyncio.sleep(0.01)
+
+    # Assert
+    assert await reader.get(GUILD_ID, SummarizeConfig) == SummarizeConfig(maxMessages=2)
+    await reader.stop()
@@ -0,0 +1,89 @@
+"""Tests for the in-process MemorySettingsCache backend."""
+
+import asyncio
+
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.cache import MemorySettingsCache
+
+GUILD_ID = 999003
+
+
+async def testMemoryCacheRoundTripsGroups() -> None:
+    """Stored groups come back as the same instances, and misses are omitted from bulk reads."""
+    # Arrange
+    cache = MemorySettingsCache()
+    config = SummarizeConfig(maxMessages=42)
+    await cache.set(GUILD_ID, config)
+
+    # Act
+    single = await cache.get(GUILD_ID, SummarizeConfig)
+    many = await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig])
+
+    # Assert
+    assert single is config
+    assert many == {SummarizeConfig.name: config}
+
+
+async def testMemoryCacheMarksStaleAndExpiresEntries() -> None:
+    """Entries past the soft TTL are stale; entries past the hard TTL are misses."""
+    # Arrange
+    stale = MemorySettingsCache(softTtlSeconds=0.01)
+    expired = MemorySettingsCache(hardTtlSeconds=0.01)
+    await stale.set(GUILD_ID, GeneralConfig())
+    await expired.set(GUILD_ID, GeneralConfig())
+
+    # Act
+    await asyncio.sleep(0.02)
+    staleEntry = await stale.getEntry(GUILD_ID, GeneralConfig)
+    expiredEntry = await expired.getEntry(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert staleEntry is not None
+    assert staleEntry.stale is True
+    assert expiredEntry is None
+    assert len(expired) == 0
+
+
+async def testMemoryCacheEvictsLeastRecentlyUsed() -> None:
+    """The cache never holds more than ``maxSize`` entries."""
+    # Arrange
+    cache = MemorySettingsCache(maxSize=2)
+
+    # Act
+    for guildId in range(3):
+        await cache.set(guildId, GeneralConfig())
+
+    # Assert
+    assert len(cache) == 2
+    assert await cache.get(0, GeneralConfig) is None
+
+
+async def testMemoryCacheInvalidateDropsOneGuild() -> None:
+    """Invalidating a guild without names drops all of its groups and nothing else."""
+    # Arrange
+    cache = MemorySettingsCache()
+    await cache.setMany(GUILD_ID, [GeneralConfig(), SummarizeConfig()])
+    await cache.setBulk({GUILD_ID + 1: [GeneralConfig()]})
+
+    # Act
+    await cache.invalidate(GUILD_ID)
+
+    # Assert
+    assert len(cache) == 1
+    assert await cache.get(GUILD_ID + 1, GeneralConfig) is not None
+
+
+async def testMemoryCacheKeepsNewerVersion() -> None:
+    """Versioned writes older than the cached entry are ignored."""
+    # Arrange
+    cache = MemorySettingsCache()
+    newer = GeneralConfig(prefix="!")
+    await cache.set(GUILD_ID, newer, version=3)
+
+    # Act
+    await cache.set(GUILD_ID, GeneralConfig(prefix="?"), version=2)
+    await cache.setMany(GUILD_ID, [GeneralConfig()], version=0)
+
+    # Assert
+    assert await cache.get(GUILD_ID, GeneralConfig) is newer
@@ -1,7 +1,23 @@
 """Tests for ValkeySettingsCache against a Valkey testcontainer."""
 
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+from pibot.cogs.admin.config import AdminConfig
+from pibot.cogs.general.config import GeneralConfig
 from pibot.cogs.summarize.config import SummarizeConfig
-from pibot.guild_settings.cache import ValkeySettingsCache, cacheKey
+from pibot.config import SETTINGS_CACHE_LAYOUT
+from pibot.guild_settings.cache import (
+  DEFAULTS_MARKER,
+  BinaryCacheCodec,
+  JsonCacheCodec,
+  ValkeySettingsCache,
+  cacheKey,
+  encodeCached,
+  guildCacheKey,
+)
+from pibot.guild_settings.registry import getCodec
 
 GUILD_ID = 999001
 
@@ -24,3 +40,329 @@ async def testValkeyCacheMissReturnsNone(valkeyClient) -> None:
   cache = ValkeySettingsCache(valkeyClient)
 
   assert await cache.get(GUILD_ID, SummarizeConfig) is None
+
+
+async def testValkeyCacheGetManyReturnsOnlyHits(valkeyClient) -> None:
+  """Bulk reads return cached groups by name and omit misses."""
+  cache = ValkeySettingsCache(valkeyClient)
+  summarize = SummarizeConfig(maxMessages=7)
+  general = GeneralConfig(prefix="!")
+
+  await cache.setMany(GUILD_ID, [summarize, general])
+  loaded = await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig, AdminConfig])
+
+  assert loaded == {"summarize": summarize, "general": general}
+
+
+async def testValkeyCacheStoresDefaultsAsMarker(valkeyClient) -> None:
+  """All-default groups are cached as a marker and read back as the shared instance."""
+  cache = ValkeySettingsCache(valkeyClient, codec=JsonCacheCodec())
+
+  await cache.set(GUILD_ID, SummarizeConfig())
+  raw = await valkeyClient.get(cacheKey(GUILD_ID, SummarizeConfig.name))
+  loaded = await cache.get(GUILD_ID, SummarizeConfig)
+
+  assert raw.endswith(f":{DEFAULTS_MARKER}".encode())
+  assert loaded is getCodec(SummarizeConfig).defaults
+
+
+async def testVersionedSetKeepsNewerEntry(valkeyClient) -> None:
+  """Versioned writes older than the cached entry are rejected by the server-side script."""
+  cache = ValkeySettingsCache(valkeyClient)
+  newer = GeneralConfig(prefix="!")
+  await cache.set(GUILD_ID, newer, version=3)
+
+  await cache.set(GUILD_ID, GeneralConfig(prefix="?"), version=2)
+  await cache.setMany(GUILD_ID, [GeneralConfig()], version=0)
+  loaded = await cache.get(GUILD_ID, GeneralConfig)
+
+  assert loaded == newer
+
+
+async def testEntryCarriesCachedVersion(valkeyClient) -> None:
+  """Entries report the version they were written at, and 0 when written without one."""
+  cache = ValkeySettingsCache(valkeyClient)
+
+  await cache.set(GUILD_ID, GeneralConfig(prefix="!"), version=7)
+  await cache.set(GUILD_ID, SummarizeConfig())
+  general = await cache.getEntry(GUILD_ID, GeneralConfig)
+  summarize = await cache.getEntry(GUILD_ID, SummarizeConfig)
+
+  assert general is not None and general.version == 7
+  assert summarize is not None and summarize.version == 0
+
+
+async def testHashLayoutVersionedSetReplacesOlderEntry(valkeyClient) -> None:
+  """Newer versions replace the cached group in the hash layout."""
+  cache = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  newer = GeneralConfig(prefix="$")
+  await cache.set(GUILD_ID, GeneralConfig(prefix="!"), version=1)
+
+  await cache.set(GUILD_ID, newer, version=2)
+  loaded = await cache.get(GUILD_ID, GeneralConfig)
+
+  assert loaded == newer
+
+
+async def testHashLayoutStoresOneHashPerGuild(valkeyClient) -> None:
+  """The hash layout keeps every feature of a guild in one hash."""
+  cache = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  summarize = SummarizeConfig(maxMessages=42)
+
+  await cache.setMany(GUILD_ID, [summarize, GeneralConfig()])
+  loaded = await cache.get(GUILD_ID, SummarizeConfig)
+  fields = await valkeyClient.hkeys(guildCacheKey(GUILD_ID))
+
+  assert loaded == summarize
+  assert sorted(fields) == [b"general", b"summarize"]
+  assert await valkeyClient.exists(cacheKey(GUILD_ID, SummarizeConfig.name)) == 0
+
+
+async def testHashLayoutGetManyReturnsOnlyHits(valkeyClient) -> None:
+  """Bulk reads in the hash layout use one HMGET and omit misses."""
+  cache = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  general = GeneralConfig(prefix="!")
+  await cache.set(GUILD_ID, general)
+
+  loaded = await cache.getMany(GUILD_ID, [GeneralConfig, AdminConfig])
+
+  assert loaded == {"general": general}
+
+
+async def testHashLayoutInvalidateGuildDeletesHash(valkeyClient) -> None:
+  """Invalidating a guild in the hash layout removes its single key."""
+  cache = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  await cache.setMany(GUILD_ID, [SummarizeConfig(), GeneralConfig()])
+
+  await cache.invalidate(GUILD_ID)
+
+  assert await valkeyClient.exists(guildCacheKey(GUILD_ID)) == 0
+
+
+async def testKeysLayoutInvalidateSelectedGroups(valkeyClient) -> None:
+  """Invalidating named groups leaves sibling groups cached."""
+  cache = ValkeySettingsCache(valkeyClient)
+  await cache.setMany(GUILD_ID, [SummarizeConfig(), GeneralConfig()])
+
+  await cache.invalidate(GUILD_ID, [SummarizeConfig.name])
+
+  assert await cache.get(GUILD_ID, SummarizeConfig) is None
+  assert await cache.get(GUILD_ID, GeneralConfig) == GeneralConfig()
+
+
+async def testKeysLayoutInvalidateGuildLeavesOtherGuilds(valkeyClient) -> None:
+  """Invalidating a guild in the keys layout does not touch other guilds."""
+  cache = ValkeySettingsCache(valkeyClient)
+  await cache.setMany(GUILD_ID, [SummarizeConfig(), GeneralConfig()])
+  await cache.set(GUILD_ID + 1, GeneralConfig())
+
+  await cache.invalidate(GUILD_ID)
+
+  assert await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig]) == {}
+  assert await cache.get(GUILD_ID + 1, GeneralConfig) == GeneralConfig()
+
+
+async def testKeysLayoutInvalidateGuildDoesNotScan(valkeyClient, monkeypatch) -> None:
+  """Whole-guild invalidation in the keys layout deletes the registered groups' keys without a SCAN."""
+  cache = ValkeySettingsCache(valkeyClient)
+  await cache.setMany(GUILD_ID, [SummarizeConfig(), GeneralConfig()])
+  monkeypatch.setattr(valkeyClient, "scan_iter", MagicMock(side_effect=AssertionError("scanned the keyspace")))
+
+  await cache.invalidate(GUILD_ID)
+
+  assert await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig]) == {}
+
+
+async def testMigrateLayoutMovesKeysIntoHashes(valkeyClient) -> None:
+  """Migrating to the hash layout moves legacy per-feature keys without overwriting newer entries."""
+  legacy = ValkeySettingsCache(valkeyClient)
+  await legacy.setMany(GUILD_ID, [SummarizeConfig(maxMessages=1), GeneralConfig(prefix="?")])
+  hashed = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  await hashed.set(GUILD_ID, GeneralConfig(prefix="!"))
+
+  moved = await hashed.migrateLayout()
+
+  assert moved == 2
+  assert await hashed.get(GUILD_ID, SummarizeConfig) == SummarizeConfig(maxMessages=1)
+  assert await hashed.get(GUILD_ID, GeneralConfig) == GeneralConfig(prefix="!")
+  assert await valkeyClient.exists(cacheKey(GUILD_ID, SummarizeConfig.name)) == 0
+  assert await hashed.migrateLayout() == 0
+
+
+async def testMigrateLayoutMovesHashesBackToKeys(valkeyClient) -> None:
+  """Migrating back to the keys layout restores one string key per feature."""
+  hashed = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+  await hashed.set(GUILD_ID, SummarizeConfig(maxMessages=3))
+  legacy = ValkeySettingsCache(valkeyClient)
+
+  moved = await legacy.migrateLayout()
+
+  assert moved == 1
+  assert await legacy.get(GUILD_ID, SummarizeConfig) == SummarizeConfig(maxMessages=3)
+  assert await valkeyClient.exists(guildCacheKey(GUILD_ID)) == 0
+
+
+async def testMigrateLayoutTagsLegacyKeys(valkeyClient) -> None:
+  """Baseline keys without the ``{guild}`` hash tag (and without a TTL) are moved to tagged keys."""
+  legacyKey = f"pibot:settings:{GUILD_ID}:{SummarizeConfig.name}"
+  await valkeyClient.set(legacyKey, SummarizeConfig(maxMessages=4).model_dump_json())
+  cache = ValkeySettingsCache(valkeyClient, codec=JsonCacheCodec())
+
+  moved = await cache.migrateLayout()
+
+  assert moved == 1
+  assert await cache.get(GUILD_ID, SummarizeConfig) == SummarizeConfig(maxMessages=4)
+  assert await valkeyClient.exists(legacyKey) == 0
+
+
+async def testEntryPastSoftTtlIsStale(valkeyClient) -> None:
+  """Entries older than the soft TTL are still returned but flagged stale."""
+  cache = ValkeySettingsCache(valkeyClient, softTtlSeconds=10, hardTtlSeconds=100, codec=JsonCacheCodec())
+  raw = encodeCached(SummarizeConfig(maxMessages=5), int(time.time()) - 20)
+  await valkeyClient.set(cacheKey(GUILD_ID, SummarizeConfig.name), raw)
+
+  entry = await cache.getEntry(GUILD_ID, SummarizeConfig)
+
+  assert entry is not None
+  assert entry.stale is True
+  assert entry.value.maxMessages == 5
+
+
+async def testEntryPastHardTtlIsMiss(valkeyClient) -> None:
+  """Entries older than the hard TTL are misses even before Valkey expires them."""
+  cache = ValkeySettingsCache(valkeyClient, softTtlSeconds=10, hardTtlSeconds=100, codec=JsonCacheCodec())
+  raw = encodeCached(SummarizeConfig(), int(time.time()) - 200)
+  await valkeyClient.set(cacheKey(GUILD_ID, SummarizeConfig.name), raw)
+
+  assert await cache.getEntry(GUILD_ID, SummarizeConfig) is None
+  assert await cache.getMany(GUILD_ID, [SummarizeConfig]) == {}
+
+
+async def testHardTtlSetsValkeyExpiry(valkeyClient) -> None:
+  """Writes expire in Valkey after the hard TTL in both layouts."""
+  keys = ValkeySettingsCache(valkeyClient, hardTtlSeconds=100)
+  hashed = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH, hardTtlSeconds=100)
+
+  await keys.set(GUILD_ID, SummarizeConfig())
+  await hashed.set(GUILD_ID + 1, SummarizeConfig())
+
+  assert 0 < await valkeyClient.pttl(cacheKey(GUILD_ID, SummarizeConfig.name)) <= 100_000
+  assert 0 < await valkeyClient.pttl(guildCacheKey(GUILD_ID + 1)) <= 100_000
+
+
+async def testEntryWithoutTimestampIsStale(valkeyClient) -> None:
+  """Entries written before timestamps existed are served once and flagged for refresh."""
+  cache = ValkeySettingsCache(valkeyClient, codec=JsonCacheCodec())
+  await valkeyClient.set(cacheKey(GUILD_ID, SummarizeConfig.name), SummarizeConfig(maxMessages=9).model_dump_json())
+
+  entry = await cache.getEntry(GUILD_ID, SummarizeConfig)
+
+  assert entry is not None
+  assert entry.stale is True
+  assert entry.value.maxMessages == 9
+
+
+async def testBinaryCodecRoundTripsWithoutValidation(valkeyClient) -> None:
+  """Binary entries of the current schema decode to an equal frozen model."""
+  cache = ValkeySettingsCache(valkeyClient)
+  config = GeneralConfig(prefix="!", commandChannelId=42)
+
+  await cache.set(GUILD_ID, config)
+  loaded = await cache.get(GUILD_ID, GeneralConfig)
+
+  assert loaded == config
+  assert getCodec(GeneralConfig).constructible is True
+
+
+async def testBinaryCodecStoresDefaultsAsHeaderOnly(valkeyClient) -> None:
+  """All-default groups are cached without a body and read back as the shared instance."""
+  cache = ValkeySettingsCache(valkeyClient)
+
+  await cache.set(GUILD_ID, SummarizeConfig())
+  raw = await valkeyClient.get(cacheKey(GUILD_ID, SummarizeConfig.name))
+
+  assert len(raw) == 17
+  assert await cache.get(GUILD_ID, SummarizeConfig) is getCodec(SummarizeConfig).defaults
+
+
+def testBinaryCodecTreatsOtherSchemaAsMiss() -> None:
+  """Values tagged with another schema hash decode as misses instead of raising."""
+  codec = BinaryCacheCodec()
+  storedAt = int(time.time())
+  raw = codec.encode(SummarizeConfig(maxMessages=5), storedAt)
+
+  assert codec.decode(GeneralConfig, raw) is None
+  assert codec.decode(SummarizeConfig, raw) == (SummarizeConfig(maxMessages=5), storedAt)
+
+
+async def testBinaryCodecTreatsJsonEntriesAsMiss(valkeyClient) -> None:
+  """Switching codecs turns existing entries into misses."""
+  jsonCache = ValkeySettingsCache(valkeyClient, codec=JsonCacheCodec())
+  binaryCache = ValkeySettingsCache(valkeyClient)
+
+  await jsonCache.set(GUILD_ID, SummarizeConfig(maxMessages=5))
+  await binaryCache.set(GUILD_ID + 1, SummarizeConfig(maxMessages=6))
+
+  assert await binaryCache.get(GUILD_ID, SummarizeConfig) is None
+  assert await jsonCache.get(GUILD_ID + 1, SummarizeConfig) is None
+
+
+async def startTracking(cache: ValkeySettingsCache) -> None:
+  """Start client tracking and wait until the invalidation connection is subscribed."""
+  cache.start()
+  for _ in range(100):
+    if cache.trackingActive:
+      return
+    await asyncio.sleep(0.05)
+  raise AssertionError("client tracking did not start")
+
+
+async def testTrackingServesRepeatReadsLocally(valkeyClient) -> None:
+  """With tracking on, a repeat read is answered without going back to Valkey."""
+  cache = ValkeySettingsCache(valkeyClient, tracking=True)
+  await startTracking(cache)
+  await cache.set(GUILD_ID, SummarizeConfig(maxMessages=5))
+
+  first = await cache.get(GUILD_ID, SummarizeConfig)
+  second = await cache.get(GUILD_ID, SummarizeConfig)
+  await cache.stop()
+
+  # Valkey reads decode a new instance; the tracked copy is returned as is.
+  assert first is second
+
+
+async def testTrackingDropsKeysChangedByOtherClients(valkeyClient) -> None:
+  """An invalidation push from Valkey evicts the tracked copy."""
+  cache = ValkeySettingsCache(valkeyClient, tracking=True)
+  other = ValkeySettingsCache(valkeyClient)
+  await startTracking(cache)
+  await cache.set(GUILD_ID, SummarizeConfig(maxMessages=5))
+  await cache.get(GUILD_ID, SummarizeConfig)
+
+  await other.set(GUILD_ID, SummarizeConfig(maxMessages=6))
+  for _ in range(100):
+    loaded = await cache.get(GUILD_ID, SummarizeConfig)
+    if loaded is not None and loaded.maxMessages == 6:
+      break
+    await asyncio.sleep(0.05)
+  await cache.stop()
+
+  assert loaded is not None
+  assert loaded.maxMessages == 6
+
+
+async def testTrackingDropsOwnWritesImmediately(valkeyClient) -> None:
+  """Local writes and invalidations are visible to the next read without waiting for a push."""
+  cache = ValkeySettingsCache(valkeyClient, layout=SETTINGS_CACHE_LAYOUT.HASH, tracking=True)
+  await startTracking(cache)
+  await cache.set(GUILD_ID, SummarizeConfig(maxMessages=5))
+  await cache.get(GUILD_ID, SummarizeConfig)
+
+  await cache.set(GUILD_ID, SummarizeConfig(maxMessages=6))
+  updated = await cache.get(GUILD_ID, SummarizeConfig)
+  await cache.invalidate(GUILD_ID)
+  evicted = await cache.get(GUILD_ID, SummarizeConfig)
+  await cache.stop()
+
+  assert updated == SummarizeConfig(maxMessages=6)
+  assert evicted is None
@@ -0,0 +1,112 @@
+"""Tests for settings group schema migrations."""
+
+import pytest
+
+from pibot.guild_settings.migration import MIGRATION_LEASE_KEY, SCHEMA_VERSION_KEY, SettingsMigrator, upgradeGroup
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import registerSettingsGroup
+from pibot.guild_settings.store import MongoSettingsStore
+
+GUILD_ID = 1
+
+
+def renameHello(data: dict[str, object]) -> dict[str, object]:
+    """Version 1 stored ``hello``; version 2 calls it ``greeting``."""
+    if "hello" in data:
+        data["greeting"] = data.pop("hello")
+    return data
+
+
+class GreetingConfig(SettingsGroup):
+    """Test group whose field was renamed in version 2."""
+
+    name = "greetingTest"
+    description = "Migration test group"
+    schemaVersion = 2
+    migrations = {1: renameHello}
+
+    greeting: str = "hi"
+
+
+def testUpgradeGroupMigratesAndStampsVersion() -> None:
+    """Unversioned stored fields run every migration and gain the version marker."""
+    assert upgradeGroup(GreetingConfig, {"hello": "hey"}) == {"greeting": "hey", SCHEMA_VERSION_KEY: 2}
+
+
+def testUpgradeGroupSkipsCurrentAndEmptyGroups() -> None:
+    """Groups already at the model version, or never stored, need no write-back."""
+    assert upgradeGroup(GreetingConfig, {"greeting": "hey", SCHEMA_VERSION_KEY: 2}) is None
+    assert upgradeGroup(GreetingConfig, {}) is None
+
+
+def testUpgradeGroupRejectsNewerVersions() -> None:
+    """Data written by a newer release is not silently downgraded."""
+    with pytest.raises(ValueError, match="schema version 3"):
+        upgradeGroup(GreetingConfig, {"greeting": "hey", SCHEMA_VERSION_KEY: 3})
+
+
+def testRegistrationRequiresEveryMigrationStep() -> None:
+    """Groups above version 1 must provide a migration from each older version."""
+
+    class BrokenConfig(SettingsGroup):
+        name = "brokenMigrationTest"
+        description = "Missing migration"
+        schemaVersion = 3
+        migrations = {1: renameHello}
+
+    with pytest.raises(ValueError, match=r"no migrations from versions \[2\]"):
+        registerSettingsGroup(BrokenConfig)
+
+
+async def testStoreLoadMigratesAndWritesBack(settingsStore: MongoSettingsStore) -> None:
+    """Reads of older stored shapes return the migrated config and persist it."""
+    # Arrange
+    await settingsStore.collection.insert_one({"_id": GUILD_ID, "features": {"greetingTest": {"hello": "hey"}}})
+
+    # Act
+    config = await settingsStore.load(GUILD_ID, GreetingConfig.name, GreetingConfig)
+
+    # Assert
+    raw = await settingsStore.collection.find_one({"_id": GUILD_ID})
+    assert raw is not None
+    assert config.greeting == "hey"
+    assert raw["features"]["greetingTest"] == {"greeting": "hey", SCHEMA_VERSION_KEY: 2}
+
+
+async def testMigratorUpgradesOutdatedDocumentsInBatches(settingsStore: MongoSettingsStore) -> None:
+    """The batch migrator walks every outdated document and leaves current ones alone."""
+    # Arrange
+    await settingsStore.collection.insert_many(
+        [{"_id": guildId, "features": {"greetingTest": {"hello": f"hey {guildId}"}}} for guildId in range(1, 6)]
+        + [{"_id": 6, "features": {"greetingTest": {"greeting": "yo", SCHEMA_VERSION_KEY: 2}}}]
+    )
+    migrator = SettingsMigrator(settingsStore.collection, [GreetingConfig], batchSize=2, delaySeconds=0)
+
+    # Act
+    migrated = await migrator.run()
+
+    # Assert
+    raw = await settingsStore.collection.find_one({"_id": 3})
+    assert raw is not None
+    assert migrated == 5
+    assert raw["features"]["greetingTest"] == {"greeting": "hey 3", SCHEMA_VERSION_KEY: 2}
+    assert await migrator.run() == 0
+
+
+async def testMigratorSkipsWhileAnotherReplicaHoldsTheLease(settingsStore: MongoSettingsStore, valkeyClient) -> None:
+    """Only the replica holding the migration lease walks the collection; the lease is released afterwards."""
+    # Arrange
+    await settingsStore.collection.insert_one({"_id": GUILD_ID, "features": {"greetingTest": {"hello": "hey"}}})
+    holder = SettingsMigrator(settingsStore.collection, [GreetingConfig], delaySeconds=0, leaseClient=valkeyClient)
+    other = SettingsMigrator(settingsStore.collection, [GreetingConfig], delaySeconds=0, leaseClient=valkeyClient)
+    await holder._acquireLease()
+
+    # Act
+    skipped = await other.run()
+    await holder._releaseLease()
+    migrated = await other.run()
+
+    # Assert
+    assert skipped == 0
+    assert migrated == 1
+    assert await valkeyClient.get(MIGRATION_LEASE_KEY) is None
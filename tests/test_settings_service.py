@@ -1,12 +1,18 @@
 """Tests for SettingsService."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
+import pytest
+
 from pibot.cogs.general.config import GeneralConfig
 from pibot.cogs.summarize.config import SummarizeConfig
-from pibot.guild_settings.cache import ValkeySettingsCache
+from pibot.guild_settings.breaker import CircuitBreaker, CircuitOpenError
+from pibot.guild_settings.cache import CacheEntry, ValkeySettingsCache
+from pibot.guild_settings.errors import InvalidSettingValue, SettingsConflict, SettingsUnavailable
 from pibot.guild_settings.serializer import fromStored
 from pibot.guild_settings.service import SettingsService
+from pibot.guild_settings.store import MongoSettingsStore, Versioned
 
 GUILD_ID = 1
 
@@ -106,6 +112,15 @@ async def testUpdateReturnsUpdatedConfig(settingsService: SettingsService) -> No
     assert config.prefix == "!"
 
 
+async def testLastKnownReturnsSeenConfigWithoutIo(settingsService: SettingsService) -> None:
+    """The last loaded or written config is available without a cache or store read."""
+    unseen = settingsService.lastKnown(GUILD_ID, GeneralConfig)
+    await settingsService.update(GUILD_ID, GeneralConfig, "prefix", "!")
+
+    assert unseen is None
+    assert settingsService.lastKnown(GUILD_ID, GeneralConfig) == GeneralConfig(prefix="!")
+
+
 async def testResetReturnsDefaultConfig(settingsService: SettingsService) -> None:
     """Reset returns the config with model defaults applied."""
     await settingsService.update(GUILD_ID, GeneralConfig, "prefix", "!")
@@ -135,14 +150,14 @@ async def testLoadCachesStoreResult(valkeyClient) -> None:
     """A second load for the same guild/feature does not hit the store again."""
     defaults = fromStored(SummarizeConfig, {})
     store = MagicMock()
-    store.load = AsyncMock(return_value=defaults)
+    store.loadVersioned = AsyncMock(return_value=Versioned(defaults, 0))
     service = SettingsService(store, ValkeySettingsCache(valkeyClient))
 
     first = await service.load(GUILD_ID, SummarizeConfig)
     second = await service.load(GUILD_ID, SummarizeConfig)
 
     assert first == second
-    store.load.assert_awaited_once_with(GUILD_ID, SummarizeConfig.name, SummarizeConfig)
+    store.loadVersioned.assert_awaited_once_with(GUILD_ID, SummarizeConfig)
 
 
 async def testUpdateWriteThroughUpdatesCache(settingsService: SettingsService) -> None:
@@ -162,3 +177,488 @@ async def testResetWriteThroughUpdatesCache(settingsService: SettingsService) ->
 
     assert loaded == reset
     assert loaded.enabled is True
+
+
+async def testConcurrentMissesShareOneStoreRead() -> None:
+    """Concurrent misses for one guild group trigger a single store read and cache write."""
+    # Arrange
+    defaults = fromStored(SummarizeConfig, {})
+    release = asyncio.Event()
+
+    async def slowLoad(*_args: object) -> Versioned[SummarizeConfig]:
+        await release.wait()
+        return Versioned(defaults, 0)
+
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(side_effect=slowLoad)
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    waiters = [asyncio.create_task(service.load(GUILD_ID, SummarizeConfig)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    # Assert
+    assert all(result is defaults for result in results)
+    store.loadVersioned.assert_awaited_once_with(GUILD_ID, SummarizeConfig)
+    cache.set.assert_awaited_once_with(GUILD_ID, defaults, version=0)
+    assert service.stats.storeLoads == 1
+    assert service.stats.coalescedLoads == 4
+
+
+async def testCoalescedLoadSurvivesCancelledWaiter() -> None:
+    """Cancelling the first waiter does not cancel the shared store read."""
+    # Arrange
+    defaults = fromStored(SummarizeConfig, {})
+    release = asyncio.Event()
+
+    async def slowLoad(*_args: object) -> Versioned[SummarizeConfig]:
+        await release.wait()
+        return Versioned(defaults, 0)
+
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(side_effect=slowLoad)
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+    first = asyncio.create_task(service.load(GUILD_ID, SummarizeConfig))
+    second = asyncio.create_task(service.load(GUILD_ID, SummarizeConfig))
+    await asyncio.sleep(0)
+
+    # Act
+    first.cancel()
+    release.set()
+
+    # Assert
+    assert await second is defaults
+    store.loadVersioned.assert_awaited_once()
+
+
+async def testLoadManyReturnsGroupsInRequestedOrder(settingsService: SettingsService) -> None:
+    """Bulk loads return one config per requested model, in order."""
+    # Arrange
+    await settingsService.update(GUILD_ID, GeneralConfig, "prefix", "!")
+
+    # Act
+    general, summarize = await settingsService.loadMany(GUILD_ID, [GeneralConfig, SummarizeConfig])
+
+    # Assert
+    assert general == fromStored(GeneralConfig, {"prefix": "!"})
+    assert summarize == fromStored(SummarizeConfig, {})
+
+
+async def testLoadManyReadsStoreOnceForAllMisses() -> None:
+    """Cache misses are fetched with a single store read and written back together."""
+    # Arrange
+    general = GeneralConfig(prefix="!")
+    summarize = SummarizeConfig()
+    store = MagicMock()
+    store.loadMany = AsyncMock(return_value={"summarize": summarize})
+    cache = MagicMock()
+    cache.getMany = AsyncMock(return_value={"general": general})
+    cache.setMany = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    loaded = await service.loadMany(GUILD_ID, [GeneralConfig, SummarizeConfig])
+
+    # Assert
+    assert loaded == [general, summarize]
+    store.loadMany.assert_awaited_once_with(GUILD_ID, [SummarizeConfig])
+    cache.setMany.assert_awaited_once_with(GUILD_ID, [summarize], version=0)
+
+
+async def testGuildsWithoutDocumentShareDefaultInstance(settingsService: SettingsService) -> None:
+    """Untouched guilds all resolve to the same frozen defaults instance, from store or cache."""
+    # Act
+    fromStore = await settingsService.load(GUILD_ID, SummarizeConfig)
+    otherGuild = await settingsService.load(GUILD_ID + 1, SummarizeConfig)
+    fromCache = await settingsService.load(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert fromStore is otherGuild
+    assert fromCache is fromStore
+
+
+async def testStaleHitReturnsImmediatelyAndRefreshes() -> None:
+    """A stale cache hit is served as-is while one background read refreshes the cache."""
+    # Arrange
+    stale = SummarizeConfig(maxMessages=1)
+    fresh = SummarizeConfig(maxMessages=2)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(fresh, 3))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=CacheEntry(stale, stale=True))
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    first = await service.load(GUILD_ID, SummarizeConfig)
+    second = await service.load(GUILD_ID, SummarizeConfig)
+    await asyncio.sleep(0)
+
+    # Assert
+    assert first is stale
+    assert second is stale
+    store.loadVersioned.assert_awaited_once_with(GUILD_ID, SummarizeConfig)
+    cache.set.assert_awaited_once_with(GUILD_ID, fresh, version=3)
+    assert service.stats.staleRefreshes == 1
+
+
+async def testWarmLoadsGuildsInBatchesAndTracksProgress() -> None:
+    """Warm-up reads guilds in batches and writes each batch to the cache in bulk."""
+    # Arrange
+    store = MagicMock()
+    store.loadGuilds = AsyncMock(
+        side_effect=lambda guildIds, models: {guildId: [GeneralConfig()] for guildId in guildIds}
+    )
+    cache = MagicMock()
+    cache.setBulk = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    await service.warm([1, 2, 3, 4, 5], [GeneralConfig], batchSize=2, concurrency=2)
+
+    # Assert
+    assert [call.args[0] for call in store.loadGuilds.await_args_list] == [[1, 2], [3, 4], [5]]
+    assert cache.setBulk.await_count == 3
+    assert service.stats.warmupTotalGuilds == 5
+    assert service.stats.warmupWarmedGuilds == 5
+
+
+async def testWarmSkipsStoreWhileBreakerIsOpen() -> None:
+    """Warm-up goes through the store breaker instead of hammering a store known to be down."""
+    # Arrange
+    store = MagicMock()
+    store.loadGuilds = AsyncMock(side_effect=ConnectionError("mongodb down"))
+    cache = MagicMock()
+    cache.setBulk = AsyncMock()
+    service = SettingsService(store, cache, storeBreaker=CircuitBreaker("store", failureThreshold=1))
+    with pytest.raises(ConnectionError):
+        await service.warm([1], [GeneralConfig])
+
+    # Act / Assert
+    with pytest.raises(CircuitOpenError):
+        await service.warm([2], [GeneralConfig])
+    store.loadGuilds.assert_awaited_once()
+    cache.setBulk.assert_not_awaited()
+
+
+async def testWarmFillsCacheForLaterLoads(settingsService: SettingsService) -> None:
+    """Warmed guilds are served from the cache without another store read."""
+    # Arrange
+    await settingsService.store.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+    await settingsService.warm([GUILD_ID], [GeneralConfig])
+
+    # Act
+    general = await settingsService.load(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert general.prefix == "!"
+    assert settingsService.stats.storeLoads == 0
+
+
+async def testUpdateManySetsAndUnsetsFieldsTogether(
+    settingsService: SettingsService, settingsStore: MongoSettingsStore
+) -> None:
+    """Several changed fields persist with one write, and default values remove stored fields."""
+    # Arrange
+    await settingsService.update(GUILD_ID, SummarizeConfig, "maxMessages", 500)
+
+    # Act
+    updated = await settingsService.updateMany(
+        GUILD_ID,
+        SummarizeConfig,
+        {"cooldownSeconds": 120, "maxMessages": SummarizeConfig().maxMessages},
+    )
+
+    # Assert
+    raw = await settingsStore.collection.find_one({"_id": GUILD_ID})
+    assert raw is not None
+    assert raw["features"]["summarize"] == {"cooldownSeconds": 120}
+    assert updated.cooldownSeconds == 120
+    assert await settingsService.cache.get(GUILD_ID, SummarizeConfig) == updated
+
+
+async def testUpdateManyWritesStoreAndCacheOnce() -> None:
+    """A multi-field update issues a single versioned store write and a single cache write."""
+    # Arrange
+    written = GeneralConfig(prefix="!", commandChannelId=42)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(GeneralConfig(), 4))
+    store.updateGroup = AsyncMock(return_value=Versioned(written, 5))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    updated = await service.updateMany(GUILD_ID, GeneralConfig, {"prefix": "!", "commandChannelId": 42})
+
+    # Assert
+    assert updated is written
+    store.updateGroup.assert_awaited_once_with(
+        GUILD_ID, GeneralConfig, {"prefix": "!", "commandChannelId": 42}, [], expectedVersion=4
+    )
+    cache.set.assert_awaited_once_with(GUILD_ID, written, broadcast=True, version=5)
+
+
+async def testUpdateManyRejectsInvalidValuesWithoutWriting() -> None:
+    """Validation failures raise before anything is written."""
+    # Arrange
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(SummarizeConfig(), 0))
+    store.updateGroup = AsyncMock()
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    service = SettingsService(store, cache)
+
+    # Act / Assert
+    with pytest.raises(InvalidSettingValue):
+        await service.updateMany(GUILD_ID, SummarizeConfig, {"cooldownSeconds": 1, "maxMessages": "many"})
+    with pytest.raises(ValueError, match="Unknown settings"):
+        await service.updateMany(GUILD_ID, SummarizeConfig, {"missing": 1})
+    store.updateGroup.assert_not_awaited()
+
+
+async def testBufferedUpdatesMergeIntoOneStoreWrite() -> None:
+    """Rapid edits to one group within the window become a single store write."""
+    # Arrange
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(GeneralConfig(), 0))
+    store.updateGroup = AsyncMock(return_value=Versioned(GeneralConfig(prefix="!", commandChannelId=42), 1))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=CacheEntry(GeneralConfig()))
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache, writeDelaySeconds=0.01)
+
+    # Act
+    await service.update(GUILD_ID, GeneralConfig, "prefix", "!")
+    await service.update(GUILD_ID, GeneralConfig, "commandChannelId", 42)
+    await asyncio.sleep(0.05)
+
+    # Assert
+    store.updateGroup.assert_awaited_once_with(
+        GUILD_ID, GeneralConfig, {"prefix": "!", "commandChannelId": 42}, [], expectedVersion=0
+    )
+    assert service.stats.bufferedWrites == 1
+    assert service.stats.flushedWrites == 1
+
+
+async def testBufferedUpdatesAreVisibleBeforeFlush(
+    settingsService: SettingsService, settingsStore: MongoSettingsStore
+) -> None:
+    """Reads return buffered values even when the cache no longer holds them."""
+    # Arrange
+    service = SettingsService(settingsService.store, settingsService.cache, writeDelaySeconds=60)
+    await service.update(GUILD_ID, GeneralConfig, "prefix", "!")
+    await service.cache.invalidate(GUILD_ID)
+
+    # Act
+    general = await service.load(GUILD_ID, GeneralConfig)
+    storedBeforeFlush = await settingsStore.collection.find_one({"_id": GUILD_ID})
+    await service.flush()
+
+    # Assert
+    assert general.prefix == "!"
+    assert storedBeforeFlush is None
+    assert (await service.store.load(GUILD_ID, GeneralConfig.name, GeneralConfig)).prefix == "!"
+
+
+async def testLoadBypassesFailingCache() -> None:
+    """Cache errors fall through to the store, and an open cache breaker skips the cache entirely."""
+    # Arrange
+    stored = SummarizeConfig(maxMessages=3)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(stored, 0))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(side_effect=ConnectionError("valkey down"))
+    cache.set = AsyncMock(side_effect=ConnectionError("valkey down"))
+    breaker = CircuitBreaker("cache", failureThreshold=2)
+    service = SettingsService(store, cache, cacheBreaker=breaker)
+
+    # Act
+    first = await service.load(GUILD_ID, SummarizeConfig)
+    second = await service.load(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert first is stored
+    assert second is stored
+    assert breaker.isOpen
+    cache.getEntry.assert_awaited_once()
+    assert store.loadVersioned.await_count == 2
+
+
+async def testLoadBypassesSlowCache() -> None:
+    """A cache slower than the call timeout is treated as a miss."""
+    # Arrange
+    stored = SummarizeConfig(maxMessages=3)
+
+    async def slowGet(*_args: object) -> None:
+        await asyncio.sleep(1)
+
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(stored, 0))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(side_effect=slowGet)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache, cacheBreaker=CircuitBreaker("cache", callTimeoutSeconds=0.01))
+
+    # Act
+    loaded = await service.load(GUILD_ID, SummarizeConfig)
+
+    # Assert
+    assert loaded is stored
+
+
+async def testStoreOutageServesLastKnownGood() -> None:
+    """While the store is down, loads return the last config seen and unknown groups raise."""
+    # Arrange
+    stored = SummarizeConfig(maxMessages=3)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(stored, 0))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache, storeBreaker=CircuitBreaker("store", failureThreshold=1))
+    await service.load(GUILD_ID, SummarizeConfig)
+    store.loadVersioned.side_effect = ConnectionError("mongodb down")
+
+    # Act
+    fallback = await service.load(GUILD_ID, SummarizeConfig)
+    with pytest.raises(SettingsUnavailable):
+        await service.load(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert fallback is stored
+    assert service.stats.fallbackLoads == 1
+    assert store.loadVersioned.await_count == 2
+
+
+async def testStoreOutageRefusesWrites() -> None:
+    """Updates fail with a user-facing error instead of writing only to the cache."""
+    # Arrange
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(SummarizeConfig(), 0))
+    store.updateGroup = AsyncMock(side_effect=ConnectionError("mongodb down"))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act / Assert
+    with pytest.raises(SettingsUnavailable):
+        await service.update(GUILD_ID, SummarizeConfig, "maxMessages", 5)
+    cache.set.assert_not_awaited()
+
+
+async def testOpenStoreBreakerRefusesBufferedWrites() -> None:
+    """With write-behind enabled, edits are refused while the store breaker is open."""
+    # Arrange
+    store = MagicMock()
+    store.load = AsyncMock(side_effect=OSError("mongodb down"))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=CacheEntry(SummarizeConfig(), stale=False))
+    cache.set = AsyncMock()
+    breaker = CircuitBreaker("store", failureThreshold=1)
+    service = SettingsService(store, cache, writeDelaySeconds=60, storeBreaker=breaker)
+    with pytest.raises(OSError):
+        await breaker.call(store.load)
+
+    # Act / Assert
+    with pytest.raises(SettingsUnavailable):
+        await service.update(GUILD_ID, SummarizeConfig, "maxMessages", 5)
+    assert not service._pending
+
+
+async def testUpdateRetriesAfterLosingVersionRace() -> None:
+    """A write rejected because another replica bumped the version is re-applied on the newer state."""
+    # Arrange
+    written = SummarizeConfig(maxMessages=5, cooldownSeconds=30)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(
+        side_effect=[Versioned(SummarizeConfig(), 1), Versioned(SummarizeConfig(cooldownSeconds=30), 2)]
+    )
+    store.updateGroup = AsyncMock(side_effect=[None, Versioned(written, 3)])
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    updated = await service.update(GUILD_ID, SummarizeConfig, "maxMessages", 5)
+
+    # Assert
+    assert updated is written
+    assert [call.kwargs["expectedVersion"] for call in store.updateGroup.await_args_list] == [1, 2]
+    cache.set.assert_awaited_once_with(GUILD_ID, written, broadcast=True, version=3)
+    assert service.stats.writeConflicts == 1
+
+
+async def testUpdateGivesUpAfterRepeatedVersionConflicts() -> None:
+    """Once the retries are used up the update raises instead of overwriting the other write."""
+    # Arrange
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(return_value=Versioned(SummarizeConfig(), 1))
+    store.updateGroup = AsyncMock(return_value=None)
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache, conflictRetries=2)
+
+    # Act / Assert
+    with pytest.raises(SettingsConflict):
+        await service.update(GUILD_ID, SummarizeConfig, "maxMessages", 5)
+    assert store.updateGroup.await_count == 3
+    cache.set.assert_not_awaited()
+
+
+async def testUpdateStartsFromCachedVersion() -> None:
+    """A group cached at a known version is written on top of that version without a store read."""
+    # Arrange
+    written = GeneralConfig(prefix="!")
+    store = MagicMock()
+    store.loadVersioned = AsyncMock()
+    store.updateGroup = AsyncMock(return_value=Versioned(written, 5))
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=CacheEntry(GeneralConfig(), version=4))
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache)
+
+    # Act
+    updated = await service.update(GUILD_ID, GeneralConfig, "prefix", "!")
+
+    # Assert
+    assert updated is written
+    store.loadVersioned.assert_not_awaited()
+    store.updateGroup.assert_awaited_once_with(GUILD_ID, GeneralConfig, {"prefix": "!"}, [], expectedVersion=4)
+
+
+async def testBufferedFlushRetriesAfterLosingVersionRace() -> None:
+    """A buffered write is cached above the version it was made on and re-applied when the flush loses a race."""
+    # Arrange
+    written = SummarizeConfig(maxMessages=5, cooldownSeconds=30)
+    store = MagicMock()
+    store.loadVersioned = AsyncMock(
+        side_effect=[Versioned(SummarizeConfig(), 1), Versioned(SummarizeConfig(cooldownSeconds=30), 2)]
+    )
+    store.updateGroup = AsyncMock(side_effect=[None, Versioned(written, 3)])
+    cache = MagicMock()
+    cache.getEntry = AsyncMock(return_value=None)
+    cache.set = AsyncMock()
+    service = SettingsService(store, cache, writeDelaySeconds=60)
+
+    # Act
+    await service.update(GUILD_ID, SummarizeConfig, "maxMessages", 5)
+    await service.flush()
+
+    # Assert
+    assert [call.kwargs["version"] for call in cache.set.await_args_list] == [2, 3]
+    assert [call.kwargs["expectedVersion"] for call in store.updateGroup.await_args_list] == [1, 2]
+    assert cache.set.await_args_list[-1].args == (GUILD_ID, written)
+    assert service.stats.writeConflicts == 1
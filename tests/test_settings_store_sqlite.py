@@ -0,0 +1,173 @@
+"""Tests for the embedded SqliteSettingsStore and a container-free settings service."""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.cache import MemorySettingsCache
+from pibot.guild_settings.migration import SCHEMA_VERSION_KEY
+from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.serializer import fromStored
+from pibot.guild_settings.service import SettingsService
+from pibot.guild_settings.store import SqliteSettingsStore
+
+GUILD_ID = 1
+
+
+def renameHello(data: dict[str, object]) -> dict[str, object]:
+    """Version 1 stored ``hello``; version 2 calls it ``greeting``."""
+    if "hello" in data:
+        data["greeting"] = data.pop("hello")
+    return data
+
+
+class GreetingConfig(SettingsGroup):
+    """Test group whose field was renamed in version 2."""
+
+    name = "sqliteGreetingTest"
+    description = "SQLite migration test group"
+    schemaVersion = 2
+    migrations = {1: renameHello}
+
+    greeting: str = "hi"
+
+
+@pytest.fixture
+async def sqliteStore(tmp_path: Path):
+    """Yield a SQLite settings store in a scratch database file."""
+    store = SqliteSettingsStore(tmp_path / "settings.db")
+    yield store
+    await store.close()
+
+
+def storedFeatures(path: Path, guildId: int) -> dict[str, object] | None:
+    """Return the raw ``features`` JSON of one guild row, read with a separate connection."""
+    with sqlite3.connect(path) as connection:
+        row = connection.execute("SELECT features FROM settings WHERE guild_id = ?", (guildId,)).fetchone()
+    return None if row is None else json.loads(row[0])
+
+
+async def testSqliteLoadWithoutRowReturnsDefaults(sqliteStore: SqliteSettingsStore) -> None:
+    """Guilds without a row load model defaults."""
+    # Act
+    config = await sqliteStore.load(GUILD_ID, SummarizeConfig.name, SummarizeConfig)
+
+    # Assert
+    assert config == fromStored(SummarizeConfig, {})
+
+
+async def testSqliteUpdateFieldsRoundTrips(sqliteStore: SqliteSettingsStore, tmp_path: Path) -> None:
+    """Set and unset fields land in the guild's JSON row and read back through the model."""
+    # Arrange
+    await sqliteStore.updateFields(GUILD_ID, SummarizeConfig.name, {"maxMessages": 500, "cooldownSeconds": 5}, ())
+
+    # Act
+    await sqliteStore.updateFields(GUILD_ID, SummarizeConfig.name, {"maxMessages": 250}, ("cooldownSeconds",))
+    loaded = await sqliteStore.loadMany(GUILD_ID, [SummarizeConfig, GeneralConfig])
+
+    # Assert
+    assert storedFeatures(tmp_path / "settings.db", GUILD_ID) == {SummarizeConfig.name: {"maxMessages": 250}}
+    summarize = loaded[SummarizeConfig.name]
+    assert isinstance(summarize, SummarizeConfig)
+    assert summarize.maxMessages == 250
+    assert loaded[GeneralConfig.name] == fromStored(GeneralConfig, {})
+
+
+async def testSqliteUnsetWithoutRowCreatesNothing(sqliteStore: SqliteSettingsStore, tmp_path: Path) -> None:
+    """Removing fields of a guild that has no row does not create one."""
+    # Act
+    await sqliteStore.unsetField(GUILD_ID, SummarizeConfig.name, "maxMessages")
+
+    # Assert
+    assert storedFeatures(tmp_path / "settings.db", GUILD_ID) is None
+
+
+async def testSqliteLoadGuildsFillsMissingGuildsWithDefaults(sqliteStore: SqliteSettingsStore) -> None:
+    """Bulk loads return every requested guild, stored or not."""
+    # Arrange
+    await sqliteStore.setField(2, SummarizeConfig.name, "maxMessages", 42)
+
+    # Act
+    loaded = await sqliteStore.loadGuilds([1, 2, 3], [SummarizeConfig])
+
+    # Assert
+    assert sorted(loaded) == [1, 2, 3]
+    assert loaded[1][0] == fromStored(SummarizeConfig, {})
+    stored = loaded[2][0]
+    assert isinstance(stored, SummarizeConfig)
+    assert stored.maxMessages == 42
+
+
+async def testSqliteLoadMigratesAndWritesBack(sqliteStore: SqliteSettingsStore, tmp_path: Path) -> None:
+    """Groups stored with an older schema are upgraded on read and written back."""
+    # Arrange
+    await sqliteStore.setField(GUILD_ID, GreetingConfig.name, "hello", "hey")
+
+    # Act
+    config = await sqliteStore.load(GUILD_ID, GreetingConfig.name, GreetingConfig)
+
+    # Assert
+    assert config.greeting == "hey"
+    assert storedFeatures(tmp_path / "settings.db", GUILD_ID) == {
+        GreetingConfig.name: {"greeting": "hey", SCHEMA_VERSION_KEY: 2}
+    }
+
+
+async def testSqliteUpdateGroupRejectsStaleVersion(sqliteStore: SqliteSettingsStore) -> None:
+    """A write expecting an outdated guild version changes nothing."""
+    # Arrange
+    await sqliteStore.updateGroup(GUILD_ID, GeneralConfig, {"prefix": "!"}, [])
+
+    # Act
+    stale = await sqliteStore.updateGroup(GUILD_ID, GeneralConfig, {"prefix": "?"}, [], expectedVersion=0)
+    loaded = await sqliteStore.loadVersioned(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert stale is None
+    assert (loaded.value.prefix, loaded.version) == ("!", 1)
+
+
+async def testSqliteStoreUsesWriteAheadLog(sqliteStore: SqliteSettingsStore, tmp_path: Path) -> None:
+    """The database is switched to WAL mode so readers never block on the writer."""
+    # Act
+    with sqlite3.connect(tmp_path / "settings.db") as connection:
+        mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+
+    # Assert
+    assert mode == "wal"
+
+
+async def testSqliteReadsDoNotWaitForAnotherWriter(sqliteStore: SqliteSettingsStore, tmp_path: Path) -> None:
+    """Loads read a snapshot instead of taking the write lock another connection holds."""
+    # Arrange
+    await sqliteStore.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+    writer = sqlite3.connect(tmp_path / "settings.db", isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+
+    # Act
+    try:
+        loaded = await sqliteStore.loadMany(GUILD_ID, [GeneralConfig])
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+    # Assert
+    assert loaded == {"general": GeneralConfig(prefix="!")}
+
+
+async def testServiceRunsOnEmbeddedBackends(sqliteStore: SqliteSettingsStore) -> None:
+    """SettingsService works end to end on SQLite and the memory cache, without containers."""
+    # Arrange
+    service = SettingsService(sqliteStore, MemorySettingsCache())
+
+    # Act
+    await service.update(GUILD_ID, GeneralConfig, "prefix", "!")
+    reopened = SettingsService(sqliteStore, MemorySettingsCache())
+    config = await reopened.load(GUILD_ID, GeneralConfig)
+
+    # Assert
+    assert config.prefix == "!"
@@ -0,0 +1,97 @@
+"""Tests for NDJSON export and import of guild settings."""
+
+import io
+import json
+from pathlib import Path
+
+from pibot.__main__ import parseArgs
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.guild_settings.cache import ValkeySettingsCache
+from pibot.guild_settings.store import MongoSettingsStore
+from pibot.guild_settings.transfer import exportSettings, importSettings
+
+GUILD_ID = 1
+
+
+async def testExportWritesValidatedGroupsAsJsonLines(settingsStore: MongoSettingsStore) -> None:
+    """Exports normalize known groups and drop unknown or invalid ones."""
+    # Arrange
+    await settingsStore.collection.insert_one(
+        {
+            "_id": GUILD_ID,
+            "features": {
+                "general": {"prefix": "!", "countdownMaxSeconds": GeneralConfig().countdownMaxSeconds},
+                "summarize": {"maxMessages": "many"},
+                "retired": {"flag": True},
+            },
+        }
+    )
+    output = io.StringIO()
+
+    # Act
+    stats = await exportSettings(settingsStore.collection, output)
+
+    # Assert
+    assert json.loads(output.getvalue()) == {"_id": GUILD_ID, "features": {"general": {"prefix": "!"}}}
+    assert (stats.guilds, stats.groups, stats.skippedGroups) == (1, 1, 2)
+
+
+async def testImportUpsertsGroupsAndEvictsCache(settingsStore: MongoSettingsStore, valkeyClient) -> None:
+    """Imports replace the listed groups, keep others, and drop their cache entries."""
+    # Arrange
+    cache = ValkeySettingsCache(valkeyClient)
+    await settingsStore.setField(GUILD_ID, SummarizeConfig.name, "maxMessages", 500)
+    await cache.set(GUILD_ID, GeneralConfig())
+    lines = [
+        json.dumps({"_id": GUILD_ID, "features": {"general": {"prefix": "!"}}}),
+        json.dumps({"_id": GUILD_ID + 1, "features": {"summarize": {"cooldownSeconds": 5}}}),
+        "not json",
+    ]
+
+    # Act
+    stats = await importSettings(settingsStore.collection, lines, cache=cache, batchSize=1)
+
+    # Assert
+    assert (await settingsStore.load(GUILD_ID, GeneralConfig.name, GeneralConfig)).prefix == "!"
+    assert (await settingsStore.load(GUILD_ID, SummarizeConfig.name, SummarizeConfig)).maxMessages == 500
+    assert (await settingsStore.load(GUILD_ID + 1, SummarizeConfig.name, SummarizeConfig)).cooldownSeconds == 5
+    assert await cache.get(GUILD_ID, GeneralConfig) is None
+    assert (stats.guilds, stats.skippedLines) == (2, 1)
+
+
+async def testExportThenImportRoundTrips(settingsStore: MongoSettingsStore) -> None:
+    """An export imported into an empty collection reproduces the settings."""
+    # Arrange
+    await settingsStore.setField(GUILD_ID, GeneralConfig.name, "prefix", "!")
+    output = io.StringIO()
+    await exportSettings(settingsStore.collection, output)
+    await settingsStore.collection.delete_many({})
+
+    # Act
+    await importSettings(settingsStore.collection, output.getvalue().splitlines())
+
+    # Assert
+    assert (await settingsStore.load(GUILD_ID, GeneralConfig.name, GeneralConfig)).prefix == "!"
+
+
+def testSettingsSubcommandParses() -> None:
+    """``pibot settings import`` parses its options; no subcommand runs the bot."""
+    args = parseArgs(["settings", "import", "--batch-size", "10", "--mongodb-uri", "mongodb://db"])
+
+    assert (args.command, args.action, args.batch_size, args.mongodb_uri) == ("settings", "import", 10, "mongodb://db")
+    assert parseArgs([]).command is None
+
+
+def testSettingsOutputIsOpenedOnlyWhenRunning(tmp_path: Path) -> None:
+    """Parsing keeps ``--output`` as a path, so a rejected command never truncates the file."""
+    # Arrange
+    output = tmp_path / "settings.ndjson"
+    output.write_text("kept\n")
+
+    # Act
+    args = parseArgs(["settings", "export", "--output", str(output)])
+
+    # Assert
+    assert args.output == str(output)
+    assert output.read_text() == "kept\n"
@@ -5,6 +5,7 @@ from typing import Literal
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from discord import ui
 from pydantic import Field
 
 from pibot.cogs.admin.config import AdminConfig
@@ -13,8 +14,9 @@ from pibot.cogs.general.config import GeneralConfig
 from pibot.cogs.summarize.config import SummarizeConfig
 from pibot.guild_settings.errors import GuildSettingsError
 from pibot.guild_settings.model import SettingsGroup
+from pibot.guild_settings.registry import registerSettingsGroup
 from pibot.guild_settings.serializer import parseSetting
-from pibot.guild_settings.settings_ui import SettingValueModal, SettingsPanelView, sendSettingsPanel
+from pibot.guild_settings.settings_ui import SettingValueModal, SettingsComponent, SettingsPanelView, sendSettingsPanel
 from pibot.guild_settings.ui.editors import (
     BoolEditor,
     ChannelEditor,
@@ -25,6 +27,7 @@ from pibot.guild_settings.ui.editors import (
     resolveSettingEditor,
     unwrapAnnotation,
 )
+from pibot.guild_settings.ui.plan import clearPanelPlans, featureSelectOptions, getPanelPlan
 
 
 class SampleMode(StrEnum):
@@ -120,7 +123,7 @@ def testFormatSettingStatusLineHidesMatchingDefault() -> None:
 
 def testSettingsPanelUsesOnlyMessageComponents() -> None:
     """Message panels must not embed modal-only text inputs."""
-    view = SettingsPanelView(MagicMock(), 1, GeneralConfig, GeneralConfig())
+    view = SettingsPanelView(1, GeneralConfig, GeneralConfig())
     invalidTypes: list[dict] = []
 
     def collectInvalidTypes(component: object) -> None:
@@ -139,7 +142,7 @@ def testSettingsPanelUsesOnlyMessageComponents() -> None:
 
 def testSettingsPanelSectionAccessoriesAreButtons() -> None:
     """Section accessories must be buttons; action rows are rejected by Discord."""
-    view = SettingsPanelView(MagicMock(), 1, AdminConfig, AdminConfig())
+    view = SettingsPanelView(1, AdminConfig, AdminConfig())
     invalidAccessories: list[dict] = []
 
     def collectAccessories(component: object) -> None:
@@ -160,7 +163,7 @@ def testSettingsPanelSectionAccessoriesAreButtons() -> None:
 
 def testSettingsPanelBuildsForGeneralConfig() -> None:
     """The panel can render a real feature config."""
-    view = SettingsPanelView(MagicMock(), 1, GeneralConfig, GeneralConfig())
+    view = SettingsPanelView(1, GeneralConfig, GeneralConfig())
 
     assert view.total_children_count > 0
     assert len(view.children) == 1
@@ -171,7 +174,7 @@ def testGeneralConfigIsNotDisableable() -> None:
     assert GeneralConfig.disableable is False
     assert AdminConfig.disableable is True
 
-    view = SettingsPanelView(MagicMock(), 1, GeneralConfig, GeneralConfig())
+    view = SettingsPanelView(1, GeneralConfig, GeneralConfig())
     payload = str(view.to_components())
 
     assert "enabled" not in payload
@@ -180,7 +183,7 @@ def testGeneralConfigIsNotDisableable() -> None:
 
 def testSettingsPanelIncludesAllFields() -> None:
     """The panel renders every field for a feature."""
-    view = SettingsPanelView(MagicMock(), 1, SummarizeConfig, SummarizeConfig())
+    view = SettingsPanelView(1, SummarizeConfig, SummarizeConfig())
 
     assert view.total_children_count > 0
     assert len(SummarizeConfig.model_fields) == 5
@@ -191,7 +194,30 @@ def testSettingsPanelRejectsWhenDiscordComponentLimitExceeded() -> None:
     configClass = makeTestConfig(50)
 
     with pytest.raises(ValueError, match="maximum number of children exceeded"):
-        SettingsPanelView(MagicMock(), 1, configClass, configClass())
+        SettingsPanelView(1, configClass, configClass())
+
+
+def testPanelPlanIsCachedPerModel() -> None:
+    """Editors and static header text are resolved once per settings group."""
+    clearPanelPlans()
+    first = getPanelPlan(GeneralConfig)
+    second = getPanelPlan(GeneralConfig)
+
+    assert first is second
+    assert "enabled" not in [field.name for field in first.fields]
+    assert first.fields[0].name == "prefix"
+    assert first.fields[0].editor is StringEditor
+    assert first.fields[0].title == "**prefix**\nText command prefix"
+
+
+def testFeatureSelectOptionsRefreshAfterRegistration() -> None:
+    """The cached feature picker options pick up groups registered later, still sorted."""
+    before = [option.value for option in featureSelectOptions(GeneralConfig.name)]
+    registerSettingsGroup(makeTestConfig(1, name="zz-plan-test"))
+    options = featureSelectOptions(GeneralConfig.name)
+
+    assert [option.value for option in options] == [*before, "zz-plan-test"]
+    assert [option.value for option in options if option.default] == [GeneralConfig.name]
 
 
 async def testSendSettingsPanelRequiresGuild() -> None:
@@ -274,6 +300,138 @@ async def testSettingValueModalRefreshesViaOriginalResponse() -> None:
     assert awaitArgs.kwargs["view"].config.cooldownSeconds == 3601
 
 
+def makeComponentInteraction(bot: MagicMock, *, guildId: int = 1, administrator: bool = True) -> MagicMock:
+    """Return a component interaction from ``guildId`` handled by ``bot``."""
+    interaction = MagicMock()
+    interaction.client = bot
+    interaction.guild_id = guildId
+    interaction.permissions.administrator = administrator
+    interaction.response.is_done.return_value = False
+    interaction.response.defer = AsyncMock()
+    interaction.response.send_message = AsyncMock()
+    interaction.response.send_modal = AsyncMock()
+    interaction.edit_original_response = AsyncMock()
+    return interaction
+
+
+def panelComponent(view: SettingsPanelView, customId: str) -> SettingsComponent:
+    """Return the routed control with ``customId`` from a rendered panel."""
+    for item in view.walk_children():
+        if isinstance(item, SettingsComponent) and item.custom_id == customId:
+            return item
+    raise AssertionError(customId)
+
+
+def testSettingsPanelRoutesEveryControlByCustomId() -> None:
+    """Every interactive control is a persistent component encoding guild, group and field."""
+    view = SettingsPanelView(42, AdminConfig, AdminConfig())
+    controls = [item for item in view.walk_children() if item.is_dispatchable()]
+
+    assert view.timeout is None
+    assert controls
+    assert all(isinstance(item, SettingsComponent) for item in controls)
+    toggle = panelComponent(view, "settings:set:42:admin:enabled:0")
+    assert (toggle.action, toggle.guildId, toggle.groupName, toggle.field, toggle.value) == (
+        "set",
+        42,
+        "admin",
+        "enabled",
+        "0",
+    )
+    assert panelComponent(view, "settings:feature:42:admin").field is None
+
+
+async def testSettingsComponentAppliesShownValue() -> None:
+    """A toggle click applies the value on the button, even when the stored value already changed."""
+    bot = MagicMock()
+    bot.guildSettings.load = AsyncMock(return_value=AdminConfig(enabled=False))
+    bot.guildSettings.update = AsyncMock(return_value=AdminConfig(enabled=False))
+    interaction = makeComponentInteraction(bot)
+    toggle = panelComponent(SettingsPanelView(1, AdminConfig, AdminConfig()), "settings:set:1:admin:enabled:0")
+
+    assert await toggle.interaction_check(interaction)
+    await toggle.callback(interaction)
+
+    bot.guildSettings.load.assert_not_awaited()
+    bot.guildSettings.update.assert_awaited_once_with(1, AdminConfig, "enabled", False)
+    awaitArgs = interaction.edit_original_response.await_args
+    assert awaitArgs is not None
+    assert awaitArgs.kwargs["view"].config.enabled is False
+    assert "Turn on" in str(awaitArgs.kwargs["view"].to_components())
+
+
+async def testSettingsComponentSwitchesFeature() -> None:
+    """The feature picker renders the selected group with its stored settings."""
+    bot = MagicMock()
+    bot.guildSettings.load = AsyncMock(return_value=SummarizeConfig())
+    interaction = makeComponentInteraction(bot)
+    interaction.data = {"values": [SummarizeConfig.name]}
+    select = panelComponent(SettingsPanelView(1, GeneralConfig, GeneralConfig()), "settings:feature:1:general")
+
+    await select.callback(interaction)
+
+    bot.guildSettings.load.assert_awaited_once_with(1, SummarizeConfig)
+    awaitArgs = interaction.edit_original_response.await_args
+    assert awaitArgs is not None
+    assert awaitArgs.kwargs["view"].configClass is SummarizeConfig
+
+
+async def testSettingsComponentOpensModalForTextFields() -> None:
+    """Edit buttons open the modal prefilled from the stored settings when none were seen yet."""
+    bot = MagicMock()
+    bot.guildSettings.lastKnown.return_value = None
+    bot.guildSettings.load = AsyncMock(return_value=SummarizeConfig(cooldownSeconds=90))
+    interaction = makeComponentInteraction(bot)
+    edit = panelComponent(
+        SettingsPanelView(1, SummarizeConfig, SummarizeConfig()), "settings:edit:1:summarize:cooldownSeconds"
+    )
+
+    await edit.callback(interaction)
+
+    modal = interaction.response.send_modal.await_args.args[0]
+    assert isinstance(modal, SettingValueModal)
+    assert modal.textInput.default == "90"
+
+
+async def testSettingsComponentOpensModalFromLastKnownSettings() -> None:
+    """Edit buttons answer with the modal without waiting on a settings load when the config was seen."""
+    bot = MagicMock()
+    bot.guildSettings.lastKnown.return_value = SummarizeConfig(cooldownSeconds=45)
+    bot.guildSettings.load = AsyncMock()
+    interaction = makeComponentInteraction(bot)
+    edit = panelComponent(
+        SettingsPanelView(1, SummarizeConfig, SummarizeConfig()), "settings:edit:1:summarize:cooldownSeconds"
+    )
+
+    await edit.callback(interaction)
+
+    bot.guildSettings.load.assert_not_awaited()
+    modal = interaction.response.send_modal.await_args.args[0]
+    assert modal.textInput.default == "45"
+
+
+async def testSettingsComponentReportsUnknownGroup() -> None:
+    """Custom IDs naming a group that is not registered show a settings error."""
+    bot = MagicMock()
+    interaction = makeComponentInteraction(bot)
+    button = SettingsComponent(ui.Button(custom_id="settings:set:1:missing:enabled:0"))
+
+    await button.callback(interaction)
+
+    interaction.response.send_message.assert_awaited_once_with("Unknown settings group.", ephemeral=True)
+
+
+@pytest.mark.parametrize(("guildId", "administrator"), [(2, True), (1, False)])
+async def testSettingsComponentRejectsOtherGuildsAndNonAdmins(guildId: int, administrator: bool) -> None:
+    """Clicks from another guild or from non-administrators are refused."""
+    bot = MagicMock()
+    interaction = makeComponentInteraction(bot, guildId=guildId, administrator=administrator)
+    toggle = panelComponent(SettingsPanelView(1, AdminConfig, AdminConfig()), "settings:set:1:admin:enabled:0")
+
+    assert not await toggle.interaction_check(interaction)
+    interaction.response.send_message.assert_awaited_once_with("You cannot change these settings.", ephemeral=True)
+
+
 async def testHandleInteractionErrorShowsGuildSettingsMessage() -> None:
     """Interaction error handling sends expected guild settings failures to the user."""
     interaction = MagicMock()
@@ -0,0 +1,119 @@
+"""Tests for the settings change-stream watcher."""
+
+import asyncio
+import contextlib
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo.errors import OperationFailure
+from valkey.exceptions import ValkeyError
+
+from pibot.guild_settings.watcher import CHANGE_STREAM_HISTORY_LOST, SettingsChangeWatcher, changedGroups
+
+GUILD_ID = 1
+
+
+def makeChange(operationType: str, **extra: object) -> dict[str, object]:
+    """Build a minimal change event for the settings collection."""
+    return {"operationType": operationType, "documentKey": {"_id": GUILD_ID}, **extra}
+
+
+def testChangedGroupsFromFieldPaths() -> None:
+    """Updated and removed feature paths map to their settings group names."""
+    change = makeChange(
+        "update",
+        updateDescription={
+            "updatedFields": {"features.summarize.maxMessages": 5, "features.general": {"prefix": "!"}},
+            "removedFields": ["features.admin.maxClearAmount"],
+        },
+    )
+
+    assert changedGroups(change) == ["admin", "general", "summarize"]
+
+
+def testChangedGroupsForWholeFeaturesObject() -> None:
+    """Replacing the whole ``features`` object may change every group."""
+    change = makeChange("update", updateDescription={"updatedFields": {"features": {}}, "removedFields": []})
+
+    assert changedGroups(change) is None
+
+
+def testChangedGroupsIgnoresNonFeaturePaths() -> None:
+    """Updates outside ``features`` touch no settings group."""
+    change = makeChange("update", updateDescription={"updatedFields": {"note": "x"}, "removedFields": []})
+
+    assert changedGroups(change) == []
+
+
+def testChangedGroupsForWholeDocumentWrites() -> None:
+    """Inserts, replaces, and deletes may change every group."""
+    for operationType in ("insert", "replace", "delete"):
+        assert changedGroups(makeChange(operationType)) is None
+
+
+async def testApplyEvictsChangedGroups() -> None:
+    """Applying an update evicts only the affected groups of that guild."""
+    # Arrange
+    cache = MagicMock()
+    cache.invalidate = AsyncMock()
+    watcher = SettingsChangeWatcher(MagicMock(), cache, MagicMock())
+    change = makeChange(
+        "update",
+        updateDescription={"updatedFields": {"features.summarize.maxMessages": 5}, "removedFields": []},
+    )
+
+    # Act
+    await watcher.apply(change)
+
+    # Assert
+    cache.invalidate.assert_awaited_once_with(GUILD_ID, ["summarize"])
+
+
+async def testApplySkipsUnrelatedUpdates() -> None:
+    """Updates that touch no settings group leave the cache alone."""
+    cache = MagicMock()
+    cache.invalidate = AsyncMock()
+    watcher = SettingsChangeWatcher(MagicMock(), cache, MagicMock())
+
+    await watcher.apply(makeChange("update", updateDescription={"updatedFields": {"note": 1}, "removedFields": []}))
+
+    cache.invalidate.assert_not_awaited()
+
+
+async def testOnlyLeaseHolderWatches(valkeyClient) -> None:
+    """One replica holds the watcher lease; another takes over once it is released."""
+    # Arrange
+    first = SettingsChangeWatcher(MagicMock(), MagicMock(), valkeyClient)
+    second = SettingsChangeWatcher(MagicMock(), MagicMock(), valkeyClient)
+
+    # Act
+    firstLeads = await first._acquireLease()
+    secondLeads = await second._acquireLease()
+    await first.stop()
+    secondTakesOver = await second._acquireLease()
+
+    # Assert
+    assert (firstLeads, secondLeads, secondTakesOver) == (True, False, True)
+
+
+async def testExpiredResumeTokenSurvivesValkeyError(monkeypatch) -> None:
+    """A Valkey error while dropping an expired resume token does not stop the watcher."""
+    # Arrange
+    monkeypatch.setattr("pibot.guild_settings.watcher.RESTART_DELAY_SECONDS", 0)
+    client = MagicMock()
+    client.eval = AsyncMock(return_value=1)
+    client.delete = AsyncMock(side_effect=ValkeyError("valkey down"))
+    watcher = SettingsChangeWatcher(MagicMock(), MagicMock(), client)
+    lead = AsyncMock(side_effect=OperationFailure("resume token expired", code=CHANGE_STREAM_HISTORY_LOST))
+    monkeypatch.setattr(watcher, "_lead", lead)
+
+    # Act
+    task = asyncio.create_task(watcher._run())
+    await asyncio.sleep(0.05)
+
+    # Assert
+    assert not task.done()
+    assert lead.await_count > 1
+    assert client.delete.await_count > 1
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
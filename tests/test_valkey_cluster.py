@@ -0,0 +1,124 @@
+"""Tests for Valkey Cluster and Sentinel clients and cluster-safe settings cache keys."""
+
+import pytest
+from valkey.asyncio import Valkey, ValkeyCluster
+from valkey.asyncio.sentinel import SentinelConnectionPool
+from valkey.crc import key_slot
+
+from pibot.clients import createValkeyClient, createValkeyPubSubClient
+from pibot.cogs.general.config import GeneralConfig
+from pibot.cogs.summarize.config import SummarizeConfig
+from pibot.config import SETTINGS_CACHE_LAYOUT, ValkeyClientConfig
+from pibot.guild_settings.cache import INVALIDATION_CHANNEL, ValkeySettingsCache, cacheKey, guildCacheKey
+
+GUILD_ID = 999002
+
+
+@pytest.fixture
+async def clusterClient(valkeyClusterContainer):
+    """Cluster client seeded with the first node of the cluster testcontainer."""
+    client = createValkeyClient("valkey+cluster://127.0.0.1:7000", ValkeyClientConfig())
+    yield client
+    await client.flushall(target_nodes=ValkeyCluster.PRIMARIES)
+    await client.aclose()
+
+
+def testGuildKeysShareOneSlot() -> None:
+    """Every cache key of one guild hashes to the same cluster slot."""
+    slots = {key_slot(key.encode()) for key in (guildCacheKey(GUILD_ID), cacheKey(GUILD_ID, "summarize"))}
+
+    assert len(slots) == 1
+    assert key_slot(guildCacheKey(GUILD_ID + 1).encode()) != slots.pop()
+
+
+async def testSentinelUriSelectsServiceAndDatabase() -> None:
+    """Sentinel URIs name the sentinels, the monitored service, and the database."""
+    # Act
+    client = createValkeyClient("valkey+sentinel://:secret@s1:26380,s2/settings/2", ValkeyClientConfig())
+    assert isinstance(client, Valkey)
+    pool = client.connection_pool
+    assert isinstance(pool, SentinelConnectionPool)
+
+    # Assert
+    assert pool.service_name == "settings"
+    assert pool.connection_kwargs["db"] == 2
+    assert pool.connection_kwargs["password"] == "secret"
+    assert [sentinel.connection_pool.connection_kwargs["port"] for sentinel in pool.sentinel_manager.sentinels] == [
+        26380,
+        26379,
+    ]
+    await client.aclose()
+
+
+async def testClusterUriCreatesClusterClient() -> None:
+    """Cluster URIs build a cluster client with every listed startup node and no read timeout for pub/sub."""
+    # Act
+    client = createValkeyClient("valkey+cluster://node1:7000,node2:7001", ValkeyClientConfig())
+    pubSubClient = createValkeyPubSubClient("valkey+cluster://node1:7000,node2:7001", ValkeyClientConfig())
+
+    # Assert
+    assert isinstance(client, ValkeyCluster)
+    assert set(client.nodes_manager.startup_nodes) == {"node1:7000", "node2:7001"}
+    assert pubSubClient.connection_pool.connection_kwargs["host"] == "node1"
+    assert pubSubClient.connection_pool.connection_kwargs.get("socket_timeout") is None
+    await pubSubClient.aclose()
+
+
+@pytest.mark.parametrize("layout", list(SETTINGS_CACHE_LAYOUT))
+async def testCacheWorksOnCluster(clusterClient, layout: SETTINGS_CACHE_LAYOUT) -> None:
+    """Reads, bulk reads, and invalidation stay single-slot per guild on a cluster."""
+    # Arrange
+    cache = ValkeySettingsCache(clusterClient, layout=layout)
+    summarize = SummarizeConfig(maxMessages=9)
+    general = GeneralConfig(prefix="?")
+
+    # Act
+    await cache.setBulk({GUILD_ID: [summarize, general], GUILD_ID + 1: [summarize]})
+    loaded = await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig])
+    await cache.invalidate(GUILD_ID)
+    afterInvalidate = await cache.getMany(GUILD_ID, [SummarizeConfig, GeneralConfig])
+    otherGuild = await cache.get(GUILD_ID + 1, SummarizeConfig)
+
+    # Assert
+    assert loaded == {"summarize": summarize, "general": general}
+    assert afterInvalidate == {}
+    assert otherGuild == summarize
+
+
+async def testMigrateLayoutOnCluster(clusterClient) -> None:
+    """Layout migration moves entries of many guilds spread over every node."""
+    # Arrange
+    guildIds = range(GUILD_ID, GUILD_ID + 20)
+    keysCache = ValkeySettingsCache(clusterClient)
+    await keysCache.setBulk({guildId: [SummarizeConfig(maxMessages=3)] for guildId in guildIds})
+    cache = ValkeySettingsCache(clusterClient, layout=SETTINGS_CACHE_LAYOUT.HASH)
+
+    # Act
+    moved = await cache.migrateLayout()
+    loaded = [await cache.get(guildId, SummarizeConfig) for guildId in guildIds]
+
+    # Assert
+    assert moved == len(guildIds)
+    assert loaded == [SummarizeConfig(maxMessages=3)] * len(guildIds)
+
+
+async def testBulkInvalidationBroadcastsOnCluster(clusterClient) -> None:
+    """Cluster pipelines cannot publish, so bulk invalidations are broadcast through the pub/sub client."""
+    # Arrange
+    pubSubClient = createValkeyPubSubClient("valkey+cluster://127.0.0.1:7000", ValkeyClientConfig())
+    cache = ValkeySettingsCache(clusterClient, pubSubClient=pubSubClient)
+    await cache.set(GUILD_ID, SummarizeConfig(maxMessages=2))
+    pubsub = pubSubClient.pubsub()
+    await pubsub.subscribe(INVALIDATION_CHANNEL)
+    await pubsub.get_message(timeout=1.0)
+
+    # Act
+    await cache.invalidateBulk({GUILD_ID: [SummarizeConfig.name]}, broadcast=True)
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+
+    # Assert
+    assert await cache.get(GUILD_ID, SummarizeConfig) is None
+    assert message is not None
+    assert message["channel"] == INVALIDATION_CHANNEL.encode()
+    await pubsub.aclose()
+    await pubSubClient.aclose()